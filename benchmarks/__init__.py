@@ -0,0 +1,24 @@
+"""
+Headless, seeded benchmarks for the CPU side of the city: generation, graph build,
+simulation, batching, point clouds and L-systems.
+
+    python -m benchmarks                      # run everything, print a table
+    python -m benchmarks --quick -o base.json # small sizes, save results
+    python -m benchmarks --compare base.json  # flag regressions against a saved run
+
+The render benchmark (benchmarks.render) needs an offscreen GL context (EGL or OSMesa):
+
+    python -m benchmarks.render -o render.json          # scripted camera paths, per-frame counts
+    python -m benchmarks.render --compare render.json   # aggregates and frame-by-frame differences
+
+GPU query readback and dynamic resolution, checked in the same offscreen context:
+
+    python -m benchmarks.gpu_timing
+
+Bytes per graph node, edge, lane, polygon and agent (benchmarks.memory):
+
+    python -m benchmarks.memory -o memory.json
+"""
+from .harness import Benchmark, measure, compare
+
+__all__ = ["Benchmark", "measure", "compare"]
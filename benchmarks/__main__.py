@@ -0,0 +1,51 @@
+import argparse
+import fnmatch
+import sys
+
+from .harness import measure, environment, save, load, compare, format_report, format_comparison
+from .scenarios import all_benchmarks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Headless CPU benchmarks")
+    parser.add_argument("-k", "--filter", default="*", help="glob over benchmark names, e.g. 'simulate*'")
+    parser.add_argument("--quick", action="store_true", help="small sizes and fewer repetitions")
+    parser.add_argument("--repeat", type=int, default=None, help="override the repetitions per benchmark")
+    parser.add_argument("-o", "--output", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown/growth before flagging (0.10 = 10%%)")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the scenarios' own output")
+    args = parser.parse_args(argv)
+
+    benches = [b for b in all_benchmarks(quick=args.quick) if fnmatch.fnmatch(b.name, args.filter)]
+    if args.list:
+        for b in benches:
+            print(b.name)
+        return 0
+
+    # 1. Run
+    results = {}
+    for b in benches:
+        print(f"[Benchmarks] {b.name} ...", flush=True)
+        results[b.name] = measure(b, repeat=args.repeat, quiet=not args.verbose)
+    print(format_report(results))
+
+    meta = environment()
+    meta["quick"] = args.quick
+    if args.output:
+        save(args.output, results, meta)
+
+    # 2. Compare
+    if args.compare:
+        rows = compare(results, load(args.compare), args.threshold)
+        print(format_comparison(rows))
+        regressions = [r for r in rows if r[5]]
+        if regressions:
+            print(f"[Benchmarks] {len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
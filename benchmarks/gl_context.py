@@ -0,0 +1,140 @@
+"""
+Offscreen OpenGL contexts for headless rendering (CI, servers): EGL pbuffer, OSMesa,
+or a hidden GLFW window. On machines without a GPU Mesa's llvmpipe does the rendering.
+
+PyOpenGL picks its platform when OpenGL.GL is first imported, so create_context()
+must run before anything imports OpenGL.GL (i.e. before importing the framework).
+"""
+import ctypes
+import os
+import sys
+
+BACKENDS = ("egl", "osmesa", "glfw")
+
+
+class HeadlessContext:
+    def __init__(self, backend, width, height, handles, release):
+        self.backend = backend
+        self.width = width
+        self.height = height
+        self.handles = handles
+        self._release = release
+
+    def renderer_name(self):
+        import OpenGL.GL as gl
+        return f"{gl.glGetString(gl.GL_RENDERER).decode()} / {gl.glGetString(gl.GL_VERSION).decode()}"
+
+    def delete(self):
+        if self._release is not None:
+            self._release()
+            self._release = None
+
+
+def _create_egl(width, height):
+    os.environ["PYOPENGL_PLATFORM"] = "egl"
+    # Without a display server, Mesa needs the surfaceless platform
+    if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+    from OpenGL import EGL
+
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("eglInitialize failed")
+
+    config_attribs = (EGL.EGLint * 13)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_DEPTH_SIZE, 24,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    if not EGL.eglChooseConfig(display, config_attribs, ctypes.pointer(config), 1, ctypes.pointer(count)) or count.value == 0:
+        raise RuntimeError("no EGL config with a pbuffer and depth buffer")
+
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context_attribs = (EGL.EGLint * 7)(
+        EGL.EGL_CONTEXT_MAJOR_VERSION, 4, EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+        EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+        EGL.EGL_NONE)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, context_attribs)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("eglMakeCurrent failed")
+
+    def release():
+        EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroySurface(display, surface)
+        EGL.eglDestroyContext(display, context)
+        EGL.eglTerminate(display)
+
+    return HeadlessContext("egl", width, height, (display, surface, context), release)
+
+
+def _create_osmesa(width, height):
+    os.environ["PYOPENGL_PLATFORM"] = "osmesa"
+    from OpenGL import GL as gl, arrays
+    from OpenGL import osmesa
+
+    attribs = (ctypes.c_int * 11)(
+        osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+        osmesa.OSMESA_DEPTH_BITS, 24,
+        osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+        osmesa.OSMESA_CONTEXT_MAJOR_VERSION, 4,
+        osmesa.OSMESA_CONTEXT_MINOR_VERSION, 3,
+        0)
+    context = osmesa.OSMesaCreateContextAttribs(attribs, None)
+    if not context:
+        raise RuntimeError("OSMesaCreateContextAttribs failed")
+    buffer = arrays.GLubyteArray.zeros((height, width, 4))
+    if not osmesa.OSMesaMakeCurrent(context, buffer, gl.GL_UNSIGNED_BYTE, width, height):
+        raise RuntimeError("OSMesaMakeCurrent failed")
+
+    def release():
+        osmesa.OSMesaDestroyContext(context)
+
+    return HeadlessContext("osmesa", width, height, (context, buffer), release)
+
+
+def _create_glfw(width, height):
+    import glfw
+    if not glfw.init():
+        raise RuntimeError("glfw.init failed (no display?)")
+    glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 4)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    window = glfw.create_window(width, height, "benchmark", None, None)
+    if window is None:
+        glfw.terminate()
+        raise RuntimeError("glfw.create_window failed")
+    glfw.make_context_current(window)
+    glfw.swap_interval(0)
+
+    def release():
+        glfw.destroy_window(window)
+        glfw.terminate()
+
+    return HeadlessContext("glfw", width, height, (window,), release)
+
+
+def create_context(width, height, backend="auto"):
+    """
+    Creates and makes current an offscreen GL 4.3 core context with a width x height
+    default framebuffer. backend: "egl", "osmesa", "glfw" (hidden window) or "auto"
+    (tries them in that order).
+    """
+    if "OpenGL.GL" in sys.modules and backend != "glfw":
+        print("[Benchmarks] Warning: OpenGL.GL was imported before create_context(); the platform may be wrong")
+
+    factories = {"egl": _create_egl, "osmesa": _create_osmesa, "glfw": _create_glfw}
+    order = BACKENDS if backend == "auto" else (backend,)
+    errors = []
+    for name in order:
+        try:
+            return factories[name](width, height)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            os.environ.pop("PYOPENGL_PLATFORM", None)
+    raise RuntimeError("No offscreen GL context available (" + "; ".join(errors) + ")")
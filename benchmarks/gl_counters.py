@@ -0,0 +1,118 @@
+"""
+Counts GL calls per frame by wrapping functions of the OpenGL.GL module.
+The framework calls everything as gl.glX through 'import OpenGL.GL as gl', so the
+wrappers see every call without changes to the renderer.
+"""
+import OpenGL.GL as gl
+
+DRAW_CALLS = (
+    "glDrawArrays", "glDrawElements",
+    "glDrawArraysInstanced", "glDrawElementsInstanced",
+    "glDrawElementsInstancedBaseInstance", "glDrawElementsBaseVertex",
+)
+STATE_CHANGES = (
+    "glUseProgram", "glBindVertexArray", "glBindTexture", "glActiveTexture",
+    "glBindBuffer", "glBindBufferBase", "glBindFramebuffer",
+    "glEnable", "glDisable", "glBlendFunc", "glDepthMask", "glDepthFunc",
+    "glViewport", "glPolygonMode", "glLineWidth", "glPointSize",
+)
+UPLOADS = ("glBufferData", "glBufferSubData", "glTexImage2D", "glTexSubImage2D")
+
+
+def _primitives(mode, count, instances):
+    """Triangles submitted by one draw call (0 for lines and points)."""
+    if mode == gl.GL_TRIANGLES:
+        return (count // 3) * instances
+    if mode in (gl.GL_TRIANGLE_STRIP, gl.GL_TRIANGLE_FAN):
+        return max(count - 2, 0) * instances
+    return 0
+
+
+def _draw_args(name, args):
+    """(mode, vertex count, instance count) of a draw call."""
+    if name.startswith("glDrawArrays"):
+        mode, _first, count = args[:3]
+        instances = args[3] if name == "glDrawArraysInstanced" else 1
+    else:
+        mode, count = args[:2]
+        instances = args[4] if "Instanced" in name else 1
+    return int(mode), int(count), int(instances)
+
+
+class GLCallCounter:
+    """
+    install() wraps the draw, state, uniform and upload functions; take_frame() returns
+    and resets this frame's counts: draw_calls, triangles, vertices, instances,
+    state_changes, uniforms, uploads and calls (per function name).
+    """
+    def __init__(self):
+        self.originals = {}
+        self._reset()
+
+    def _reset(self):
+        self.calls = {}
+        self.draw_calls = 0
+        self.triangles = 0
+        self.vertices = 0
+        self.instances = 0
+        self.state_changes = 0
+        self.uniforms = 0
+        self.uploads = 0
+
+    def _wrap(self, name, kind):
+        original = getattr(gl, name)
+        counter = self
+
+        def wrapper(*args, **kwargs):
+            counter.calls[name] = counter.calls.get(name, 0) + 1
+            if kind == "draw":
+                mode, count, instances = _draw_args(name, args)
+                counter.draw_calls += 1
+                counter.vertices += count * instances
+                counter.instances += instances
+                counter.triangles += _primitives(mode, count, instances)
+            elif kind == "state":
+                counter.state_changes += 1
+            elif kind == "uniform":
+                counter.uniforms += 1
+            else:
+                counter.uploads += 1
+            return original(*args, **kwargs)
+
+        self.originals[name] = original
+        setattr(gl, name, wrapper)
+
+    def install(self):
+        if self.originals:
+            return
+        for name in DRAW_CALLS:
+            if hasattr(gl, name):
+                self._wrap(name, "draw")
+        for name in STATE_CHANGES:
+            if hasattr(gl, name):
+                self._wrap(name, "state")
+        for name in dir(gl):
+            if name.startswith("glUniform") and callable(getattr(gl, name)):
+                self._wrap(name, "uniform")
+        for name in UPLOADS:
+            if hasattr(gl, name):
+                self._wrap(name, "upload")
+
+    def uninstall(self):
+        for name, original in self.originals.items():
+            setattr(gl, name, original)
+        self.originals = {}
+
+    def take_frame(self):
+        frame = {
+            "draw_calls": self.draw_calls,
+            "triangles": self.triangles,
+            "vertices": self.vertices,
+            "instances": self.instances,
+            "state_changes": self.state_changes,
+            "uniforms": self.uniforms,
+            "uploads": self.uploads,
+            "calls": self.calls,
+        }
+        self._reset()
+        return frame
@@ -0,0 +1,234 @@
+"""
+Headless check of the GPU timing paths: GpuTimer readback, DynamicResolution driving a
+renderer's render scale and the Profiler's GPU scopes, in an offscreen GL context
+(EGL/OSMesa, llvmpipe is fine).
+
+The "renderer" is a stand-in with GLRenderer's render_scale / set_render_scale and a
+fill-bound frame (a full-screen triangle with an expensive fragment shader over
+render_scale^2 of the pixels), so the check needs no window system. A second,
+CPU-bound frame (cheap draws with busy-waits between them, like a slow Python draw
+loop) must not make the controller lower the scale:
+
+    python -m benchmarks.gpu_timing
+    python -m benchmarks.gpu_timing --target-ms 1 --frames 300
+
+Exits non-zero if a query result cannot be read back or never reaches the controller,
+or if the CPU-bound frame lowers the scale.
+The scale the controller settles on is only reported: llvmpipe's elapsed-time queries
+do not follow the pixel count, so only a real GPU shows the scale tracking the target.
+"""
+import argparse
+import sys
+import time
+
+from .gl_context import create_context
+
+VERTEX_SHADER = """
+#version 330 core
+void main() {
+    vec2 p = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+    gl_Position = vec4(p * 2.0 - 1.0, 0.0, 1.0);
+}
+"""
+
+# Enough arithmetic per pixel that the frame time follows the pixel count
+FRAGMENT_SHADER = """
+#version 330 core
+uniform int iterations;
+out vec4 color;
+void main() {
+    vec2 z = gl_FragCoord.xy * 0.001;
+    for (int i = 0; i < iterations; ++i) {
+        z = vec2(z.x * z.x - z.y * z.y, 2.0 * z.x * z.y) + vec2(0.3, 0.5);
+        z = fract(z);
+    }
+    color = vec4(z, 0.0, 1.0);
+}
+"""
+
+
+def _compile(vertex_source, fragment_source):
+    # Not framework.materials: its package imports the texture loader (PIL)
+    import OpenGL.GL as gl
+    program = gl.glCreateProgram()
+    for kind, source in ((gl.GL_VERTEX_SHADER, vertex_source), (gl.GL_FRAGMENT_SHADER, fragment_source)):
+        shader = gl.glCreateShader(kind)
+        gl.glShaderSource(shader, source)
+        gl.glCompileShader(shader)
+        if not gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS):
+            raise RuntimeError(gl.glGetShaderInfoLog(shader).decode())
+        gl.glAttachShader(program, shader)
+        gl.glDeleteShader(shader)
+    gl.glLinkProgram(program)
+    if not gl.glGetProgramiv(program, gl.GL_LINK_STATUS):
+        raise RuntimeError(gl.glGetProgramInfoLog(program).decode())
+    return program
+
+
+class FillRenderer:
+    """
+    Stands in for GLRenderer: render_scale, set_render_scale() and a fill-bound render().
+    submit_ms > 0 spreads that much CPU busy-waiting over DRAWS draws instead (CPU-bound frame).
+    """
+    DRAWS = 8
+
+    def __init__(self, width, height, iterations, submit_ms=0.0):
+        import OpenGL.GL as gl
+
+        self.width = width
+        self.height = height
+        self.iterations = iterations
+        self.submit_ms = submit_ms
+        self.render_scale = 1.0
+        self.min_render_scale = 0.25
+        self.dynamic_resolution = None
+        self.scale_changes = 0
+        self.program = _compile(VERTEX_SHADER, FRAGMENT_SHADER)
+        self.VAO = gl.glGenVertexArrays(1)
+
+    def set_render_scale(self, scale):
+        self.render_scale = min(max(scale, self.min_render_scale), 1.0)
+        self.scale_changes += 1
+
+    def render(self):
+        import OpenGL.GL as gl
+        if self.dynamic_resolution is not None:
+            self.dynamic_resolution.begin_frame()
+
+        gl.glViewport(0, 0, max(1, int(round(self.width * self.render_scale))),
+                      max(1, int(round(self.height * self.render_scale))))
+        gl.glUseProgram(self.program)
+        gl.glUniform1i(gl.glGetUniformLocation(self.program, "iterations"), self.iterations)
+        gl.glBindVertexArray(self.VAO)
+        if self.submit_ms > 0:
+            for _ in range(self.DRAWS):
+                end = time.perf_counter() + self.submit_ms / self.DRAWS / 1000.0
+                while time.perf_counter() < end:
+                    pass
+                gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+        else:
+            gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+        gl.glBindVertexArray(0)
+
+        if self.dynamic_resolution is not None:
+            self.dynamic_resolution.end_frame()
+
+    def delete(self):
+        import OpenGL.GL as gl
+        gl.glDeleteVertexArrays(1, [self.VAO])
+        gl.glDeleteProgram(self.program)
+
+
+def check_gpu_timer(renderer, frames):
+    """Times plain frames with a GpuTimer; returns the last GPU time in ms (None: nothing read back)."""
+    import OpenGL.GL as gl
+    from framework.utils.gpu_timer import GpuTimer
+
+    timer = GpuTimer()
+    for _ in range(frames):
+        timer.begin()
+        renderer.render()
+        timer.end()
+    gl.glFinish()
+    last_ms = timer.poll()
+    print(f"[GpuTiming] GpuTimer: {timer.samples} samples, last " + (f"{last_ms:.3f} ms" if last_ms is not None else "none"))
+    timer.delete()
+    return last_ms
+
+
+def check_dynamic_resolution(renderer, frames, target_ms, min_scale):
+    """Renders with a DynamicResolution attached; returns the number of GPU samples it received."""
+    import OpenGL.GL as gl
+    from framework.utils.dynamic_resolution import DynamicResolution
+
+    renderer.render_scale = 1.0
+    renderer.scale_changes = 0
+    renderer.dynamic_resolution = DynamicResolution(renderer, target_ms=target_ms, min_scale=min_scale)
+    for _ in range(frames):
+        renderer.render()
+        # One frame in flight at a time, like a swap-interval-bound main loop
+        gl.glFinish()
+    controller = renderer.dynamic_resolution
+    samples = controller.timer.samples
+    kind = "CPU-bound" if renderer.submit_ms > 0 else "fill"
+    gpu = f"{controller.gpu_ms:.3f}" if controller.gpu_ms is not None else "-"
+    print(f"[GpuTiming] DynamicResolution ({kind}): target {target_ms:.3f} ms, {samples} samples, GPU {gpu} ms, "
+          f"CPU {controller.cpu_ms:.3f} ms, scale {renderer.render_scale:.2f} after {renderer.scale_changes} changes")
+    controller.delete()
+    renderer.dynamic_resolution = None
+    return samples
+
+
+def check_profiler(renderer, frames):
+    """Profiles frames with nested GPU scopes; returns how many scopes got a GPU time."""
+    import OpenGL.GL as gl
+    from framework.utils.profiler import Profiler
+
+    profiler = Profiler()
+    profiler.enabled = True
+    for _ in range(frames + Profiler.LATENCY + 1):
+        profiler.begin_frame()
+        with profiler.scope("render", gpu=True):
+            with profiler.scope("scene", gpu=True):
+                renderer.render()
+        profiler.end_frame()
+        gl.glFinish()
+    timed = [r for frame in profiler.frames for r in frame["scopes"] if r["gpu_ms"] is not None]
+    print(f"[GpuTiming] Profiler: {len(timed)} GPU scope times from {len(profiler.frames)} frames")
+    # Disabling reads back (and frees) what is still in flight
+    profiler.enabled = False
+    profiler.end_frame()
+    return len(timed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.gpu_timing", description="Headless GPU timing check")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--size", type=int, nargs=2, default=(512, 512), metavar=("W", "H"))
+    parser.add_argument("--iterations", type=int, default=64, help="fragment shader loop count")
+    parser.add_argument("--target-ms", type=float, default=1.0, help="DynamicResolution target frame time")
+    parser.add_argument("--min-scale", type=float, default=0.5)
+    parser.add_argument("--submit-ms", type=float, default=4.0, help="CPU time per CPU-bound frame (above the target)")
+    parser.add_argument("--backend", default="auto", choices=("auto", "egl", "osmesa", "glfw"))
+    args = parser.parse_args(argv)
+
+    # 1. Context before anything imports OpenGL.GL
+    width, height = args.size
+    context = create_context(width, height, backend=args.backend)
+    print(f"[GpuTiming] {context.backend}: {context.renderer_name()}")
+
+    failures = []
+    renderer = FillRenderer(width, height, args.iterations)
+    cpu_renderer = FillRenderer(width, height, 1, submit_ms=args.submit_ms)
+    try:
+        # 2. Query readback
+        if check_gpu_timer(renderer, 8) is None:
+            failures.append("GpuTimer read back no results")
+
+        # 3. Controller: readback inside render(), as GLRenderer does it
+        if check_dynamic_resolution(renderer, args.frames, args.target_ms, args.min_scale) == 0:
+            failures.append("DynamicResolution received no GPU samples")
+
+        # 4. CPU-bound frame over the target (half its measured GPU time, so it is over budget
+        #    on any device): lowering the scale would not help
+        cpu_frame_ms = check_gpu_timer(cpu_renderer, 8)
+        cpu_target_ms = min(args.target_ms, cpu_frame_ms * 0.5) if cpu_frame_ms else args.target_ms
+        check_dynamic_resolution(cpu_renderer, args.frames, cpu_target_ms, args.min_scale)
+        if cpu_renderer.render_scale < 1.0:
+            failures.append(f"DynamicResolution lowered the scale of a CPU-bound frame to {cpu_renderer.render_scale:.2f}")
+
+        # 5. Profiler GPU scopes (GL_TIMESTAMP queries)
+        if check_profiler(renderer, 8) == 0:
+            failures.append("Profiler read back no GPU scope times")
+    finally:
+        renderer.delete()
+        cpu_renderer.delete()
+        context.delete()
+
+    for failure in failures:
+        print(f"[GpuTiming] FAILED: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Timing, peak memory and baseline comparison for the benchmark scenarios.
+"""
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+
+class Benchmark:
+    """
+    A named, seeded scenario.
+    setup(): builds the inputs (not timed) and returns them.
+    run(inputs): the timed work; may return a dict of extra numbers to report.
+    """
+    def __init__(self, name, run, setup=None, repeat=5, seed=0, group=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.repeat = repeat
+        self.seed = seed
+        self.group = group or name.split("[")[0]
+
+    def _seeded_setup(self):
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        return self.setup() if self.setup is not None else None
+
+
+def measure(bench, repeat=None, quiet=True):
+    """
+    Runs bench 'repeat' times (fresh setup each time) and once more under tracemalloc.
+    Returns {"median_s", "min_s", "max_s", "repeat", "peak_kb", **extra}.
+    quiet: swallow the scenario's prints so they neither clutter the report nor cost time.
+    """
+    repeat = repeat or bench.repeat
+    out = io.StringIO() if quiet else sys.stdout
+    times = []
+    extra = {}
+
+    with contextlib.redirect_stdout(out):
+        # 1. Timing (tracemalloc off: it slows allocation-heavy code several times)
+        for _ in range(repeat):
+            inputs = bench._seeded_setup()
+            gc.collect()
+            random.seed(bench.seed)
+            start = time.perf_counter()
+            result = bench.run(inputs)
+            times.append(time.perf_counter() - start)
+            if isinstance(result, dict):
+                extra = result
+            del inputs, result
+
+        # 2. Peak memory of the timed part only
+        inputs = bench._seeded_setup()
+        gc.collect()
+        random.seed(bench.seed)
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        bench.run(inputs)
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+
+    report = {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "repeat": repeat,
+        "peak_kb": peak / 1024.0,
+    }
+    report.update(extra)
+    return report
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def save(path, results, meta, **extra):
+    """extra: more top-level sections, e.g. the per-frame records of the render benchmark."""
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results, **extra}, f, indent=2)
+    print(f"[Benchmarks] Wrote {len(results)} results to {path}")
+
+
+def load(path, key="results"):
+    with open(path) as f:
+        return json.load(f).get(key, {})
+
+
+# Below these absolute changes a ratio is noise, not a regression
+MIN_DELTA = {"median_s": 0.0005, "peak_kb": 64.0}
+
+
+def compare(results, baseline, threshold=0.10, metrics=("median_s", "peak_kb")):
+    """
+    Compares median time and peak memory (or the given metrics) against a baseline run.
+    Returns a list of (name, metric, base, new, ratio, regressed) for the scenarios in both.
+    """
+    rows = []
+    for name, new in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in metrics:
+            if metric not in base or metric not in new:
+                continue
+            ratio = new[metric] / base[metric] if base[metric] > 0 else 1.0
+            regressed = ratio > 1.0 + threshold and new[metric] - base[metric] > MIN_DELTA.get(metric, 0.0)
+            rows.append((name, metric, base[metric], new[metric], ratio, regressed))
+    return rows
+
+
+def format_report(results):
+    lines = [f"{'benchmark':<36}{'median':>10}{'min':>10}{'peak MB':>10}  extra"]
+    for name, r in results.items():
+        extra = ", ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                          for k, v in r.items() if k not in ("median_s", "min_s", "max_s", "repeat", "peak_kb"))
+        lines.append(f"{name:<36}{r['median_s'] * 1000:9.1f}ms{r['min_s'] * 1000:8.1f}ms{r['peak_kb'] / 1024:10.2f}  {extra}")
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<36}{'metric':<10}{'base':>12}{'new':>12}{'ratio':>8}"]
+    for name, metric, base, new, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(f"{name:<36}{metric:<10}{base:12.4g}{new:12.4g}{ratio:8.2f}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,131 @@
+"""
+Memory report: bytes per Node, Edge, Lane, Polygon and CarAgent in a seeded city.
+
+Each object is charged for what it owns: its own instance (and __dict__, if it has one),
+its containers and the values in them, down to the next graph object. An object shared
+by several owners (an agent's path is its lane's waypoints) is charged once, to the first
+owner measured, so the per-class numbers add up to the total.
+
+    python -m benchmarks.memory -o before.json
+    python -m benchmarks.memory --compare before.json
+"""
+import argparse
+import random
+import sys
+import types
+
+from pyglm import glm
+
+from .harness import environment, save, load, compare, format_comparison
+
+AGENT_STEPS = 50
+
+
+def deep_sizeof(obj, seen, stop):
+    """Bytes owned by obj, skipping ids in seen (updated) and instances of the stop classes."""
+    total = 0
+    pending = [obj]
+    root = True
+    while pending:
+        item = pending.pop()
+        if item is None or isinstance(item, (bool, type, types.ModuleType, types.FunctionType)):
+            continue
+        if id(item) in seen or (not root and isinstance(item, stop)):
+            continue
+        root = False
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+
+        if isinstance(item, glm.array):
+            # getsizeof covers the header only
+            total += item.nbytes
+        elif isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif isinstance(item, stop):
+            if hasattr(item, "__dict__"):
+                pending.append(item.__dict__)
+            for cls in type(item).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    pending.append(getattr(item, name, None))
+    return total
+
+
+def build(city_size, agents, seed):
+    """Seeded city graph, its layout polygons and a population that has driven a little."""
+    from .scenarios import city_layout, city_graph, _spawn
+    random.seed(seed)
+    layout = city_layout(city_size)
+    city = city_graph(city_size)
+    population, _ = _spawn(city, agents)
+    for _ in range(AGENT_STEPS):
+        for agent in population:
+            agent.update(0.016)
+    polygons = list(getattr(layout, "blocks", [])) + list(getattr(layout, "lots", []))
+    return city.graph, polygons, population
+
+
+def measure_memory(graph, polygons, agents):
+    """{"memory[Class]": {"count", "bytes_per_object", "total_kb", "slots"}}, graph first."""
+    from framework.utils.city_graph import Node, Edge, Lane
+    from framework.utils.car_agent import CarAgent
+    from framework.utils.polygon import Polygon
+    stop = (Node, Edge, Lane, CarAgent, Polygon)
+
+    lanes = [lane for edge in graph.edges for lane in edge.lanes]
+    groups = [(Node, graph.nodes), (Edge, graph.edges), (Lane, lanes), (Polygon, polygons), (CarAgent, agents)]
+    seen = set()
+    results = {}
+    for cls, objects in groups:
+        total = sum(deep_sizeof(obj, seen, stop) for obj in objects)
+        results[f"memory[{cls.__name__}]"] = {
+            "count": len(objects),
+            "bytes_per_object": total / max(len(objects), 1),
+            "total_kb": total / 1024.0,
+            "slots": "__slots__" in vars(cls),
+        }
+    return results
+
+
+def format_memory(results):
+    lines = [f"{'class':<24}{'count':>8}{'bytes/obj':>12}{'total KB':>12}{'slots':>8}"]
+    for name, r in results.items():
+        lines.append(f"{name:<24}{r['count']:8d}{r['bytes_per_object']:12.1f}{r['total_kb']:12.1f}{str(r['slots']):>8}")
+    total = sum(r["total_kb"] for r in results.values())
+    lines.append(f"{'total':<24}{'':8}{'':12}{total:12.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.memory", description="Bytes per graph and agent object")
+    parser.add_argument("--city", type=float, default=400.0, help="city width and depth")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed growth before flagging (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    graph, polygons, agents = build(args.city, args.agents, args.seed)
+    results = measure_memory(graph, polygons, agents)
+    print(format_memory(results))
+
+    meta = environment()
+    meta.update({"city": args.city, "agents": args.agents, "seed": args.seed})
+    if args.output:
+        save(args.output, results, meta)
+
+    if args.compare:
+        rows = compare(results, load(args.compare), args.threshold, metrics=("bytes_per_object", "total_kb"))
+        print(format_comparison(rows))
+        regressions = [r for r in rows if r[5]]
+        if regressions:
+            print(f"[Benchmarks] {len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+"""
+Headless render benchmark: a seeded city flown through by a scripted Flycamera path in an
+offscreen GL context (EGL/OSMesa, so Mesa llvmpipe works on CI machines without a GPU).
+
+Per frame it records the CPU time of the simulation update, of GLRenderer.render() (submit)
+and of glFinish() (the driver/GPU catching up), with the draw calls, state changes,
+uniform calls and triangles the frame submitted. Frame i of a path always has the same
+camera and seed, so two runs on the same machine can be compared frame for frame:
+
+    python -m benchmarks.render -o before.json
+    python -m benchmarks.render --compare before.json
+
+Wall-clock numbers on llvmpipe say little about a real GPU; the counts are exact everywhere.
+"""
+import argparse
+import fnmatch
+import random
+import statistics
+import sys
+import time
+
+from .gl_context import create_context
+from .harness import environment, save, load, compare, format_comparison
+
+CITY_SEED = 7
+
+
+class HeadlessWindow:
+    """Stands in for OpenGLWindow: the renderer only reads the size and the camera."""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.camera = None
+
+
+# ----------------------------
+# Camera paths
+# ----------------------------
+# Keyframes (position, pitch, yaw); positions are fractions of the city half-size, y in world units
+PATHS = {
+    "flyover": [
+        ((-1.0, 150.0, 1.0), -45.0, -45.0),
+        ((1.0, 150.0, 1.0), -45.0, -135.0),
+        ((1.0, 150.0, -1.0), -45.0, 135.0),
+        ((-1.0, 150.0, -1.0), -45.0, 45.0),
+        ((-1.0, 150.0, 1.0), -45.0, -45.0),
+    ],
+    "street": [
+        ((-0.9, 6.0, 0.0), -2.0, 0.0),
+        ((0.0, 6.0, 0.0), -2.0, 0.0),
+        ((0.0, 6.0, 0.0), -2.0, -90.0),
+        ((0.0, 6.0, -0.9), -2.0, -90.0),
+    ],
+    "overview": [
+        ((0.0, 400.0, 0.01), -89.0, -90.0),
+        ((0.0, 120.0, 0.01), -89.0, -90.0),
+    ],
+}
+
+
+def camera_path(name, frames, half_size):
+    """frames (position, pitch, yaw) samples, linearly interpolated between the keyframes."""
+    from pyglm import glm
+    keys = PATHS[name]
+    samples = []
+    for i in range(frames):
+        t = i / max(frames - 1, 1) * (len(keys) - 1)
+        k = min(int(t), len(keys) - 2)
+        f = t - k
+        (p0, pitch0, yaw0), (p1, pitch1, yaw1) = keys[k], keys[k + 1]
+        pos = glm.mix(glm.vec3(p0), glm.vec3(p1), f)
+        pos.x *= half_size
+        pos.z *= half_size
+        samples.append((pos, pitch0 + (pitch1 - pitch0) * f, yaw0 + (yaw1 - yaw0) * f))
+    return samples
+
+
+def place_camera(camera, position, pitch, yaw):
+    """Same orientation math as Flycamera.set_cur_transform."""
+    from pyglm import glm
+    camera.position = glm.vec3(position)
+    camera.euler_angles = glm.vec3(pitch, yaw, 0.0)
+    camera.front = glm.normalize(glm.vec3(glm.cos(glm.radians(yaw)) * glm.cos(glm.radians(pitch)),
+                                          glm.sin(glm.radians(pitch)),
+                                          glm.sin(glm.radians(yaw)) * glm.cos(glm.radians(pitch))))
+    camera.updateView()
+
+
+# ----------------------------
+# Scene
+# ----------------------------
+def build_scene(width, height, city_size, agents, seed):
+    """Renderer, camera, city manager and simulation config for a seeded city."""
+    # Imported here: the GL platform is chosen by create_context() before OpenGL.GL loads
+    from pyglm import glm
+    from framework.camera import Flycamera
+    from framework.renderer import GLRenderer
+    from framework.light import DirectionalLight
+    from exercises.components.city_manager import CityManager
+    from exercises.components.simulation_state import SimulationState
+
+    window = HeadlessWindow(width, height)
+    camera = Flycamera(width, height, 70, 0.1, 1000.0)
+    renderer = GLRenderer(window, camera)
+    renderer.init_post_process(width, height)
+    renderer.clear_color = [0.5, 0.6, 0.7, 1.0]
+    renderer.addLight(DirectionalLight(glm.vec3(-0.4, -1.0, -0.3), glm.vec4(1.0, 0.95, 0.9, 1.2), ambient=0.25))
+
+    # No city cache: every run builds the same city from the seed
+    manager = CityManager(renderer, use_cache=False)
+    random.seed(seed)
+    manager.regenerate(city_size, city_size, manager.found_textures, manager.texture_dir, seed=seed)
+
+    config = SimulationState(target_agent_count=agents, random_seed=False, city_seed=seed)
+    return renderer, camera, manager, config
+
+
+# ----------------------------
+# Frames
+# ----------------------------
+def run_path(name, frames, warmup, renderer, camera, manager, config, counter, city_size, seed, dt):
+    import OpenGL.GL as gl
+    samples = camera_path(name, frames + warmup, city_size * 0.5)
+    random.seed(seed)
+    records = []
+    for i, (position, pitch, yaw) in enumerate(samples):
+        place_camera(camera, position, pitch, yaw)
+        counter.take_frame()
+
+        # 1. Simulation (agents move; their meshes are updated here, not drawn)
+        t0 = time.perf_counter()
+        manager.update(dt, config)
+        # 2. Submit
+        t1 = time.perf_counter()
+        renderer.render()
+        # 3. Wait for the driver, so the next frame's submit time is not queueing behind this one
+        t2 = time.perf_counter()
+        gl.glFinish()
+        t3 = time.perf_counter()
+
+        counts = counter.take_frame()
+        if i < warmup:
+            continue
+        counts.pop("calls")
+        counts.update({
+            "frame": i - warmup,
+            "update_ms": (t1 - t0) * 1000.0,
+            "submit_ms": (t2 - t1) * 1000.0,
+            "finish_ms": (t3 - t2) * 1000.0,
+            "agents": len(manager.agents),
+        })
+        records.append(counts)
+    return records
+
+
+def summarize(records):
+    """Per-path result in the harness format: median_s is the median submit time."""
+    submit = sorted(r["submit_ms"] for r in records)
+    return {
+        "median_s": statistics.median(submit) / 1000.0,
+        "min_s": submit[0] / 1000.0,
+        "max_s": submit[-1] / 1000.0,
+        "p95_submit_ms": submit[min(int(len(submit) * 0.95), len(submit) - 1)],
+        "median_update_ms": statistics.median(r["update_ms"] for r in records),
+        "median_finish_ms": statistics.median(r["finish_ms"] for r in records),
+        "frames": len(records),
+        "draw_calls": statistics.mean(r["draw_calls"] for r in records),
+        "state_changes": statistics.mean(r["state_changes"] for r in records),
+        "uniforms": statistics.mean(r["uniforms"] for r in records),
+        "triangles": statistics.mean(r["triangles"] for r in records),
+        "uploads": statistics.mean(r["uploads"] for r in records),
+    }
+
+
+def compare_frames(frames, baseline, metrics=("draw_calls", "state_changes", "triangles")):
+    """(path, frame, metric, base, new) for every frame whose counts differ from the baseline's."""
+    rows = []
+    for name, records in frames.items():
+        base_records = baseline.get(name, [])
+        for new, base in zip(records, base_records):
+            for metric in metrics:
+                if new.get(metric) != base.get(metric):
+                    rows.append((name, new["frame"], metric, base.get(metric), new.get(metric)))
+    return rows
+
+
+def format_report(results):
+    lines = [f"{'path':<24}{'submit':>10}{'p95':>10}{'finish':>10}{'draws':>8}{'states':>8}{'uniforms':>10}{'triangles':>12}"]
+    for name, r in results.items():
+        lines.append(f"{name:<24}{r['median_s'] * 1000:8.2f}ms{r['p95_submit_ms']:8.2f}ms{r['median_finish_ms']:8.2f}ms"
+                     f"{r['draw_calls']:8.0f}{r['state_changes']:8.0f}{r['uniforms']:10.0f}{r['triangles']:12.0f}")
+    return "\n".join(lines)
+
+
+COMPARED_METRICS = ("median_s", "draw_calls", "state_changes", "uniforms", "triangles")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.render", description="Headless render benchmark")
+    parser.add_argument("-k", "--filter", default="*", help="glob over path names: " + ", ".join(PATHS))
+    parser.add_argument("--frames", type=int, default=120, help="measured frames per path")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured frames first (shader compiles, uploads)")
+    parser.add_argument("--size", type=int, nargs=2, default=(1280, 720), metavar=("W", "H"))
+    parser.add_argument("--city", type=float, default=400.0, help="city width and depth")
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=CITY_SEED)
+    parser.add_argument("--backend", default="auto", choices=("auto", "egl", "osmesa", "glfw"))
+    parser.add_argument("-o", "--output", default=None, help="write results and per-frame records as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed growth before flagging (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    paths = [name for name in PATHS if fnmatch.fnmatch(name, args.filter)]
+    if not paths:
+        print(f"[Benchmarks] No camera path matches '{args.filter}'")
+        return 2
+
+    # 1. Context before anything imports OpenGL.GL
+    width, height = args.size
+    context = create_context(width, height, backend=args.backend)
+    print(f"[Benchmarks] {context.backend}: {context.renderer_name()}")
+    from .gl_counters import GLCallCounter
+
+    # 2. Scene
+    renderer, camera, manager, config = build_scene(width, height, args.city, args.agents, args.seed)
+    counter = GLCallCounter()
+    counter.install()
+
+    # 3. Paths
+    results, frames = {}, {}
+    try:
+        for name in paths:
+            print(f"[Benchmarks] render[{name}] ...", flush=True)
+            records = run_path(name, args.frames, args.warmup, renderer, camera, manager, config,
+                               counter, args.city, args.seed, dt=1.0 / 60.0)
+            key = f"render[{name}]"
+            frames[key] = records
+            results[key] = summarize(records)
+    finally:
+        counter.uninstall()
+        renderer.delete()
+        context.delete()
+    print(format_report(results))
+
+    meta = environment()
+    meta.update({"backend": context.backend, "size": [width, height], "city": args.city,
+                 "agents": args.agents, "seed": args.seed, "frames": args.frames, "warmup": args.warmup})
+    if args.output:
+        save(args.output, results, meta, frames=frames)
+
+    # 4. Compare: aggregates against the threshold, then frame-by-frame counts
+    if args.compare:
+        rows = compare(results, load(args.compare), args.threshold, metrics=COMPARED_METRICS)
+        print(format_comparison(rows))
+        changed = compare_frames(frames, load(args.compare, key="frames"))
+        if changed:
+            print(f"[Benchmarks] {len(changed)} frame count(s) differ from the baseline, first ones:")
+            for name, frame, metric, base, new in changed[:20]:
+                print(f"  {name} frame {frame}: {metric} {base} -> {new}")
+        regressions = [r for r in rows if r[5]]
+        if regressions:
+            print(f"[Benchmarks] {len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+The benchmark scenarios. Everything here is CPU-only: no window, GL context or textures.
+"""
+import random
+from pyglm import glm
+
+from framework.utils.advanced_city_generator import AdvancedCityGenerator
+from framework.utils.city_generator import CityGenerator
+from framework.utils.car_agent import CarAgent
+from framework.utils.routing import RoutingService
+from framework.utils.mesh_batcher import MeshBatcher
+from framework.utils.grid_point_cloud_generator import GridPointCloudGenerator
+from framework.utils.l_system import LSystem, expand, _expand
+from framework.shapes.uvsphere import UVSphere
+from framework.shapes.cube import Cube
+
+from .harness import Benchmark
+
+# Texture names only group the buildings; no image is loaded
+TEXTURES = ["facade_a.png", "facade_b.png", "facade_c.png", "facade_d.png"]
+CITY_SEED = 7
+SIM_CITY_SIZE = 400.0
+DT = 0.016
+
+_layouts = {}
+
+
+def city_layout(size):
+    """Generated once per size and process: other scenarios only read it."""
+    if size not in _layouts:
+        random.seed(CITY_SEED)
+        layout = AdvancedCityGenerator(width=size, depth=size, seed=CITY_SEED)
+        layout.generate(texture_list=TEXTURES)
+        _layouts[size] = layout
+    return _layouts[size]
+
+
+def city_graph(size):
+    """A fresh graph (agents register on its lanes, so it is not shared)."""
+    city = CityGenerator()
+    city.build_graph_from_layout(city_layout(size), seed=CITY_SEED)
+    return city
+
+
+# ----------------------------
+# Generation
+# ----------------------------
+def _generate(size):
+    def run(_):
+        layout = AdvancedCityGenerator(width=size, depth=size, seed=CITY_SEED)
+        layout.generate(texture_list=TEXTURES)
+        return {"buildings": len(layout.buildings), "roads": len(layout.roads)}
+    return run
+
+
+def _build_graph(size):
+    def run(layout):
+        city = CityGenerator()
+        city.build_graph_from_layout(layout, seed=CITY_SEED)
+        return {"nodes": len(city.graph.nodes), "edges": len(city.graph.edges)}
+    return run
+
+
+def _graph_arrays(city):
+    graph = city.graph
+    graph.invalidate()
+    arrays = graph.arrays()
+    return {"lanes": len(arrays.lane_ids), "turns": len(arrays.turn_to)}
+
+
+def _spatial_queries(count):
+    def run(city):
+        graph = city.graph
+        hits = 0
+        for _ in range(count):
+            x, y = random.uniform(-200.0, 200.0), random.uniform(-200.0, 200.0)
+            graph.get_nearest_node(x, y, 50.0)
+            hits += graph.get_nearest_lane(x, y) is not None
+        return {"queries": count, "lane_hits": hits}
+    return run
+
+
+def _routing(count, landmarks):
+    def setup():
+        city = city_graph(SIM_CITY_SIZE)
+        router = RoutingService(city.graph, landmarks=landmarks)
+        router.tree(city.graph.edges[0].lanes[0])  # Arrays and landmarks built outside the timing
+        lanes = [lane for edge in city.graph.edges for lane in edge.lanes]
+        return router, [(random.choice(lanes), random.choice(lanes)) for _ in range(count)]
+
+    def run(inputs):
+        router, queries = inputs
+        if landmarks:
+            routes = [router.route(start, destination) for start, destination in queries]
+        else:
+            routes = router.routes(queries)
+        return {"queries": count, "routed": sum(r is not None for r in routes)}
+    return setup, run
+
+
+# ----------------------------
+# Simulation
+# ----------------------------
+def _spawn_agent(lanes):
+    agent = CarAgent(random.choice(lanes), is_reckless=random.random() < 0.2, with_mesh=False)
+    # Spread along the lane instead of stacking every car on its first waypoint
+    if len(agent.path) > 2:
+        k = random.randrange(len(agent.path) - 1)
+        agent.position = glm.vec3(agent.path[k])
+        agent.target_index = k + 1
+    return agent
+
+
+def _spawn(city, count):
+    lanes = [lane for edge in city.graph.edges for lane in getattr(edge, "lanes", []) if lane.waypoints]
+    return [_spawn_agent(lanes) for _ in range(count)], lanes
+
+
+def _simulate(agents, steps):
+    def setup():
+        city = city_graph(SIM_CITY_SIZE)
+        population, lanes = _spawn(city, agents)
+        return city, population, lanes
+
+    def run(inputs):
+        # Same order as CityManager.update, without rendering
+        city, population, lanes = inputs
+        for _ in range(steps):
+            for node in city.graph.nodes:
+                node.update(DT)
+            for agent in population:
+                agent.update(DT)
+            # Keep the population constant: replace despawned agents
+            for i, agent in enumerate(population):
+                if not agent.alive:
+                    population[i] = _spawn_agent(lanes)
+        return {"steps": steps}
+    return setup, run
+
+
+# ----------------------------
+# Geometry
+# ----------------------------
+def _batch_buildings(layout):
+    batchers = {name: MeshBatcher() for name in TEXTURES}
+    batchers["default"] = MeshBatcher()
+    for shape in layout.buildings:
+        batchers.get(getattr(shape, "texture_name", "default"), batchers["default"]).add_shape(shape)
+    infra = MeshBatcher()
+    for shape in layout.roads + layout.sidewalks + getattr(layout, "parks", []):
+        infra.add_shape(shape)
+    batchers["infra"] = infra
+    shapes = [b.concatenate() for b in batchers.values()]
+    return {"vertices": sum(len(s.vertices) for s in shapes if s is not None)}
+
+
+def _batch_instances(count):
+    def setup():
+        cube = Cube(side_length=1.0)
+        cube.createGeometry()
+        transforms = [glm.translate(glm.vec3(random.uniform(-100, 100), 0, random.uniform(-100, 100))) for _ in range(count)]
+        return cube, transforms
+
+    def run(inputs):
+        cube, transforms = inputs
+        batcher = MeshBatcher()
+        batcher.add_instances(cube, transforms)
+        return {"vertices": len(batcher.concatenate().vertices)}
+    return setup, run
+
+
+def _optimize_buildings(layout):
+    batcher = MeshBatcher()
+    for shape in layout.buildings:
+        batcher.add_shape(shape)
+    chunks = batcher.optimize(split=True)
+    return {"chunks": len(chunks)}
+
+
+def _point_cloud(spacing):
+    def setup():
+        sphere = UVSphere(radius=5.0, stacks=32, slices=64)
+        sphere.createGeometry()
+        return sphere
+
+    def run(sphere):
+        cloud = GridPointCloudGenerator.generate(sphere, spacing=spacing)
+        return {"points": len(cloud.vertices)}
+    return setup, run
+
+
+# ----------------------------
+# L-systems
+# ----------------------------
+LSYSTEM_RULES = {"F": "F[+F][-F][&F][^F]"}
+
+
+def _l_system_expand(iterations):
+    def run(_):
+        s = expand("F", LSYSTEM_RULES, iterations)
+        return {"symbols": len(s)}
+    return run
+
+
+def _l_system_interpret(iterations, limit):
+    def run(lsys):
+        transforms = lsys.interpret_array(lsys.iter_symbols(iterations), max_points=limit)
+        return {"transforms": len(transforms)}
+    return run
+
+
+def _l_system_setup():
+    # expand() is memoized: start every repetition cold
+    _expand.cache_clear()
+    return LSystem(axiom="F", rules=LSYSTEM_RULES, length=2.0, angle_range=(20.0, 40.0))
+
+
+def all_benchmarks(quick=False):
+    """Every scenario; quick=True keeps the small sizes only (for a fast local check)."""
+    city_sizes = [200.0, 400.0] if quick else [200.0, 400.0, 800.0]
+    sim_agents = [(100, 50), (1000, 10)] if quick else [(100, 200), (1000, 50), (10000, 10)]
+    repeat = 3 if quick else 5
+
+    benches = []
+    for size in city_sizes:
+        benches.append(Benchmark(f"city_generate[{int(size)}]", _generate(size), repeat=max(1, repeat - 2)))
+        benches.append(Benchmark(f"graph_build[{int(size)}]", _build_graph(size),
+                                 setup=lambda size=size: city_layout(size), repeat=repeat))
+        benches.append(Benchmark(f"graph_arrays[{int(size)}]", _graph_arrays,
+                                 setup=lambda size=size: city_graph(size), repeat=repeat))
+
+    benches.append(Benchmark("spatial_queries[400]", _spatial_queries(1000),
+                             setup=lambda: city_graph(400.0), repeat=repeat))
+
+    for name, landmarks in (("routing_batch", 0), ("routing_alt", 8)):
+        setup, run = _routing(1000, landmarks)
+        benches.append(Benchmark(f"{name}[1000]", run, setup=setup, repeat=repeat))
+
+    for agents, steps in sim_agents:
+        setup, run = _simulate(agents, steps)
+        benches.append(Benchmark(f"simulate[{agents}x{steps}]", run, setup=setup, repeat=repeat))
+
+    benches.append(Benchmark("batch_buildings[400]", _batch_buildings, setup=lambda: city_layout(400.0), repeat=repeat))
+    benches.append(Benchmark("optimize_buildings[400]", _optimize_buildings, setup=lambda: city_layout(400.0), repeat=repeat))
+    for count in ([1000] if quick else [1000, 10000]):
+        setup, run = _batch_instances(count)
+        benches.append(Benchmark(f"batch_instances[{count}]", run, setup=setup, repeat=repeat))
+
+    for spacing in ([0.4] if quick else [0.4, 0.2]):
+        setup, run = _point_cloud(spacing)
+        benches.append(Benchmark(f"point_cloud[{spacing}]", run, setup=setup, repeat=repeat))
+
+    for iterations in ([5] if quick else [5, 7]):
+        benches.append(Benchmark(f"l_system_expand[{iterations}]", _l_system_expand(iterations),
+                                 setup=_l_system_setup, repeat=repeat))
+        benches.append(Benchmark(f"l_system_interpret[{iterations}]", _l_system_interpret(iterations, 2000),
+                                 setup=_l_system_setup, repeat=repeat))
+    return benches
@@ -1,14 +1,21 @@
 import os
 import random
+import time
 import glm
 import OpenGL.GL as gl
 from framework.utils.city_generator import CityGenerator
 from framework.utils.advanced_city_generator import AdvancedCityGenerator
 from framework.utils.mesh_generator import MeshGenerator
 from framework.utils.mesh_batcher import MeshBatcher
-from framework.utils.car_agent import CarAgent
+from framework.utils.agent_pool import AgentPool
+from framework.utils.city_cache import CityCache
+from framework.utils.profiler import profiler
+from framework.utils.gpu_resources import gpu_resources
+from framework.utils.vehicle_prototypes import VehiclePrototypeCache
+from framework.utils.routing import RoutingService
 from framework.shapes.cube import Cube
 from framework.objects import MeshObject
+from framework.objects.street_light_layer import StreetLightLayer
 from framework.materials import Material, Texture
 
 # Car Imports
@@ -23,8 +30,10 @@ from framework.shapes.cars.tank import Tank
 from framework.shapes.cars.truck import Truck
 from framework.shapes.cars.van import Van
 
+CAR_TYPES = [Ambulance, Bus, CyberpunkCar, Pickup, PoliceCar, Sedan, SUV, Tank, Truck, Van]
+
 class CityManager:
-    def __init__(self, renderer, texture_dir=None):
+    def __init__(self, renderer, texture_dir=None, cache_dir=None, use_cache=True):
         self.renderer = renderer
         
         if texture_dir is None:
@@ -36,6 +45,13 @@ class CityManager:
         self.city_gen = CityGenerator()
         self.mesh_gen = MeshGenerator()
         
+        # On-disk city cache (default: ~/.cache/bk7084/cities)
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "bk7084", "cities")
+        self.city_cache = CityCache(cache_dir) if use_cache else None
+        self.layout = None
+        self.seed = None
+        
         self.agents = []
         self.crash_events = []
         
@@ -44,10 +60,25 @@ class CityManager:
         self.building_meshes = []
         self.signal_mesh = None
         self.crash_meshes = []
+        self.street_lights = None
+        self.street_lights_lit = False
         
         # Optimization: Shared Crash Shape
         self.crash_shape = Cube(side_length=2.5, color=glm.vec4(1.0, 0.0, 0.0, 1.0))
         self.crash_shape.createGeometry()
+        gpu_resources.retain(self.crash_shape)
+        # Unlit material shared by the signal overlay and the wrecks (created with the first use)
+        self.overlay_material = None
+        # Merged vehicle meshes shared by all agents; kept across regenerations
+        self.vehicle_prototypes = VehiclePrototypeCache()
+        # Dead agents are recycled (with their render slot) instead of rebuilt
+        self.agent_pool = AgentPool(renderer, self.vehicle_prototypes)
+        # Spawns per frame continue until the population is reached or this much time is spent
+        self.spawn_budget_ms = 1.0
+        # Destinations and routes for new agents (per city graph). Spawning only uses
+        # shortest-path trees; ALT landmarks only pay off for one-off router.route() calls
+        self.router = None
+        self.router_landmarks = 0
         
         self.found_textures = self._scan_textures()
         
@@ -58,43 +89,94 @@ class CityManager:
         return found
 
     def regenerate_world(self, visuals, config, width=400, depth=400):
-        self.regenerate(width, depth, self.found_textures, self.texture_dir)
+        if config.random_seed:
+            config.city_seed = random.getrandbits(31)
+        self.regenerate(width, depth, self.found_textures, self.texture_dir, seed=config.city_seed)
         visuals.regenerate_clouds(15)
         visuals.regenerate_holograms(config.target_hologram_count)
     
-    def regenerate(self, width, depth, texture_list, texture_dir):
-        # Cleanup
+    def regenerate(self, width, depth, texture_list, texture_dir, seed=None):
+        """
+        Builds (or reloads from the city cache) the city for the given seed.
+        seed=None picks a fresh random seed.
+        """
+        if seed is None:
+            seed = random.getrandbits(31)
+        self.seed = seed
+        
+        # Cleanup: remove from the renderer and release the GL objects
         for obj in self.static_objects:
-             if obj in self.renderer.objects: self.renderer.objects.remove(obj)
+            self._drop_object(obj)
         self.static_objects = []
         
         for obj in self.building_meshes:
-             if obj in self.renderer.objects: self.renderer.objects.remove(obj)
+            self._drop_object(obj)
         self.building_meshes = []
         
         for a in self.agents:
-            if a.mesh_object in self.renderer.objects: self.renderer.objects.remove(a.mesh_object)
+            self._drop_agent(a)
         self.agents = []
         
-        if self.signal_mesh and self.signal_mesh in self.renderer.objects:
-            self.renderer.objects.remove(self.signal_mesh)
+        self._drop_object(self.signal_mesh)
         self.signal_mesh = None
         
-        for obj in self.crash_meshes:
-            if obj in self.renderer.objects: self.renderer.objects.remove(obj)
-        self.crash_meshes = []
+        self.clear_wrecks()
+        
+        if self.street_lights is not None:
+            self._set_street_lights_lit(False)
+            if self.street_lights in self.renderer.objects: self.renderer.objects.remove(self.street_lights)
+            self.street_lights.delete()
+        self.street_lights = None
+        
+        layout_gen = AdvancedCityGenerator(width=width, depth=depth, seed=seed)
+        
+        cached = None
+        cache_key = None
+        if self.city_cache is not None:
+            cache_key = self.city_cache.make_key(seed, {**layout_gen.get_params(), "textures": sorted(texture_list)})
+            cached = self.city_cache.load(cache_key, seed=seed)
+        
+        if cached is not None:
+            print(f"Loaded city {seed} from cache.")
+            self.layout = cached.layout
+            self.city_gen.seed = seed
+            self.city_gen.graph = cached.graph
+            self.city_gen.dead_end_lanes = cached.dead_end_lanes
+            batches = cached.batches
+        else:
+            # 1. Generate Layout
+            print(f"Generating BSP Layout (seed {seed})...")
+            layout_gen.generate(texture_list=texture_list)
+            self.layout = layout_gen
+            
+            # 2. Build Graph
+            print("Building Traffic Graph...")
+            self.city_gen.build_graph_from_layout(layout_gen, seed=seed)
+            
+            # 3. Merge static geometry
+            batches = self._collect_static_batches(layout_gen, texture_list)
+            # Pack once: the cache stores and the GPU receives the same interleaved vertices
+            for _, shape in batches:
+                shape.interleaved = shape.packCompact()
+            
+            if self.city_cache is not None:
+                self.city_cache.save(cache_key, layout_gen, self.city_gen, batches)
         
-        # 1. Generate Layout
-        print("Generating BSP Layout...")
-        adv_gen = AdvancedCityGenerator(width=width, depth=depth)
-        adv_gen.generate(texture_list=texture_list)
+        # 3b. Upload Visuals
+        self._upload_static_batches(batches, texture_dir)
         
-        # 2. Build Graph
-        print("Building Traffic Graph...")
-        self.city_gen.build_graph_from_layout(adv_gen)
+        # 3c. Street Lights: one mesh, one instance buffer, culled per tile
+        self.street_lights = StreetLightLayer(self.layout.street_light_poses)
+        self.renderer.addObject(self.street_lights)
+        self._set_street_lights_lit(True)
+        print(f"Street lights: {self.street_lights.amount} in {self.street_lights.tile_count()} tiles")
         
-        # 3. Batch Visuals
-        self._batch_static_geometry(adv_gen, texture_list, texture_dir)
+        # 3d. Vehicle prototypes (built once per process, so spawning never uploads)
+        self.vehicle_prototypes.warm(CAR_TYPES)
+        print(f"Vehicles: {self.vehicle_prototypes.stats()}")
+
+        # 3e. Routing over the new graph (trees are built on demand)
+        self.router = RoutingService(self.city_gen.graph, landmarks=self.router_landmarks, seed=seed)
         
         # 4. Debug Lines
         print("Generating Traffic Debug...")
@@ -114,32 +196,54 @@ class CityManager:
             self._batch_failures()
             
         print(f"City Generated. Nodes: {len(self.city_gen.graph.nodes)}, Edges: {len(self.city_gen.graph.edges)}")
+        print(f"[GpuResources] {gpu_resources.stats()}")
+
+    def _drop_object(self, obj):
+        """Removes a renderable from the renderer and releases its GL objects."""
+        if obj is None:
+            return
+        if obj in self.renderer.objects:
+            self.renderer.objects.remove(obj)
+        obj.delete()
+
+    def _drop_agent(self, agent):
+        self.agent_pool.release(agent)
+
+    def _get_overlay_material(self):
+        if self.overlay_material is None:
+            self.overlay_material = gpu_resources.retain(Material())
+            self.overlay_material.uniforms = {"ambientStrength": 1.0, "diffuseStrength": 0.0, "specularStrength": 0.0}
+        return self.overlay_material
+
+    def clear_wrecks(self):
+        """Removes the crash markers; returns how many there were."""
+        count = len(self.crash_meshes)
+        for obj in self.crash_meshes:
+            self._drop_object(obj)
+        self.crash_meshes = []
+        return count
 
-    def _batch_static_geometry(self, adv_gen, texture_list, texture_dir):
+    def _collect_static_batches(self, adv_gen, texture_list):
+        """
+        Merges roads/sidewalks and buildings (grouped by texture) into CPU-side Shapes.
+        Returns a list of (name, Shape); "infra" holds roads and sidewalks.
+        """
         print("Batching Visuals (BSP)...")
+        batches = []
+        
         # Infra
         batcher_infra = MeshBatcher()
         for shape in adv_gen.roads: batcher_infra.add_shape(shape)
         for shape in adv_gen.sidewalks: batcher_infra.add_shape(shape)
         for shape in getattr(adv_gen, 'parks', []): batcher_infra.add_shape(shape) 
         
-        city_mesh = batcher_infra.build(Material())
-        if city_mesh: 
-            self.static_objects.append(city_mesh)
-            self.renderer.addObject(city_mesh) # Add immediately
+        infra_shape = batcher_infra.concatenate()
+        if infra_shape:
+            batches.append(("infra", infra_shape))
         
         # Buildings
         print("Batching Buildings (BSP)...")
-        texture_cache = {}
-        batchers = {}
-        self.building_meshes = [] # New list for buildings
-        
-        for t_name in texture_list:
-            batchers[t_name] = MeshBatcher()
-            path = os.path.join(texture_dir, t_name)
-            if os.path.exists(path):
-                texture_cache[t_name] = Texture(file_path=path)
-        
+        batchers = {t_name: MeshBatcher() for t_name in texture_list}
         batchers["default"] = MeshBatcher()
         
         for shape in adv_gen.buildings:
@@ -148,20 +252,54 @@ class CityManager:
             else: batchers["default"].add_shape(shape)
             
         for t_name, batcher in batchers.items():
-            if len(batcher.vertices) == 0: continue
+            shape = batcher.concatenate()
+            if shape:
+                batches.append((t_name, shape))
+        return batches
+
+    def _upload_static_batches(self, batches, texture_dir):
+        """
+        Creates GL buffers, textures and materials for merged static Shapes and adds them to the renderer.
+        """
+        self.building_meshes = [] # New list for buildings
+        vertex_count = 0
+        compact_bytes = 0
+        float_bytes = 0
+        
+        for name, shape in batches:
+            # Static city geometry is the bulk of vertex memory: use the interleaved quantized layout.
+            # shape.interleaved is already packed (mapped from the cache, or in regenerate), so this
+            # uploads it without another copy.
+            shape.createBuffers(compact=True)
+            # Same attributes as separate float32 buffers: vec4 position, vec3 normal, vec4 colour, vec2 uv
+            names = shape.interleaved.dtype.names if shape.interleaved is not None else ()
+            float_stride = 16 + sum(4 * comps for attr, comps in (("normal", 3), ("color", 4), ("uv", 2)) if attr in names)
+            count = len(shape.vertices)
+            vertex_count += count
+            compact_bytes += shape.vertex_stride * count
+            float_bytes += float_stride * count
+            
+            if name == "infra":
+                city_mesh = MeshObject(shape, Material())
+                self.static_objects.append(city_mesh)
+                self.renderer.addObject(city_mesh) # Add immediately
+                continue
             
-            mat = Material()
-            if t_name in texture_cache:
-                mat = Material(color_texture=texture_cache[t_name])
+            path = os.path.join(texture_dir, name)
+            if name != "default" and os.path.exists(path):
+                mat = Material(color_texture=Texture(file_path=path))
                 mat.specular_strength = 0.1
                 mat.texture_scale = glm.vec2(1.0, 1.0)
             else:
+                mat = Material()
                 mat.specular_strength = 0.5
                 
-            mesh = batcher.build(mat)
-            if mesh: 
-                self.building_meshes.append(mesh)
-                self.renderer.addObject(mesh) # Default show
+            mesh = MeshObject(shape, mat)
+            self.building_meshes.append(mesh)
+            self.renderer.addObject(mesh) # Default show
+
+        print(f"Static batches: {len(batches)} meshes, {vertex_count} vertices, {compact_bytes / 1e6:.1f} MB of vertices "
+              f"in the compact layout ({(float_bytes - compact_bytes) / 1e6:.1f} MB less than float32)")
 
     def _batch_failures(self):
         batcher = MeshBatcher()
@@ -183,73 +321,105 @@ class CityManager:
 
     def update(self, dt, config):
         # 1. Update Nodes
-        for node in self.city_gen.graph.nodes:
-            node.update(dt)
+        with profiler.scope("nodes"):
+            for node in self.city_gen.graph.nodes:
+                node.update(dt)
             
         # 2. Maintain Population
-        car_types = [Ambulance, Bus, CyberpunkCar, Pickup, PoliceCar, Sedan, SUV, Tank, Truck, Van]
-        self.maintain_population(config.target_agent_count, car_types, config.reckless_chance)
+        with profiler.scope("population"):
+            self.maintain_population(config.target_agent_count, CAR_TYPES, config.reckless_chance, config.use_routing)
         
         # 3. Update Agents
-        alive_agents = []
-        for agent in self.agents:
-             if agent.alive:
-                 agent.update(dt, config.print_stuck_debug, config.print_despawn_debug)
-                 alive_agents.append(agent)
-             else:
-                 if agent.mesh_object in self.renderer.objects:
-                     self.renderer.objects.remove(agent.mesh_object)
-        self.agents = alive_agents
+        with profiler.scope("agents"):
+            alive_agents = []
+            for agent in self.agents:
+                 if agent.alive:
+                     agent.update(dt, config.print_stuck_debug, config.print_despawn_debug)
+                     alive_agents.append(agent)
+                 else:
+                     if agent.arrived:
+                         config.total_arrivals += 1
+                     self._drop_agent(agent)
+            self.agents = alive_agents
         
         # 4. Signals
-        self._update_signals()
+        with profiler.scope("signals"):
+            self._update_signals()
         
         # 5. Crashes
-        self.detect_crashes(config)
-        self._update_crash_visuals()
-        
-        # 6. Building Visibility
-        for mesh in self.building_meshes:
-            is_in = mesh in self.renderer.objects
-            if config.show_buildings and not is_in:
-                self.renderer.addObject(mesh)
-            elif not config.show_buildings and is_in:
-                self.renderer.objects.remove(mesh)
+        with profiler.scope("crashes"):
+            self.detect_crashes(config)
+            self._update_crash_visuals()
+        
+        with profiler.scope("visibility"):
+            # 6. Street Light Visibility
+            if self.street_lights is not None:
+                self.street_lights.visible = config.show_street_lights
+                if self.street_lights_lit != config.show_street_lights:
+                    self._set_street_lights_lit(config.show_street_lights)
+            
+            # 7. Building Visibility
+            for mesh in self.building_meshes:
+                is_in = mesh in self.renderer.objects
+                if config.show_buildings and not is_in:
+                    self.renderer.addObject(mesh)
+                elif not config.show_buildings and is_in:
+                    self.renderer.objects.remove(mesh)
+
+    def _set_street_lights_lit(self, lit):
+        """Adds/removes the street lamps' local PointLights to/from the renderer (clustered shading)."""
+        if lit == self.street_lights_lit:
+            return
+        if lit:
+            self.renderer.lights.extend(self.street_lights.lights)
+        else:
+            sources = set(map(id, self.street_lights.lights))
+            self.renderer.lights[:] = [l for l in self.renderer.lights if id(l) not in sources]
+        self.street_lights_lit = lit
 
-    def maintain_population(self, target_count, car_types, reckless_chance):
+    def maintain_population(self, target_count, car_types, reckless_chance, use_routing=False):
         # Despawn excess
         while len(self.agents) > target_count:
-            removed = self.agents.pop()
-            if removed.mesh_object in self.renderer.objects:
-                self.renderer.objects.remove(removed.mesh_object)
-        
-        # Spawn new
-        if len(self.agents) < target_count:
-            if self.city_gen.graph.edges:
-                edge = random.choice(self.city_gen.graph.edges)
-                if hasattr(edge, 'lanes') and edge.lanes:
-                    lane = random.choice(edge.lanes)
-                    
-                    is_reckless = (random.random() < reckless_chance)
-                    CarClass = random.choice(car_types)
-                    car_shape = CarClass()
-                    # car_shape.create_geometry() # init does this
-                    
-                    ag = CarAgent(lane, car_shape=car_shape, is_reckless=is_reckless)
-                    self.agents.append(ag)
-                    self.renderer.addObject(ag.mesh_object)
+            self._drop_agent(self.agents.pop())
+        
+        # Spawn new: as many as fit in the time budget (at least one per frame)
+        if len(self.agents) >= target_count or not self.city_gen.graph.edges:
+            return
+        deadline = time.perf_counter() + self.spawn_budget_ms / 1000.0
+        spawned = []
+        while len(self.agents) < target_count:
+            edge = random.choice(self.city_gen.graph.edges)
+            if hasattr(edge, 'lanes') and edge.lanes:
+                lane = random.choice(edge.lanes)
+                
+                is_reckless = (random.random() < reckless_chance)
+                CarClass = random.choice(car_types)
+                agent = self.agent_pool.acquire(lane, is_reckless, CarClass)
+                self.agents.append(agent)
+                spawned.append(agent)
+            if time.perf_counter() >= deadline:
+                break
+
+        # Destinations for this frame's spawns, routed in one batch
+        if use_routing and spawned and self.router is not None:
+            queries = []
+            for agent in spawned:
+                destination = self.router.random_destination(agent.current_lane)
+                if destination is not None:
+                    queries.append((agent, destination))
+            routes = self.router.routes([(a.current_lane, d) for a, d in queries])
+            for (agent, _), route in zip(queries, routes):
+                agent.set_route(route)
 
     def _update_signals(self):
         signal_shape = self.mesh_gen.generate_dynamic_signals(self.city_gen.graph)
         
-        if self.signal_mesh:
-             if self.signal_mesh in self.renderer.objects: self.renderer.objects.remove(self.signal_mesh)
-             self.signal_mesh = None
+        # The previous overlay's buffers are released; the material is shared and kept
+        self._drop_object(self.signal_mesh)
+        self.signal_mesh = None
              
         if len(signal_shape.vertices) > 0:
-             mat = Material()
-             mat.uniforms = {"ambientStrength": 1.0, "diffuseStrength": 0.0, "specularStrength": 0.0}
-             self.signal_mesh = MeshObject(signal_shape, mat)
+             self.signal_mesh = MeshObject(signal_shape, self._get_overlay_material())
              self.signal_mesh.draw_mode = gl.GL_LINES
              self.renderer.addObject(self.signal_mesh)
 
@@ -303,9 +473,7 @@ class CityManager:
         
         if self.crash_events:
             for pos in self.crash_events:
-                mat = Material()
-                mat.uniforms = {"ambientStrength": 1.0, "diffuseStrength": 0.0, "specularStrength": 0.0}
-                crash_obj = MeshObject(self.crash_shape, mat)
+                crash_obj = MeshObject(self.crash_shape, self._get_overlay_material())
                 crash_obj.transform = glm.translate(pos)
                 
                 self.renderer.addObject(crash_obj)
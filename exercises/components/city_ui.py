@@ -1,5 +1,7 @@
 import imgui
 import random
+from framework.utils.profiler import profiler
+from framework.utils.gpu_resources import gpu_resources
 
 class CityUI:
     def __init__(self, config, manager, visuals, renderer, camera_ctrl):
@@ -8,6 +10,7 @@ class CityUI:
         self.visuals = visuals
         self.renderer = renderer
         self.camera_ctrl = camera_ctrl
+        self.show_gpu_resources = False
 
     def draw(self):
         """
@@ -18,7 +21,13 @@ class CityUI:
         if imgui.button("Regenerate"):
             self.manager.regenerate_world(self.visuals, self.config)
             
+        _, self.config.random_seed = imgui.checkbox("Random Seed", self.config.random_seed)
+        if not self.config.random_seed:
+            _, self.config.city_seed = imgui.input_int("City Seed", self.config.city_seed)
+        imgui.text(f"Seed: {self.manager.seed}")
+            
         imgui.text(f"Total Crashes: {self.config.total_crashes}")
+        imgui.text(f"Arrivals: {self.config.total_arrivals}")
             
         _, self.config.num_cars_to_brake = imgui.input_int("Num to Brake", self.config.num_cars_to_brake)
         if imgui.button("Brake Random Cars"):
@@ -34,14 +43,11 @@ class CityUI:
             print("[USER] Released all manual brakes.")
             
         _, self.config.reckless_chance = imgui.slider_float("Reckless %", self.config.reckless_chance, 0.0, 1.0)
+        _, self.config.use_routing = imgui.checkbox("Route To Destinations", self.config.use_routing)
         
         if imgui.button("Clear Wrecks"):
              # Cleanup specific to crash meshes managed by CityManager
-             count = len(self.manager.crash_meshes)
-             for obj in self.manager.crash_meshes:
-                 if obj in self.renderer.objects:
-                     self.renderer.objects.remove(obj)
-             self.manager.crash_meshes.clear()
+             count = self.manager.clear_wrecks()
              print(f"[USER] Cleared {count} wrecks.")
  
         _, self.config.target_agent_count = imgui.slider_int("Car Count", self.config.target_agent_count, 0, 50)
@@ -55,12 +61,47 @@ class CityUI:
         imgui.separator()
             
         _, self.config.show_buildings = imgui.checkbox("Show Buildings", self.config.show_buildings)
+        _, self.config.show_street_lights = imgui.checkbox("Show Street Lights", self.config.show_street_lights)
+        if self.manager.street_lights is not None and self.config.show_street_lights:
+            sl = self.manager.street_lights
+            imgui.text(f"  {sl.drawn_instances}/{sl.amount} lights, {sl.draw_calls} draws, {sl.tile_count()} tiles")
+            lc = self.manager.renderer.light_clusters
+            if lc is not None:
+                imgui.text(f"  {lc.visible_light_count}/{lc.local_light_count} lit, {lc.assignments} cluster refs, {lc.overflow} dropped")
         _, self.config.show_clouds = imgui.checkbox("Show Clouds", self.config.show_clouds)
         _, self.config.show_holograms = imgui.checkbox("Show Holograms", self.config.show_holograms)
         _, self.config.show_skybox = imgui.checkbox("Show Skybox", self.config.show_skybox)
         _, self.config.crash_debug = imgui.checkbox("Crash Debug", self.config.crash_debug)
         _, self.config.print_stuck_debug = imgui.checkbox("Print Stuck Debug", self.config.print_stuck_debug)
         _, self.config.print_despawn_debug = imgui.checkbox("Print Despawn Debug", self.config.print_despawn_debug)
+
+        imgui.separator()
+        _, profiler.enabled = imgui.checkbox("Profiler", profiler.enabled)
+        if profiler.enabled:
+            profiler.draw_imgui()
+            if imgui.button("Save Trace"):
+                profiler.write_csv("profile.csv")
+                profiler.write_json("profile.json")
+
+        _, self.show_gpu_resources = imgui.checkbox("GPU Resources", self.show_gpu_resources)
+        if self.show_gpu_resources:
+            gpu_resources.draw_imgui()
+            if imgui.button("Print Report"):
+                gpu_resources.print_report()
+
+        dyn = self.renderer.dynamic_resolution
+        if dyn is not None:
+            imgui.separator()
+            _, dyn.enabled = imgui.checkbox("Dynamic Resolution", dyn.enabled)
+            if dyn.enabled:
+                _, dyn.target_ms = imgui.slider_float("Target GPU ms", dyn.target_ms, 4.0, 50.0)
+            else:
+                changed, scale = imgui.slider_float("Render Scale", self.renderer.render_scale, 0.25, 1.0)
+                if changed:
+                    self.renderer.set_render_scale(scale)
+            w, h = self.renderer.target_size
+            gpu = f"{dyn.timer.last_ms:.1f} ms" if dyn.timer.last_ms is not None else "-"
+            imgui.text(f"  {w}x{h} ({self.renderer.render_scale * 100:.0f}%), GPU {gpu}" + (", CPU-bound" if dyn.cpu_bound else ""))
             
         imgui.text(f"Nodes: {len(self.manager.city_gen.graph.nodes)}")
         imgui.text(f"Edges: {len(self.manager.city_gen.graph.edges)}")
@@ -2,22 +2,27 @@ import random
 import glm
 import glfw
 from framework.objects.skybox import Skybox
-from framework.objects.cloud import Cloud
+from framework.objects.cloud_field import CloudField
 from framework.utils.holograms_3d import Holograms3D, HologramConfig
+from framework.utils.geometry_cache import geometry_cache
 
 class CityVisuals:
     def __init__(self, renderer):
         self.renderer = renderer
         self.skybox = Skybox(time_scale=1.0)
-        self.clouds = []
+        self.cloud_field = None # all clouds, one instanced draw (created with the first clouds)
+        self.clouds = [] # CloudField handles
         self.holograms = []
         self.hologram_configs = []
         
     def regenerate_clouds(self, count=15):
-        # Cleanup existing clouds from renderer
-        for cloud in self.clouds:
-             if cloud.inst in self.renderer.objects:
-                 self.renderer.objects.remove(cloud.inst)
+        if self.cloud_field is None:
+            self.cloud_field = CloudField()
+            self.renderer.addObject(self.cloud_field)
+
+        # Freed ranges are reused by the new clouds; only those ranges are re-uploaded
+        for handle in self.clouds:
+            self.cloud_field.remove(handle)
         
         self.clouds = []
         print("Scattering Clouds...")
@@ -26,8 +31,7 @@ class CityVisuals:
             cz = random.uniform(-180, 180)
             cy = random.uniform(80, 120)
             c_scale = random.uniform(2.0, 5.0)
-            cloud = Cloud(self.renderer, glm.vec3(cx, cy, cz), scale=c_scale)
-            self.clouds.append(cloud)
+            self.clouds.append(self.cloud_field.add(glm.vec3(cx, cy, cz), scale=c_scale))
 
     def regenerate_holograms(self, count=5):
         # Cleanup existing holograms
@@ -35,6 +39,7 @@ class CityVisuals:
             for obj in holo.objects:
                 if obj in self.renderer.objects:
                     self.renderer.objects.remove(obj)
+            holo.release()
 
         self.holograms = []
         self.hologram_configs = []
@@ -77,6 +82,7 @@ class CityVisuals:
              holo.regenerate(cfg)
              self.holograms.append(holo)
              self.hologram_configs.append(cfg)
+        print(f"[CityVisuals] Hologram geometry cache: {geometry_cache.stats()}")
 
     def update(self, dt, time, config):
         self.skybox.update(dt)
@@ -93,12 +99,8 @@ class CityVisuals:
             self.renderer.objects.remove(self.skybox)
             
         # Clouds
-        for cloud in self.clouds:
-             is_in = cloud.inst in self.renderer.objects
-             if config.show_clouds and not is_in:
-                 self.renderer.addObject(cloud.inst)
-             elif not config.show_clouds and is_in:
-                 self.renderer.objects.remove(cloud.inst)
+        if self.cloud_field is not None:
+            self.cloud_field.visible = config.show_clouds
 
         # Holograms
         for holo in self.holograms:
@@ -112,8 +114,8 @@ class CityVisuals:
     def get_objects(self):
         """Returns flat list of all renderable objects."""
         objs = [self.skybox]
-        for c in self.clouds:
-            objs.append(c.inst)
+        if self.cloud_field is not None:
+            objs.append(self.cloud_field)
         for h in self.holograms:
             objs.extend(h.objects)
         return objs
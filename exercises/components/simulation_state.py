@@ -6,9 +6,11 @@ class SimulationState:
     target_agent_count: int = 1
     reckless_chance: float = 0.2
     num_cars_to_brake: int = 5
+    use_routing: bool = True # Agents drive to a random destination instead of turning at random
     
     # Visual Toggles
     show_buildings: bool = True
+    show_street_lights: bool = True
     show_clouds: bool = False
     show_holograms: bool = False
     show_skybox: bool = True
@@ -18,8 +20,13 @@ class SimulationState:
     print_stuck_debug: bool = False
     print_despawn_debug: bool = False
     
+    # City Generation
+    city_seed: int = 0
+    random_seed: bool = True # Pick a new seed on every regenerate
+    
     # Hologram Settings
     target_hologram_count: int = 5
     
     # Metrics (Mutable state tracked by simulation)
     total_crashes: int = 0
+    total_arrivals: int = 0
@@ -172,6 +172,7 @@ def main():
             for obj in holo.objects:
                 if obj in glrenderer.objects:
                     glrenderer.objects.remove(obj)
+            holo.release()
         holograms = []
         hologram_configs = []
         
@@ -8,6 +8,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 from framework.window import OpenGLWindow
 from framework.renderer import GLRenderer
+from framework.utils.dynamic_resolution import DynamicResolution
+from framework.utils.profiler import profiler
+from framework.utils.gpu_resources import gpu_resources
 from framework.camera import Flycamera
 from framework.utils.ui_manager import UIManager
 from exercises.components.simulation_state import SimulationState
@@ -27,6 +30,11 @@ def main():
     camera.position = glm.vec3(0, 150, 150)
     camera.euler_angles.x = -60
     glrenderer = GLRenderer(window, camera)
+    # Offscreen targets for render scale / dynamic resolution (off until enabled in the UI)
+    fb_size = glfw.get_framebuffer_size(window.window)
+    glrenderer.init_post_process(*fb_size)
+    glrenderer.dynamic_resolution = DynamicResolution(glrenderer)
+    glrenderer.dynamic_resolution.enabled = False
     
     # Components
     visuals = CityVisuals(glrenderer)
@@ -48,28 +56,44 @@ def main():
     manager.regenerate_world(visuals, config)
 
     while not glfw.window_should_close(window.window):
+        profiler.begin_frame()
+
         # Update
         dt = 0.016 # Fixed step for simplicity, or measure
         time = glfw.get_time()
         
         # Camera
-        camera_ctrl.update(dt, manager.agents)
+        with profiler.scope("camera"):
+            camera_ctrl.update(dt, manager.agents)
 
-        manager.update(dt, config)
-        visuals.update(dt, time, config)
+        with profiler.scope("update"):
+            manager.update(dt, config)
+        with profiler.scope("visuals"):
+            visuals.update(dt, time, config)
         
         # Render
-        glrenderer.render()
+        if glfw.get_framebuffer_size(window.window) != fb_size:
+            fb_size = glfw.get_framebuffer_size(window.window)
+            glrenderer.resize_post_process(*fb_size)
+        with profiler.scope("render", gpu=True):
+            glrenderer.render()
         
         # Debug Render
-        for agent in manager.agents: agent.render_debug(glrenderer, camera)
+        with profiler.scope("debug"):
+            for agent in manager.agents: agent.render_debug(glrenderer, camera)
 
         # UI
-        ui_manager.render(lambda: ui.draw())
+        with profiler.scope("ui", gpu=True):
+            ui_manager.render(lambda: ui.draw())
         
         glfw.swap_buffers(window.window)
         glfw.poll_events()
+        profiler.end_frame()
         
+    profiler.delete()
+    glrenderer.delete()
+    # What is still alive here was never released: the report lists it by owner
+    gpu_resources.print_report()
     ui_manager.shutdown()
     window.delete()
     glfw.terminate()
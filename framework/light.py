@@ -1,17 +1,24 @@
 import glm
+import numpy as np
+
+# Size of the light_position/light_color uniform arrays in the shaders
+MAX_GLOBAL_LIGHTS = 10
 
 class PointLight ():
     """
     A light source for shading
     """
 
-    def __init__ (self, pos, color):
+    def __init__ (self, pos, color, radius=None):
         """
         Constructor
         Receives the position and color of the point light source
+        radius: range of a local light (e.g. a street lamp). Lights with a radius are
+        culled into view clusters (see light_clusters.py) instead of lighting every fragment.
         """
         self.position = pos
         self.color = color
+        self.radius = radius
 
 
 class DirectionalLight():
@@ -29,4 +36,82 @@ class DirectionalLight():
         self.ambient = ambient
 
 
+class LightList(list):
+    """
+    The lights passed to draw() for one frame, with their uniform arrays packed once
+    (see pack_lights) instead of once per draw call.
+    GLRenderer.lights is one too: every change to the list bumps version, so LightClusters
+    can tell whether the set of lights changed without looking at each light.
+    clustered: True when LightClusters has bound this frame's local lights for the shaders.
+    """
+    clustered = False
+
+    def __init__(self, lights=()):
+        super().__init__(lights)
+        self.version = 0
+        self._packed = None
+        self._packed_version = -1
+
+    @property
+    def packed(self):
+        """(light_position, light_color) uniform arrays, packed on first use after a change."""
+        if self._packed_version != self.version:
+            self._packed = pack_lights(self)
+            self._packed_version = self.version
+        return self._packed
+
+
+def _bumps_version(name):
+    method = getattr(list, name)
+
+    def changed(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.version += 1
+        return result
+    changed.__name__ = name
+    return changed
+
+
+for _name in ("append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+              "__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(LightList, _name, _bumps_version(_name))
+
+
+def pack_lights(lights):
+    """
+    Lights -> (light_position (N,4), light_color (N,4)) float32 arrays for the shader uniforms.
+    Directional lights store their direction with w = 0, point lights their position with w = 1.
+    """
+    light_pos_list = []
+    light_color_list = []
+    for l in lights:
+        if hasattr(l, 'direction'):
+            # Directional Light: use direction as position, w=0.0
+            d = l.direction
+            # Ensure vec4
+            if isinstance(d, glm.vec3):
+               light_pos_list.append([d.x, d.y, d.z, 0.0])
+            elif isinstance(d, glm.vec4):
+               light_pos_list.append([d.x, d.y, d.z, 0.0])
+            else:
+                 # Fallback
+                 light_pos_list.append([0, 1, 0, 0])
+        else:
+            # Point Light: use position, w=1.0 (if not already set)
+            p = l.position
+            if isinstance(p, glm.vec3):
+                light_pos_list.append([p.x, p.y, p.z, 1.0])
+            else:
+                # vec4, keep w
+                light_pos_list.append([p.x, p.y, p.z, p.w])
+
+        # Color
+        c = l.color
+        if isinstance(c, glm.vec3):
+            light_color_list.append([c.x, c.y, c.z, 1.0])
+        else:
+            light_color_list.append([c.x, c.y, c.z, c.w])
 
+    light_pos = np.array(light_pos_list, dtype=np.float32).reshape(-1, 4)
+    light_color = np.array(light_color_list, dtype=np.float32).reshape(-1, 4)
+    return light_pos, light_color
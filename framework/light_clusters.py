@@ -0,0 +1,231 @@
+import numpy as np
+import OpenGL.GL as gl
+from .light import LightList
+from .utils.gpu_resources import gpu_resources
+
+# Shader storage bindings, see the ClusterLights/ClusterGrid/ClusterIndices blocks in shader.frag
+LIGHTS_BINDING = 1
+GRID_BINDING = 2
+INDICES_BINDING = 3
+
+
+class LightClusters:
+    """
+    Clustered forward lighting for local point lights (PointLight with a radius).
+    Every frame the view frustum is split into a grid of clusters (screen tiles x exponential
+    depth slices) and each light is binned into the clusters its sphere can touch.
+    The lights, the per-cluster (offset, count) ranges and the light index lists are uploaded
+    as shader storage buffers, so a fragment only shades the lights of its own cluster.
+    Lights without a radius (sun, moon, ...) stay global and are returned for the uniform arrays.
+    """
+    def __init__(self, dims=(16, 9, 24), max_lights_per_cluster=64):
+        self.dims = dims
+        self.max_lights_per_cluster = max_lights_per_cluster
+
+        # Split of the last light list, redone only when its LightList.version changes
+        self._source = None
+        self._source_version = None
+        self._global = []
+        self._local = []
+
+        # Packed local lights, rebuilt only when the set of lights changes (or on invalidate())
+        self._version = 0
+        self._packed_version = -1
+        self._centers = np.empty((0, 3), dtype=np.float32)
+        self._radii = np.empty(0, dtype=np.float32)
+        self._gpu_lights = np.empty((0, 8), dtype=np.float32)
+        self._lights_uploaded = False
+
+        self.ssbos = None
+
+        # Last frame's numbers, for the UI / profiling
+        self.local_light_count = 0
+        self.visible_light_count = 0
+        self.assignments = 0
+        self.overflow = 0
+
+    def invalidate(self):
+        """Call after moving or recolouring local lights in place."""
+        self._version += 1
+
+    # ----------------------------
+    # CPU binning
+    # ----------------------------
+    def _pack(self, local):
+        self._centers = np.array([[l.position.x, l.position.y, l.position.z] for l in local], dtype=np.float32).reshape(-1, 3)
+        self._radii = np.array([l.radius for l in local], dtype=np.float32)
+        colors = np.array([[l.color.x, l.color.y, l.color.z] for l in local], dtype=np.float32).reshape(-1, 3)
+
+        # std430 struct { vec4 pos_radius; vec4 color; }
+        self._gpu_lights = np.zeros((len(local), 8), dtype=np.float32)
+        self._gpu_lights[:, :3] = self._centers
+        self._gpu_lights[:, 3] = self._radii
+        self._gpu_lights[:, 4:7] = colors
+        self._gpu_lights[:, 7] = 1.0
+        self._lights_uploaded = False
+
+    def bin(self, view, projection, near, far):
+        """
+        Assigns the packed lights to clusters.
+        view/projection: glm.mat4. Returns (ranges (C, 2) uint32 as (offset, count), indices uint32),
+        clusters ordered x fastest, then y, then z.
+        """
+        nx, ny, nz = self.dims
+        cluster_count = nx * ny * nz
+        empty = (np.zeros((cluster_count, 2), dtype=np.uint32), np.empty(0, dtype=np.uint32))
+        if len(self._radii) == 0:
+            self.visible_light_count = self.assignments = self.overflow = 0
+            return empty
+
+        # 1. Light centers to view space (np.array(glm.mat4) is in math layout)
+        v = np.array(view, dtype=np.float32)
+        centers = self._centers @ v[:3, :3].T + v[:3, 3]
+        radii = self._radii
+        depth = -centers[:, 2]
+
+        # 2. Drop lights entirely in front of the near or behind the far plane
+        keep = (depth + radii > near) & (depth - radii < far)
+        ids = np.nonzero(keep)[0]
+        centers, radii, depth = centers[ids], radii[ids], depth[ids]
+
+        # 3. Depth slices: slice = log(depth) * scale + bias, exponential between near and far
+        log_scale = nz / np.log(far / near)
+        log_bias = -np.log(near) * log_scale
+        z0 = np.floor(np.log(np.maximum(depth - radii, near)) * log_scale + log_bias)
+        z1 = np.floor(np.log(np.minimum(depth + radii, far)) * log_scale + log_bias)
+        z0 = np.clip(z0, 0, nz - 1).astype(np.int32)
+        z1 = np.clip(z1, 0, nz - 1).astype(np.int32)
+
+        # 4. Screen tiles: project the corners of each light's view-space box, conservative
+        p = np.array(projection, dtype=np.float32)
+        signs = np.array([[sx, sy, sz] for sx in (-1, 1) for sy in (-1, 1) for sz in (-1, 1)], dtype=np.float32)
+        corners = centers[:, None, :] + signs[None, :, :] * radii[:, None, None]
+        clip = corners @ p[:, :3].T + p[:, 3]
+        w = np.maximum(clip[..., 3], 1e-6)
+        ndc_min = np.min(clip[..., :2] / w[..., None], axis=1)
+        ndc_max = np.max(clip[..., :2] / w[..., None], axis=1)
+        # Boxes crossing the near plane project unboundedly: give them the whole screen
+        crossing = depth - radii <= near
+        ndc_min[crossing] = -1.0
+        ndc_max[crossing] = 1.0
+
+        on_screen = np.all(ndc_max >= -1.0, axis=1) & np.all(ndc_min <= 1.0, axis=1)
+        tiles = np.array([nx, ny], dtype=np.float32)
+        t0 = np.clip(np.floor((ndc_min + 1.0) * 0.5 * tiles), 0, tiles - 1).astype(np.int32)
+        t1 = np.clip(np.floor((ndc_max + 1.0) * 0.5 * tiles), 0, tiles - 1).astype(np.int32)
+
+        # Nearest lights first, so a stable sort by cluster keeps every cluster's list depth-ordered
+        keep = np.nonzero(on_screen)[0]
+        keep = keep[np.argsort(depth[keep], kind="stable")]
+        ids, t0, t1, z0, z1 = ids[keep], t0[keep], t1[keep], z0[keep], z1[keep]
+        self.visible_light_count = len(ids)
+        if len(ids) == 0:
+            self.assignments = self.overflow = 0
+            return empty
+
+        # 5. Expand every light's (x, y, z) cluster box into (cluster, light) pairs
+        ex = t1[:, 0] - t0[:, 0] + 1
+        exy = ex * (t1[:, 1] - t0[:, 1] + 1)
+        per_light = exy * (z1 - z0 + 1)
+        first = np.repeat((z0 * ny + t0[:, 1]) * nx + t0[:, 0], per_light)
+        ex, exy = np.repeat(ex, per_light), np.repeat(exy, per_light)
+        local = np.arange(len(first), dtype=np.int32) - np.repeat(np.cumsum(per_light) - per_light, per_light)
+        lz, rest = np.divmod(local, exy)
+        ly, lx = np.divmod(rest, ex)
+        cluster = first + (lz * ny + ly) * nx + lx
+        light = np.repeat(ids, per_light)
+
+        # 6. Group by cluster (radix sort on 16 bit keys), drop what exceeds the per-cluster budget
+        order = np.argsort(cluster.astype(np.uint16 if cluster_count <= 0xFFFF else np.uint32), kind="stable")
+        cluster, light = cluster[order], light[order]
+        counts = np.bincount(cluster, minlength=cluster_count)
+        starts = np.cumsum(counts) - counts
+        rank = np.arange(len(cluster), dtype=np.int32) - starts[cluster]
+        fits = rank < self.max_lights_per_cluster
+        self.overflow = int(len(cluster) - np.count_nonzero(fits))
+        cluster, light = cluster[fits], light[fits]
+        self.assignments = len(light)
+
+        counts = np.bincount(cluster, minlength=cluster_count)
+        ranges = np.empty((cluster_count, 2), dtype=np.uint32)
+        ranges[:, 0] = np.cumsum(counts) - counts
+        ranges[:, 1] = counts
+        return ranges, light.astype(np.uint32)
+
+    # ----------------------------
+    # Per frame
+    # ----------------------------
+    def update(self, camera, lights):
+        """
+        Bins and uploads the local lights in 'lights' for this frame.
+        Returns the global lights as a LightList for the draw calls.
+        """
+        # 1. Split into global and local lights when the list changed (LightList.version);
+        #    plain lists have no version and are split and re-packed every frame
+        version = getattr(lights, "version", None)
+        if version is None or lights is not self._source or version != self._source_version:
+            self._global = [l for l in lights if not getattr(l, "radius", None)]
+            self._local = [l for l in lights if getattr(l, "radius", None)]
+            self._source = lights if version is not None else None
+            self._source_version = version
+            self._packed_version = -1
+        frame_lights = LightList(self._global)
+        self.local_light_count = len(self._local)
+        if not self._local:
+            return frame_lights
+
+        # Re-pack only when the light set changed or after invalidate()
+        if self._packed_version != self._version:
+            self._pack(self._local)
+            self._packed_version = self._version
+
+        # 2. Bin
+        ranges, indices = self.bin(camera.view, camera.projection, camera.near, camera.far)
+
+        # 3. Upload and bind
+        if self.ssbos is None:
+            self.ssbos = gl.glGenBuffers(3)
+        lights_ssbo, grid_ssbo, indices_ssbo = self.ssbos
+
+        viewport = gl.glGetIntegerv(gl.GL_VIEWPORT)
+        nx, ny, nz = self.dims
+        log_scale = nz / np.log(camera.far / camera.near)
+        # std430 { uvec4 cluster_dims; vec4 cluster_params; uvec2 cluster_ranges[]; }
+        grid = np.empty(8 + ranges.size, dtype=np.uint32)
+        grid[:4] = (nx, ny, nz, len(self._radii))
+        grid[4:8] = np.array([viewport[2], viewport[3], log_scale, -np.log(camera.near) * log_scale], dtype=np.float32).view(np.uint32)
+        grid[8:] = ranges.ravel()
+
+        if not self._lights_uploaded:
+            gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, lights_ssbo)
+            gl.glBufferData(gl.GL_SHADER_STORAGE_BUFFER, self._gpu_lights.nbytes, self._gpu_lights, gl.GL_STATIC_DRAW)
+            gpu_resources.track("buffer", lights_ssbo, self, self._gpu_lights.nbytes)
+            self._lights_uploaded = True
+
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, grid_ssbo)
+        gl.glBufferData(gl.GL_SHADER_STORAGE_BUFFER, grid.nbytes, grid, gl.GL_STREAM_DRAW)
+        gpu_resources.track("buffer", grid_ssbo, self, grid.nbytes)
+
+        # Never allocate an empty buffer
+        if len(indices) == 0:
+            indices = np.zeros(1, dtype=np.uint32)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, indices_ssbo)
+        gl.glBufferData(gl.GL_SHADER_STORAGE_BUFFER, indices.nbytes, indices, gl.GL_STREAM_DRAW)
+        gpu_resources.track("buffer", indices_ssbo, self, indices.nbytes)
+        gl.glBindBuffer(gl.GL_SHADER_STORAGE_BUFFER, 0)
+
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, LIGHTS_BINDING, lights_ssbo)
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, GRID_BINDING, grid_ssbo)
+        gl.glBindBufferBase(gl.GL_SHADER_STORAGE_BUFFER, INDICES_BINDING, indices_ssbo)
+
+        frame_lights.clustered = True
+        return frame_lights
+
+    def delete(self):
+        if self.ssbos is None:
+            return
+        gl.glDeleteBuffers(3, self.ssbos)
+        for ssbo in self.ssbos:
+            gpu_resources.untrack("buffer", ssbo)
+        self.ssbos = None
+        self._lights_uploaded = False
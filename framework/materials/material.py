@@ -1,9 +1,12 @@
 import os
 import OpenGL.GL as gl
 import glm
-import numpy as np
 from .shaders import createShader
 from . import Texture
+from ..light import pack_lights, MAX_GLOBAL_LIGHTS
+from ..utils.gpu_resources import gpu_resources
+
+NO_TINT = glm.vec4(1.0)
 
 class Material:
     def __init__(self, vertex_shader="shader.vert", fragment_shader="shader.frag", color_texture=None):
@@ -15,7 +18,7 @@ class Material:
         self.color_texture = None
         if color_texture is not None:
             defines_list.append("USE_ALBEDO_TEXTURE")
-            self.color_texture = color_texture
+            self.color_texture = gpu_resources.retain(color_texture)
 
         self.shader_program = createShader(
             os.path.join(filedir, vertex_shader),
@@ -27,6 +30,8 @@ class Material:
             os.path.join(filedir, fragment_shader),
             defines=defines_list + ["INSTANCED"]
         )
+        gpu_resources.track("program", self.shader_program, self)
+        gpu_resources.track("program", self.shader_program_instanced, self)
         self.ambient_strength  = 0.2
         self.specular_strength = 0.5
         self.diffuse_strength = 1.0
@@ -34,6 +39,19 @@ class Material:
         self.texture_scale = glm.vec2(1.0)
         self.uniforms = {}
 
+    def delete(self):
+        """Deletes both programs and drops the albedo texture (shared textures live on). Safe to call twice."""
+        if self.shader_program is None:
+            return
+        for program in (self.shader_program, self.shader_program_instanced):
+            gl.glDeleteProgram(program)
+            gpu_resources.untrack("program", program)
+        self.shader_program = None
+        self.shader_program_instanced = None
+        if self.color_texture is not None:
+            gpu_resources.release(self.color_texture)
+            self.color_texture = None
+
     def get_shader_program(self, is_instanced):
         if is_instanced:
             return self.shader_program_instanced
@@ -58,47 +76,30 @@ class Material:
         loc_model = gl.glGetUniformLocation(program, "model")
         gl.glUniformMatrix4fv(loc_model, 1, gl.GL_FALSE, glm.value_ptr(obj.transform))
 
+        # Always set: objects sharing this program must not inherit the previous tint
+        loc_tint = gl.glGetUniformLocation(program, "tint")
+        if loc_tint != -1:
+            tint = getattr(obj, "tint", None)
+            gl.glUniform4fv(loc_tint, 1, glm.value_ptr(tint if tint is not None else NO_TINT))
+
         # Lights
         loc_light_count = gl.glGetUniformLocation(program, "light_count")
         loc_light_pos   = gl.glGetUniformLocation(program, "light_position")
         loc_light_color = gl.glGetUniformLocation(program, "light_color")
 
-        light_pos_list = []
-        light_color_list = []
-        for l in lights:
-            if hasattr(l, 'direction'):
-                # Directional Light: use direction as position, w=0.0
-                d = l.direction
-                # Ensure vec4
-                if isinstance(d, glm.vec3):
-                   light_pos_list.append([d.x, d.y, d.z, 0.0])
-                elif isinstance(d, glm.vec4):
-                   light_pos_list.append([d.x, d.y, d.z, 0.0])
-                else: 
-                     # Fallback
-                     light_pos_list.append([0, 1, 0, 0])
-            else:
-                # Point Light: use position, w=1.0 (if not already set)
-                p = l.position
-                if isinstance(p, glm.vec3):
-                    light_pos_list.append([p.x, p.y, p.z, 1.0])
-                else:
-                    # vec4, keep w
-                    light_pos_list.append([p.x, p.y, p.z, p.w])
-            
-            # Color
-            c = l.color
-            if isinstance(c, glm.vec3):
-                light_color_list.append([c.x, c.y, c.z, 1.0])
-            else:
-                light_color_list.append([c.x, c.y, c.z, c.w])
-
-        light_pos   = np.array(light_pos_list, dtype=np.float32)
-        light_color = np.array(light_color_list, dtype=np.float32)
-
-        gl.glUniform1i(loc_light_count, len(lights))
-        gl.glUniform4fv(loc_light_pos, len(lights), light_pos)
-        gl.glUniform4fv(loc_light_color, len(lights), light_color)
+        # The renderer packs the frame's lights once (LightList); plain lists are packed here
+        packed = getattr(lights, "packed", None)
+        light_pos, light_color = packed if packed is not None else pack_lights(lights)
+        light_count = min(len(light_pos), MAX_GLOBAL_LIGHTS)
+
+        gl.glUniform1i(loc_light_count, light_count)
+        if light_count > 0:
+            gl.glUniform4fv(loc_light_pos, light_count, light_pos[:light_count])
+            gl.glUniform4fv(loc_light_color, light_count, light_color[:light_count])
+
+        loc_clustered = gl.glGetUniformLocation(program, "use_light_clusters")
+        if loc_clustered != -1:
+            gl.glUniform1i(loc_clustered, int(getattr(lights, "clustered", False)))
 
         # Material Properties
         loc_ambient     = gl.glGetUniformLocation(program, "ambient_strength")
@@ -2,6 +2,7 @@ import OpenGL.GL as gl
 import numpy as np
 from pyglm import glm
 from PIL import Image
+from ..utils.gpu_resources import gpu_resources
 
 class Texture:
     def __init__(self, resolution=None, data=None, file_path=None):
@@ -81,6 +82,8 @@ class Texture:
 
         gl.glBindTexture(gl.GL_TEXTURE_2D, 0)
         self.dirty = False
+        # RGBA8 plus a third for the mip chain
+        gpu_resources.track("texture", self.texture_id, self, self.data.nbytes * 4 // 3)
 
     def bind(self, unit=0):
         """Bind texture to a texture unit, uploading if dirty."""
@@ -93,4 +96,10 @@ class Texture:
         """Free GPU resources."""
         if self.texture_id is not None:
             gl.glDeleteTextures([self.texture_id])
+            gpu_resources.untrack("texture", self.texture_id)
             self.texture_id = None
+        self.dirty = True
+
+    def delete(self):
+        """Same as release(); the name gpu_resources.release() calls."""
+        self.release()
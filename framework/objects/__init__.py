@@ -1,9 +1,13 @@
 from .object import Object
 from .mesh_object import MeshObject
 from .instanced_mesh_object import InstancedMeshObject
+from .dynamic_batch_object import DynamicBatchObject
+from .spinning_instances_object import SpinningInstancesObject
 
 __all__ = [
     "Object",
     "MeshObject",
     "InstancedMeshObject",
+    "DynamicBatchObject",
+    "SpinningInstancesObject",
 ]
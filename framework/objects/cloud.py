@@ -2,7 +2,10 @@ from pyglm import glm
 from ..shapes.quad import Quad
 from .instanced_mesh_object import InstancedMeshObject
 from ..materials import Material
+import numpy as np
 import random
+import math
+from ..utils.l_system import expand
 
 class Cloud:
     def __init__(self, renderer, pos=glm.vec3(0), scale=1.0, color=glm.vec4(1.0)):
@@ -20,103 +23,88 @@ class Cloud:
         self.iterations = 2
         self.angle = glm.radians(90.0)
 
-        # Generate String
-        s = self.axiom
-        for _ in range(self.iterations):
-            s = self._apply_rules(s)
+        # Generate String (memoized, linear in the output length)
+        s = expand(self.axiom, self.rules, self.iterations)
             
         # Interpret String
-        transforms, colors = self.interpret(s)
+        self.transforms, self.colors = self.interpret(s)
         
+        # Without a renderer only the puffs are generated (e.g. for a CloudField)
+        self.inst = None
+        if renderer is None:
+            return
+
         # Create Object
         leaf = Quad(width=1, height=1)
         mat = Material()
         mat.color = self.color
         mat.ambient_strength = 1.0 
         
-        self.inst = InstancedMeshObject(leaf, mat, transforms, colors)
+        self.inst = InstancedMeshObject(leaf, mat, self.transforms, self.colors)
         self.renderer.addObject(self.inst)
 
     def _apply_rules(self, s):
-        res = ""
-        for char in s:
-            res += self.rules.get(char, char)
-        return res
+        return expand(s, self.rules, 1)
 
     def interpret(self, s):
-        # Nested State class as per framework
-        class State:
-            def __init__(self, pos, ang):
-                self.pos = pos
-                self.ang = ang
-            
-            def clone(self):
-                return State(glm.vec3(self.pos), self.ang)
-
-        transforms = []
-        colors = []
-        
-        # Turtle State
-        st = State(pos=glm.vec3(0.0), ang=0.0)
-        stack = []
-        
+        """
+        Walks the 2D turtle over s and returns ((N, 4, 4) float32 transforms in glm
+        column-major layout, (N, 4) colors), one puff per F, centered on self.pos.
+        """
         # Heuristic step length calculation
         step_len = 1.0 * (1.0 / (4**self.iterations)) * self.scale * 10.0
-        
-        # First pass: Collect points to calculate center
-        points = []
-        sim_pos = glm.vec3(0.0)
-        sim_ang = 0.0
-        
-        # We need to simulate the path first to center it, 
-        # or we accept it's off-center and fix it later.
-        # Let's run the full interpretation logic but store relative positions first.
-        
+
+        # 1. Puff positions (position before each F), written into a preallocated array
+        points = self._turtle_points(s, step_len)
+
+        # 2. Center relative to local origin and map turtle (x,y) to world (x,0,z) + self.pos
+        if len(points) > 0:
+            points -= points.mean(axis=0)
+        final_pos = np.empty((len(points), 3), dtype=np.float32)
+        final_pos[:, 0] = self.pos.x + points[:, 0]
+        final_pos[:, 1] = self.pos.y
+        final_pos[:, 2] = self.pos.z + points[:, 1]
+
+        # 3. T = translate(final_pos) * rotate(-90deg, X) * scale(puff_size): the 3x3 part is shared
+        puff_size = glm.vec3(step_len * 2.5)
+        base_quat = glm.rotate(glm.radians(-90), glm.vec3(1, 0, 0))
+        base = np.array((base_quat * glm.scale(puff_size)).to_list(), dtype=np.float32)
+        transforms = np.broadcast_to(base, (len(points), 4, 4)).copy()
+        transforms[:, 3, :3] = final_pos
+
+        # Simple color (no gradient for this specific cloud)
+        colors = np.broadcast_to(np.array(self.color.to_list(), dtype=np.float32), (len(points), 4))
+        return transforms, colors
+
+    def _turtle_points(self, s, step_len):
+        """(N, 2) float64 turtle positions at each F."""
+        if "[" not in s:
+            # No branches: the heading is a running sum of turns and the positions a running sum of steps
+            codes = np.frombuffer(s.encode("ascii"), dtype=np.uint8)
+            turns = np.where(codes == ord("-"), self.angle, 0.0) - np.where(codes == ord("+"), self.angle, 0.0)
+            heading = np.cumsum(turns)[codes == ord("F")]
+            steps = np.stack([np.cos(heading), np.sin(heading)], axis=1) * step_len
+            points = np.zeros_like(steps)
+            np.cumsum(steps[:-1], axis=0, out=points[1:])
+            return points
+
+        # Branches: stream the symbols with an explicit stack
+        points = np.empty((s.count("F"), 2), dtype=np.float64)
+        x, y, ang = 0.0, 0.0, 0.0
+        stack = []
+        count = 0
         for char in s:
             if char == "F":
-                # Save current position
-                points.append(st.pos)
-                
-                # Move forward
-                direction = glm.vec3(glm.cos(st.ang), glm.sin(st.ang), 0.0)
-                st.pos = st.pos + direction * step_len
-                
+                points[count] = (x, y)
+                count += 1
+                x += math.cos(ang) * step_len
+                y += math.sin(ang) * step_len
             elif char == "+":
-                st.ang -= self.angle
+                ang -= self.angle
             elif char == "-":
-                st.ang += self.angle
+                ang += self.angle
             elif char == "[":
-                stack.append(st.clone())
+                stack.append((x, y, ang))
             elif char == "]":
-                st = stack.pop()
-
-        # Calculate Center
-        avg_pos = glm.vec3(0.0)
-        if len(points) > 0:
-            avg_pos = sum(points, glm.vec3(0)) / len(points)
-            
-        # Second pass: Generate Transforms centered around self.pos
-        # Note: In the original framework, visual generation happens iteratively.
-        # Here we post-process points to center them, which is a logic improvement 
-        # but deviating slightly from pure "draw as you go".
-        # However, to place the cloud AT self.pos, we must know its center.
-        
-        puff_size = glm.vec3(step_len * 2.5)
-        # Rotation for flat cloud (face up)
-        base_quat = glm.rotate(glm.radians(-90), glm.vec3(1, 0, 0))
-        
-        for p in points:
-            # Center relative to local origin
-            local_p = p - avg_pos
-            
-            # Map 2D turtle (x,y) to 3D world (x,0,z) + Global Position
-            # We treat the cloud as lying in the XZ plane.
-            final_pos = self.pos + glm.vec3(local_p.x, 0.0, local_p.y)
-            
-            T = glm.translate(final_pos) * base_quat * glm.scale(puff_size)
-            
-            transforms.append(T)
-            # Simple color (no gradient for this specific cloud)
-            colors.append(self.color)
-            
-        return transforms, colors
+                x, y, ang = stack.pop()
+        return points
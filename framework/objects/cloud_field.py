@@ -0,0 +1,191 @@
+import numpy as np
+import ctypes
+import OpenGL.GL as gl
+from pyglm import glm
+from .object import Object
+from .cloud import Cloud
+from ..shapes.quad import Quad
+from ..materials import Material
+from ..utils.gpu_resources import gpu_resources
+from ..utils.range_allocator import RangeAllocator, merge_ranges
+
+# Per instance: mat4 (glm column-major) then vec4 colour
+INSTANCE_FLOATS = 20
+INSTANCE_BYTES = INSTANCE_FLOATS * 4
+
+
+class CloudField(Object):
+    """
+    Every cloud's puffs in one instance buffer, drawn with one Material and one instanced draw.
+    Each cloud owns a range of instance slots handed out by a free-list allocator;
+    add/remove only rewrite that range, uploaded with glBufferSubData on the next draw.
+    Freed slots hold zero matrices (their quads collapse and draw nothing) until reused,
+    and the buffer is compacted once holes exceed COMPACT_THRESHOLD of the drawn range.
+    """
+    GROWTH = 2
+    COMPACT_THRESHOLD = 0.25
+
+    def __init__(self, capacity=4096, transform=glm.mat4(1.0)):
+        super().__init__(transform)
+        self.visible = True
+
+        self.mesh = Quad(width=1, height=1)
+        self.material = Material()
+        self.material.ambient_strength = 1.0
+
+        self.clouds = {}  # handle -> (offset, count)
+        self._next_handle = 0
+
+        self.capacity = capacity
+        self.instances = np.zeros((capacity, INSTANCE_FLOATS), dtype=np.float32)
+        self.alloc = RangeAllocator(capacity)
+
+        self.instanceVBO = None
+        self.dirty = []
+        self.needs_full_upload = True
+        self.uploaded_bytes = 0  # running total, to check edits cost what they change
+
+    # ----------------------------
+    # Editing
+    # ----------------------------
+    def add(self, pos, scale=1.0, color=glm.vec4(1.0)):
+        """Generates a cloud (see Cloud) and returns a handle for remove()."""
+        cloud = Cloud(None, pos, scale=scale, color=color)
+        return self.add_instances(cloud.transforms, cloud.colors)
+
+    def add_instances(self, transforms, colors):
+        """
+        Adds puffs given as (N, 4, 4) transforms in glm column-major layout and (N, 4) colours.
+        Returns a handle for remove().
+        """
+        count = len(transforms)
+        offset = self.alloc.alloc(count)
+        if offset is None:
+            self._make_room(count)
+            offset = self.alloc.alloc(count)
+            if offset is None:
+                raise RuntimeError(f"CloudField: no room for {count} puffs after growing")
+
+        self.instances[offset:offset + count, :16] = np.asarray(transforms, dtype=np.float32).reshape(count, 16)
+        self.instances[offset:offset + count, 16:] = colors
+        self.dirty.append((offset, offset + count))
+
+        handle = self._next_handle
+        self._next_handle += 1
+        self.clouds[handle] = (offset, count)
+        return handle
+
+    def remove(self, handle):
+        offset, count = self.clouds.pop(handle)
+        self.instances[offset:offset + count] = 0.0
+        self.dirty.append((offset, offset + count))
+        self.alloc.release(offset, count)
+
+    def clear(self):
+        for handle in list(self.clouds):
+            self.remove(handle)
+
+    def instance_count(self):
+        return self.alloc.used
+
+    # ----------------------------
+    # Buffer maintenance
+    # ----------------------------
+    def _make_room(self, needed):
+        """Compacts if the free slots are only fragmented, otherwise grows by at least needed slots."""
+        if self.capacity - self.alloc.used >= needed:
+            # Compaction leaves all free slots in one block at the end
+            self.compact()
+            return
+        # The new slots join the tail free block, so the next alloc always fits
+        self.grow(max(self.capacity * self.GROWTH, self.capacity + needed))
+
+    def grow(self, capacity):
+        """Enlarges the instance buffer; existing ranges keep their offsets. Triggers a full re-upload."""
+        old = self.instances
+        self.instances = np.zeros((capacity, INSTANCE_FLOATS), dtype=np.float32)
+        self.instances[:len(old)] = old
+        self.alloc.grow(capacity)
+        self.capacity = capacity
+        self.needs_full_upload = True
+        print(f"[CloudField] Grew instance buffer to {capacity} puffs")
+
+    def compact(self):
+        """Packs all clouds to the front of the buffer. Triggers a full re-upload."""
+        old = self.instances
+        self.instances = np.zeros_like(old)
+        cursor = 0
+        for handle, (offset, count) in sorted(self.clouds.items(), key=lambda item: item[1][0]):
+            self.instances[cursor:cursor + count] = old[offset:offset + count]
+            self.clouds[handle] = (cursor, count)
+            cursor += count
+        self.alloc.reset(cursor)
+        self.needs_full_upload = True
+
+    # ----------------------------
+    # GPU sync
+    # ----------------------------
+    def _create_buffers(self):
+        # The field owns its quad, so the instance attributes can live on the quad's VAO
+        self.mesh.createGeometry()
+        self.mesh.createBuffers()
+
+        self.instanceVBO = gl.glGenBuffers(1)
+        gl.glBindVertexArray(self.mesh.VAO)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
+
+        # Mat4 = 4 vec4s at locations 4,5,6,7, colour at location 8
+        for i in range(5):
+            loc = 4 + i
+            gl.glEnableVertexAttribArray(loc)
+            gl.glVertexAttribPointer(loc, 4, gl.GL_FLOAT, gl.GL_FALSE, INSTANCE_BYTES, ctypes.c_void_p(i * 16))
+            gl.glVertexAttribDivisor(loc, 1)
+
+        gl.glBindVertexArray(0)
+
+    def flush(self):
+        """Uploads pending edits: the whole buffer after growth/compaction, otherwise only dirty ranges."""
+        drawn = self.alloc.high_water()
+        if drawn > 0 and (drawn - self.alloc.used) / drawn > self.COMPACT_THRESHOLD:
+            self.compact()
+
+        if self.instanceVBO is None:
+            self._create_buffers()
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
+        if self.needs_full_upload:
+            gl.glBufferData(gl.GL_ARRAY_BUFFER, self.instances.nbytes, self.instances, gl.GL_DYNAMIC_DRAW)
+            gpu_resources.track("buffer", self.instanceVBO, self, self.instances.nbytes)
+            self.uploaded_bytes += self.instances.nbytes
+            self.needs_full_upload = False
+        else:
+            for start, end in merge_ranges(self.dirty):
+                chunk = self.instances[start:end]
+                gl.glBufferSubData(gl.GL_ARRAY_BUFFER, start * INSTANCE_BYTES, chunk.nbytes, chunk)
+                self.uploaded_bytes += chunk.nbytes
+        self.dirty = []
+
+    def draw(self, camera, lights):
+        if self.visible == False:
+            return
+
+        if self.instanceVBO is None or self.needs_full_upload or self.dirty:
+            self.flush()
+
+        amount = self.alloc.high_water()
+        if amount == 0:
+            return
+
+        self.material.set_uniforms(True, self, camera, lights)
+        gl.glBindVertexArray(self.mesh.VAO)
+        gl.glDrawElementsInstanced(gl.GL_TRIANGLES, len(self.mesh.indices), self.mesh.indexType(), None, amount)
+        gl.glBindVertexArray(0)
+
+    def delete(self):
+        if self.instanceVBO is None:
+            return
+        gl.glDeleteBuffers(1, [self.instanceVBO])
+        gpu_resources.untrack("buffer", self.instanceVBO)
+        self.mesh.delete()
+        self.material.delete()
+        self.instanceVBO = None
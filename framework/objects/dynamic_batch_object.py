@@ -0,0 +1,283 @@
+import numpy as np
+import OpenGL.GL as gl
+from pyglm import glm
+from .object import Object
+from ..utils.gpu_resources import gpu_resources
+from ..utils.mesh_arrays import to_matrix_array, fill_transformed
+from ..utils.range_allocator import RangeAllocator, merge_ranges
+
+
+class DynamicBatchObject(Object):
+    """
+    Merged mesh that can be edited after upload.
+    Vertices and indices live in GPU arenas mirrored on the CPU; each added shape owns one
+    vertex range and one index range handed out by a free-list allocator.
+    add/remove/update only touch the affected ranges, which are uploaded with glBufferSubData
+    on the next draw. Removed shapes leave degenerate triangles behind until the index arena
+    is compacted (automatic once holes exceed COMPACT_THRESHOLD of the drawn range).
+    """
+    GROWTH = 2
+    COMPACT_THRESHOLD = 0.25
+
+    def __init__(self, material, vertex_capacity=65536, index_capacity=None, transform=glm.mat4(1.0)):
+        super().__init__(transform)
+        self.material = material
+        self.visible = True
+
+        self.records = {}  # handle -> [shape, mats, cols, v_off, v_count, i_off, i_count]
+        self._next_handle = 0
+
+        self._allocate(vertex_capacity, index_capacity if index_capacity is not None else vertex_capacity * 2)
+        self.vertex_alloc = RangeAllocator(self.vertex_capacity)
+        self.index_alloc = RangeAllocator(self.index_capacity)
+
+        # GL buffers (created on first draw)
+        self.VAO = None
+        self.VertexBO = None
+        self.NormalBO = None
+        self.ColorBO = None
+        self.UVBO = None
+        self.IndexBO = None
+
+        self.dirty_vertices = []
+        self.dirty_indices = []
+        self.needs_full_upload = True
+        self.compact_pending = False
+        self.uploaded_bytes = 0  # running total, to check edits cost what they change
+
+    def _allocate(self, vertex_capacity, index_capacity):
+        self.vertex_capacity = vertex_capacity
+        self.index_capacity = index_capacity
+        self.vertices = np.zeros((vertex_capacity, 4), dtype=np.float32)
+        self.normals = np.zeros((vertex_capacity, 3), dtype=np.float32)
+        self.colors = np.zeros((vertex_capacity, 4), dtype=np.float32)
+        self.uvs = np.zeros((vertex_capacity, 2), dtype=np.float32)
+        self.indices = np.zeros(index_capacity, dtype=np.uint32)
+
+    # ----------------------------
+    # Editing
+    # ----------------------------
+    def add(self, shape, transform=None, color=None):
+        """
+        Adds a shape and returns a handle for update()/remove().
+        transform: glm.mat4 (optional); color: glm.vec4 override (optional)
+        """
+        if shape.vertices is None or len(shape.vertices) == 0:
+            shape.createGeometry()
+
+        v_count = len(shape.vertices)
+        i_count = len(shape.indices)
+
+        # 1. Reserve ranges (compact or grow if needed)
+        v_off = self.vertex_alloc.alloc(v_count)
+        i_off = self.index_alloc.alloc(i_count)
+        if v_off is None or i_off is None:
+            if v_off is not None:
+                self.vertex_alloc.release(v_off, v_count)
+            if i_off is not None:
+                self.index_alloc.release(i_off, i_count)
+            self._make_room(v_count, i_count)
+            v_off = self.vertex_alloc.alloc(v_count)
+            i_off = self.index_alloc.alloc(i_count)
+            if v_off is None or i_off is None:
+                raise RuntimeError(f"DynamicBatchObject: no room for {v_count} vertices, {i_count} indices after growing")
+
+        # 2. Write data
+        record = [shape, None, None, v_off, v_count, i_off, i_count]
+        self._set_attributes(record, transform, color)
+        self._write_vertices(record)
+        self.indices[i_off:i_off + i_count] = np.asarray(shape.indices, dtype=np.uint32) + v_off
+        self.dirty_indices.append((i_off, i_off + i_count))
+
+        # 3. Register only once the shape is in the arenas
+        handle = self._next_handle
+        self._next_handle += 1
+        self.records[handle] = record
+        return handle
+
+    def update(self, handle, transform=None, color=None):
+        """
+        Re-transforms / re-tints one shape in place. Only its vertex range is uploaded.
+        """
+        record = self.records[handle]
+        self._set_attributes(record, transform, color)
+        self._write_vertices(record)
+
+    def remove(self, handle):
+        record = self.records.pop(handle)
+        v_off, v_count, i_off, i_count = record[3:7]
+
+        # All-zero indices draw nothing (degenerate triangles) until the range is reused
+        self.indices[i_off:i_off + i_count] = 0
+        self.dirty_indices.append((i_off, i_off + i_count))
+
+        self.vertex_alloc.release(v_off, v_count)
+        self.index_alloc.release(i_off, i_count)
+
+        drawn = self.index_alloc.high_water()
+        holes = drawn - self.index_alloc.used
+        if drawn > 0 and holes / drawn > self.COMPACT_THRESHOLD:
+            self.compact_pending = True
+
+    def _set_attributes(self, record, transform, color):
+        if transform is not None:
+            record[1] = to_matrix_array([transform])
+        if color is not None:
+            record[2] = np.array([color.to_list()], dtype=np.float32)
+
+    def _write_vertices(self, record):
+        shape, mats, cols, v_off, v_count = record[:5]
+        end = v_off + v_count
+        fill_transformed(shape, mats, cols,
+                         self.vertices[v_off:end].reshape(1, v_count, 4), self.normals[v_off:end].reshape(1, v_count, 3),
+                         self.colors[v_off:end].reshape(1, v_count, 4), self.uvs[v_off:end].reshape(1, v_count, 2))
+        self.dirty_vertices.append((v_off, end))
+
+    # ----------------------------
+    # Arena maintenance
+    # ----------------------------
+    def _make_room(self, v_needed, i_needed):
+        """
+        Makes a contiguous free range of v_needed vertices and i_needed indices: compacts if
+        the free space is only fragmented, otherwise grows. Growth appends at least the
+        requested size to the tail free block, so the next alloc always succeeds.
+        """
+        fits_v = self.vertex_alloc.capacity - self.vertex_alloc.used >= v_needed
+        fits_i = self.index_alloc.capacity - self.index_alloc.used >= i_needed
+        if fits_v and fits_i:
+            # Compaction leaves all free space in one block at the end
+            self.compact()
+            return
+
+        v_cap = max(self.vertex_capacity * self.GROWTH, self.vertex_capacity + v_needed)
+        i_cap = max(self.index_capacity * self.GROWTH, self.index_capacity + i_needed)
+        self.grow(v_cap, i_cap)
+
+    def grow(self, vertex_capacity, index_capacity):
+        """
+        Enlarges both arenas; existing ranges keep their offsets. Triggers a full re-upload.
+        """
+        old = (self.vertices, self.normals, self.colors, self.uvs, self.indices)
+        self._allocate(vertex_capacity, index_capacity)
+        for new_arr, old_arr in zip((self.vertices, self.normals, self.colors, self.uvs, self.indices), old):
+            new_arr[:len(old_arr)] = old_arr
+
+        self.vertex_alloc.grow(vertex_capacity)
+        self.index_alloc.grow(index_capacity)
+        self.needs_full_upload = True
+        print(f"[DynamicBatch] Grew arenas to {vertex_capacity} vertices, {index_capacity} indices")
+
+    def compact(self):
+        """
+        Packs all live ranges to the front of both arenas, keeping draw order.
+        Triggers a full re-upload.
+        """
+        old = (self.vertices, self.normals, self.colors, self.uvs, self.indices)
+        self._allocate(self.vertex_capacity, self.index_capacity)
+
+        v_cursor = 0
+        i_cursor = 0
+        for record in sorted(self.records.values(), key=lambda r: r[5]):
+            v_off, v_count, i_off, i_count = record[3:7]
+            for new_arr, old_arr in zip((self.vertices, self.normals, self.colors, self.uvs), old[:4]):
+                new_arr[v_cursor:v_cursor + v_count] = old_arr[v_off:v_off + v_count]
+            self.indices[i_cursor:i_cursor + i_count] = old[4][i_off:i_off + i_count] - v_off + v_cursor
+
+            record[3] = v_cursor
+            record[5] = i_cursor
+            v_cursor += v_count
+            i_cursor += i_count
+
+        self.vertex_alloc.reset(v_cursor)
+        self.index_alloc.reset(i_cursor)
+        self.needs_full_upload = True
+        self.compact_pending = False
+
+    # ----------------------------
+    # GPU sync
+    # ----------------------------
+    def _create_buffers(self):
+        self.VAO = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.VAO)
+
+        self.VertexBO, self.NormalBO, self.ColorBO, self.UVBO = [int(bo) for bo in gl.glGenBuffers(4)]
+        for location, (bo, comps) in enumerate(((self.VertexBO, 4), (self.NormalBO, 3), (self.ColorBO, 4), (self.UVBO, 2))):
+            gl.glBindBuffer(gl.GL_ARRAY_BUFFER, bo)
+            gl.glEnableVertexAttribArray(location)
+            gl.glVertexAttribPointer(location, comps, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
+
+        self.IndexBO = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.IndexBO)
+
+        gl.glBindVertexArray(0)
+        gpu_resources.track("vertex_array", self.VAO, self)
+
+    def _vertex_buffers(self):
+        return ((self.VertexBO, self.vertices), (self.NormalBO, self.normals), (self.ColorBO, self.colors), (self.UVBO, self.uvs))
+
+    def flush(self):
+        """
+        Uploads pending edits: whole arenas after growth/compaction, otherwise only dirty ranges.
+        """
+        if self.compact_pending:
+            self.compact()
+
+        if self.VAO is None:
+            self._create_buffers()
+
+        # The element buffer binding is VAO state: bind ours before touching it
+        gl.glBindVertexArray(self.VAO)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.IndexBO)
+
+        if self.needs_full_upload:
+            for bo, arr in self._vertex_buffers():
+                gl.glBindBuffer(gl.GL_ARRAY_BUFFER, bo)
+                gl.glBufferData(gl.GL_ARRAY_BUFFER, arr.nbytes, arr, gl.GL_DYNAMIC_DRAW)
+                gpu_resources.track("buffer", bo, self, arr.nbytes)
+                self.uploaded_bytes += arr.nbytes
+            gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, gl.GL_DYNAMIC_DRAW)
+            gpu_resources.track("buffer", self.IndexBO, self, self.indices.nbytes)
+            self.uploaded_bytes += self.indices.nbytes
+            self.needs_full_upload = False
+        else:
+            for start, end in merge_ranges(self.dirty_vertices):
+                for bo, arr in self._vertex_buffers():
+                    chunk = arr[start:end]
+                    gl.glBindBuffer(gl.GL_ARRAY_BUFFER, bo)
+                    gl.glBufferSubData(gl.GL_ARRAY_BUFFER, start * arr.itemsize * arr.shape[1], chunk.nbytes, chunk)
+                    self.uploaded_bytes += chunk.nbytes
+
+            for start, end in merge_ranges(self.dirty_indices):
+                chunk = self.indices[start:end]
+                gl.glBufferSubData(gl.GL_ELEMENT_ARRAY_BUFFER, start * chunk.itemsize, chunk.nbytes, chunk)
+                self.uploaded_bytes += chunk.nbytes
+
+        gl.glBindVertexArray(0)
+        self.dirty_vertices = []
+        self.dirty_indices = []
+
+    def draw(self, camera, lights):
+        if self.visible == False:
+            return
+
+        if self.VAO is None or self.needs_full_upload or self.dirty_vertices or self.dirty_indices or self.compact_pending:
+            self.flush()
+
+        count = self.index_alloc.high_water()
+        if count == 0:
+            return
+
+        self.material.set_uniforms(False, self, camera, lights)
+        gl.glBindVertexArray(self.VAO)
+        gl.glDrawElements(gl.GL_TRIANGLES, count, gl.GL_UNSIGNED_INT, None)
+        gl.glBindVertexArray(0)
+
+    def delete(self):
+        if self.VAO is None:
+            return
+        gl.glDeleteVertexArrays(1, [self.VAO])
+        gl.glDeleteBuffers(5, [self.VertexBO, self.NormalBO, self.ColorBO, self.UVBO, self.IndexBO])
+        gpu_resources.untrack("vertex_array", self.VAO)
+        for bo in (self.VertexBO, self.NormalBO, self.ColorBO, self.UVBO, self.IndexBO):
+            gpu_resources.untrack("buffer", bo)
+        self.VAO = None
@@ -2,12 +2,13 @@ import numpy as np
 import ctypes
 import OpenGL.GL as gl
 from .object import *
+from ..utils.gpu_resources import gpu_resources
 
 class InstancedMeshObject(Object):
     def __init__(self, mesh, material, transforms, colors=None):
         super().__init__()
-        self.mesh = mesh
-        self.material = material
+        self.mesh = gpu_resources.retain(mesh)
+        self.material = gpu_resources.retain(material)
         self.transforms = transforms
         self.colors = colors if colors is not None else [glm.vec4(1,1,1,1)] * len(transforms)
         self.amount = len(transforms)
@@ -21,12 +22,12 @@ class InstancedMeshObject(Object):
             self.mesh.createBuffers()
 
         # Flatten transforms into (amount, 16) float32
-        matrices = np.array([np.array(m.to_list(), dtype=np.float32).flatten()
-                             for m in self.transforms], dtype=np.float32)
+        matrices = self._matrix_array(self.transforms)
 
         self.instanceVBO = gl.glGenBuffers(1)
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
         gl.glBufferData(gl.GL_ARRAY_BUFFER, matrices.nbytes, matrices, gl.GL_STATIC_DRAW)
+        gpu_resources.track("buffer", self.instanceVBO, self, matrices.nbytes)
 
         gl.glBindVertexArray(self.mesh.VAO)
 
@@ -39,13 +40,14 @@ class InstancedMeshObject(Object):
             gl.glVertexAttribDivisor(loc, 1)
 
         # Optional per-instance colors at location 8
+        self.colorVBO = None
         if self.colors is not None and len(self.colors) > 0:
             loc = 8
-            colors = np.array([np.array(c.to_list() if hasattr(c, "to_list") else c, dtype=np.float32)
-                               for c in self.colors], dtype=np.float32)
+            colors = self._color_array(self.colors)
             self.colorVBO = gl.glGenBuffers(1)
             gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.colorVBO)
             gl.glBufferData(gl.GL_ARRAY_BUFFER, colors.nbytes, colors, gl.GL_STATIC_DRAW)
+            gpu_resources.track("buffer", self.colorVBO, self, colors.nbytes)
 
             gl.glEnableVertexAttribArray(loc)
             gl.glVertexAttribPointer(loc, 4, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
@@ -53,27 +55,54 @@ class InstancedMeshObject(Object):
 
         gl.glBindVertexArray(0)
 
+    @staticmethod
+    def _matrix_array(transforms):
+        """list of glm.mat4, or a (N, 4, 4) array already in glm column-major layout -> (N, 16) float32"""
+        if isinstance(transforms, np.ndarray):
+            return np.ascontiguousarray(transforms, dtype=np.float32).reshape(-1, 16)
+        return np.array([np.array(m.to_list(), dtype=np.float32).flatten()
+                         for m in transforms], dtype=np.float32)
+
+    @staticmethod
+    def _color_array(colors):
+        """list of glm.vec4 / sequences, or a (N, 4) array -> (N, 4) float32"""
+        if isinstance(colors, np.ndarray):
+            return np.ascontiguousarray(colors, dtype=np.float32).reshape(-1, 4)
+        return np.array([np.array(c.to_list() if hasattr(c, "to_list") else c, dtype=np.float32)
+                         for c in colors], dtype=np.float32)
+
     def update_transforms(self, transforms):
         self.transforms = transforms
-        matrices = np.array([np.array(m.to_list(), dtype=np.float32).flatten()
-                             for m in self.transforms], dtype=np.float32)
+        matrices = self._matrix_array(self.transforms)
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
         gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, matrices.nbytes, matrices)
 
     def update_colors(self, colors):
         self.colors = colors
-        arr = np.array([np.array(c.to_list() if hasattr(c, "to_list") else c, dtype=np.float32)
-                        for c in self.colors], dtype=np.float32)
+        arr = self._color_array(self.colors)
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.colorVBO)
         gl.glBufferSubData(gl.GL_ARRAY_BUFFER, 0, arr.nbytes, arr)
 
+    def delete(self):
+        """Deletes the instance buffers and drops the mesh (whose VAO holds them) and material."""
+        if self.instanceVBO is None:
+            return
+        for bo in (self.instanceVBO, self.colorVBO):
+            if bo:
+                gl.glDeleteBuffers(1, [bo])
+                gpu_resources.untrack("buffer", bo)
+        self.instanceVBO = None
+        self.colorVBO = None
+        gpu_resources.release(self.mesh)
+        gpu_resources.release(self.material)
+
     def draw(self, camera, lights):
         self.material.set_uniforms(True, self, camera, lights)
 
         gl.glBindVertexArray(self.mesh.VAO)
 
         if self.mesh.IndexBO is not None:
-            gl.glDrawElementsInstanced(gl.GL_TRIANGLES, len(self.mesh.indices), gl.GL_UNSIGNED_INT, None, self.amount)
+            gl.glDrawElementsInstanced(gl.GL_TRIANGLES, len(self.mesh.indices), self.mesh.indexType(), None, self.amount)
         else:
             gl.glDrawArraysInstanced(gl.GL_TRIANGLES, 0, len(self.mesh.vertices), self.amount)
 
@@ -1,17 +1,31 @@
 from pyglm import glm
 from .object import *
 import OpenGL.GL as gl
+from ..utils.gpu_resources import gpu_resources
 
 class MeshObject(Object):
     def __init__(self, mesh, material, transform=glm.mat4(1.0), draw_mode=gl.GL_TRIANGLES, enable_blending=False, blend_func=(gl.GL_SRC_ALPHA, gl.GL_ONE_MINUS_SRC_ALPHA)):
         super().__init__(transform)
-        self.mesh = mesh
-        self.material = material
+        # Shapes and materials may be shared: delete() releases them through gpu_resources
+        self.mesh = gpu_resources.retain(mesh)
+        self.material = gpu_resources.retain(material)
         self.visible = True
+        # Optional vec4 multiplied into the vertex colours (shader.vert, non-instanced path)
+        self.tint = None
         self.draw_mode = draw_mode
         self.enable_blending = enable_blending
         self.blend_func = blend_func
 
+    def delete(self):
+        """Drops this object's references; the mesh and material are deleted with their last user."""
+        if self.mesh is None:
+            return
+        gpu_resources.release(self.mesh)
+        gpu_resources.release(self.material)
+        self.mesh = None
+        self.material = None
+        self.visible = False
+
     def draw(self, camera, lights):
         if self.visible == False:
             return
@@ -40,7 +54,7 @@ class MeshObject(Object):
              # However, if the mesh has indices, DrawElements is safer to respect the mesh structure.
              # But usually point clouds ignore connectivity.
              # Let's stick to DrawElements if indices exist, it works for GL_POINTS too.
-            gl.glDrawElements(self.draw_mode, len(self.mesh.indices), gl.GL_UNSIGNED_INT, None)
+            gl.glDrawElements(self.draw_mode, len(self.mesh.indices), self.mesh.indexType(), None)
         else:
             gl.glDrawArrays(self.draw_mode, 0, len(self.mesh.vertices))
 
@@ -0,0 +1,103 @@
+import numpy as np
+import ctypes
+import OpenGL.GL as gl
+from .object import *
+from ..utils.gpu_resources import gpu_resources
+
+class SpinningInstancesObject(Object):
+    """
+    One instanced draw of a shared mesh, each instance spinning about its own axis.
+    Per-instance data (base transform, spin axis and speed) is uploaded once; the spin
+    is evaluated in the vertex shader (INSTANCED path) from the "spin_time" uniform:
+        world = transform * base * rotate(speed * spin_time, axis)
+    The object owns its own VAO over the mesh buffers, so a mesh from a shared cache
+    can be drawn by several of these without their instance attributes clashing.
+    """
+    def __init__(self, mesh, material, base_transforms, axes, speeds, transform=glm.mat4(1.0), draw_mode=gl.GL_TRIANGLES):
+        super().__init__(transform)
+        self.mesh = mesh
+        self.material = material
+        self.draw_mode = draw_mode
+        self.visible = True
+        self.amount = len(base_transforms)
+        self.spin_time = 0.0
+
+        # (amount, 16) in to_list() layout (glm.mat4 list or (amount, 4, 4) array), then (amount, 4) axis + speed
+        self._matrices = np.array([m.to_list() if hasattr(m, "to_list") else m for m in base_transforms], dtype=np.float32).reshape(-1, 16)
+        self._spins = np.array([[a.x, a.y, a.z, s] for a, s in zip(axes, speeds)], dtype=np.float32).reshape(-1, 4)
+
+        self.VAO = None
+        self.instanceVBO = None
+        self._create_buffers()
+
+    def _create_buffers(self):
+        # Ensure mesh buffers exist
+        if getattr(self.mesh, "VAO", None) is None:
+            self.mesh.createGeometry()
+            self.mesh.createBuffers()
+
+        self.VAO = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.VAO)
+
+        # 1. Mesh attributes (same locations as Shape.createBuffers)
+        for loc, bo, size in ((0, self.mesh.VertexBO, 4), (1, self.mesh.NormalBO, 3),
+                              (2, self.mesh.ColorBO, 4), (3, self.mesh.UVBO, 2)):
+            if bo:
+                gl.glBindBuffer(gl.GL_ARRAY_BUFFER, bo)
+                gl.glEnableVertexAttribArray(loc)
+                gl.glVertexAttribPointer(loc, size, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
+        if self.mesh.IndexBO:
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.mesh.IndexBO)
+
+        # 2. Instance data in one buffer: matrices, then spins
+        self.instanceVBO = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
+        data = np.concatenate([self._matrices.ravel(), self._spins.ravel()])
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data, gl.GL_STATIC_DRAW)
+        gpu_resources.track("vertex_array", self.VAO, self)
+        gpu_resources.track("buffer", self.instanceVBO, self, data.nbytes)
+
+        # Mat4 = 4 vec4s at locations 4,5,6,7
+        stride = 64
+        for i in range(4):
+            loc = 4 + i
+            gl.glEnableVertexAttribArray(loc)
+            gl.glVertexAttribPointer(loc, 4, gl.GL_FLOAT, gl.GL_FALSE, stride, ctypes.c_void_p(i * 16))
+            gl.glVertexAttribDivisor(loc, 1)
+
+        # Axis + speed at location 8
+        gl.glEnableVertexAttribArray(8)
+        gl.glVertexAttribPointer(8, 4, gl.GL_FLOAT, gl.GL_FALSE, 0, ctypes.c_void_p(self._matrices.nbytes))
+        gl.glVertexAttribDivisor(8, 1)
+
+        gl.glBindVertexArray(0)
+
+    def draw(self, camera, lights):
+        if not self.visible or self.amount == 0:
+            return
+
+        self.material.uniforms["spin_time"] = self.spin_time
+        self.material.set_uniforms(True, self, camera, lights)
+
+        if self.draw_mode == gl.GL_POINTS:
+            gl.glEnable(gl.GL_PROGRAM_POINT_SIZE)
+
+        gl.glBindVertexArray(self.VAO)
+        if self.mesh.IndexBO is not None and self.draw_mode != gl.GL_POINTS:
+            gl.glDrawElementsInstanced(self.draw_mode, len(self.mesh.indices), self.mesh.indexType(), None, self.amount)
+        else:
+            gl.glDrawArraysInstanced(self.draw_mode, 0, len(self.mesh.vertices), self.amount)
+        gl.glBindVertexArray(0)
+
+        if self.draw_mode == gl.GL_POINTS:
+            gl.glDisable(gl.GL_PROGRAM_POINT_SIZE)
+
+    def delete(self):
+        """Deletes the VAO and instance buffer; the mesh buffers belong to the mesh."""
+        if self.VAO is not None:
+            gl.glDeleteVertexArrays(1, [self.VAO])
+            gl.glDeleteBuffers(1, [self.instanceVBO])
+            gpu_resources.untrack("vertex_array", self.VAO)
+            gpu_resources.untrack("buffer", self.instanceVBO)
+            self.VAO = None
+            self.instanceVBO = None
@@ -0,0 +1,149 @@
+import numpy as np
+import ctypes
+import OpenGL.GL as gl
+from pyglm import glm
+from .object import Object
+from ..materials import Material
+from ..utils.gpu_resources import gpu_resources
+from ..light import PointLight
+from ..utils.street_light import StreetLight
+from ..utils.mesh_arrays import to_matrix_array
+from ..utils.frustum import frustum_planes, aabbs_in_frustum
+
+# Per instance: mat4 (glm column-major) then vec4 tint
+INSTANCE_FLOATS = 20
+INSTANCE_BYTES = INSTANCE_FLOATS * 4
+
+
+class StreetLightLayer(Object):
+    """
+    Every street light of the city from one StreetLight mesh and one instance buffer.
+    Poses are sorted into square ground tiles, so each tile is a contiguous instance range;
+    tiles outside the view frustum are skipped and runs of visible tiles are drawn with
+    glDrawElementsInstancedBaseInstance (one call per run, one in total when all are visible).
+    Each lamp also gets a local PointLight (see .lights) at its bulb for clustered shading.
+    """
+    def __init__(self, poses, material=None, tile_size=64.0, color=glm.vec4(1.0),
+                 light_radius=12.0, light_color=glm.vec4(1.0, 0.85, 0.6, 1.0)):
+        super().__init__()
+        self.visible = True
+        self.cull = True
+        self.tile_size = tile_size
+
+        street_light = StreetLight()
+        self.mesh = street_light.generate_mesh()
+        if material is None:
+            material = Material()
+        self.material = gpu_resources.retain(material)
+        # Tint the mesh's own colours (dark pole, bright bulb) instead of replacing them
+        self.material.uniforms["use_vertex_color"] = True
+
+        # 1. Poses -> (N, 4, 4) in glm layout, sorted by tile
+        mats = to_matrix_array(poses) if len(poses) > 0 else np.empty((0, 4, 4), dtype=np.float32)
+        positions = mats[:, 3, :3]
+        keys = np.floor(positions[:, [0, 2]] / tile_size).astype(np.int64)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        mats = mats[order]
+        positions = positions[order]
+        keys = keys[order]
+
+        self.amount = len(mats)
+        self.instances = np.empty((self.amount, INSTANCE_FLOATS), dtype=np.float32)
+        self.instances[:, :16] = mats.reshape(-1, 16)
+        self.instances[:, 16:] = color.to_list()
+
+        # 2. Tiles: contiguous ranges plus bounds padded by the light's reach around its base
+        if self.amount:
+            new_tile = np.concatenate(([True], np.any(keys[1:] != keys[:-1], axis=1)))
+            self.tile_starts = np.nonzero(new_tile)[0]
+        else:
+            self.tile_starts = np.empty(0, dtype=np.int64)
+        self.tile_counts = np.diff(np.append(self.tile_starts, self.amount))
+
+        reach = float(np.linalg.norm(self.mesh.vertices[:, :3], axis=1).max())
+        if self.amount:
+            self.tile_mins = np.minimum.reduceat(positions, self.tile_starts, axis=0) - reach
+            self.tile_maxs = np.maximum.reduceat(positions, self.tile_starts, axis=0) + reach
+        else:
+            self.tile_mins = self.tile_maxs = np.empty((0, 3), dtype=np.float32)
+
+        # 3. One local light per bulb: pose * bulb_offset
+        offset = street_light.bulb_offset
+        bulbs = positions + offset.x * mats[:, 0, :3] + offset.y * mats[:, 1, :3] + offset.z * mats[:, 2, :3]
+        self.lights = [PointLight(glm.vec3(*p), light_color, radius=light_radius) for p in bulbs.tolist()]
+
+        # Last frame's numbers, for the UI / profiling
+        self.drawn_instances = 0
+        self.draw_calls = 0
+
+        self.VAO = None
+        self.instanceVBO = None
+
+    def tile_count(self):
+        return len(self.tile_starts)
+
+    def _create_buffers(self):
+        # The layer owns its mesh, so the instance attributes can live on the mesh VAO
+        self.mesh.createBuffers()
+        self.VAO = self.mesh.VAO
+
+        self.instanceVBO = gl.glGenBuffers(1)
+        gl.glBindVertexArray(self.VAO)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instanceVBO)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, self.instances.nbytes, self.instances, gl.GL_STATIC_DRAW)
+        gpu_resources.track("buffer", self.instanceVBO, self, self.instances.nbytes)
+
+        # Mat4 = 4 vec4s at locations 4,5,6,7, tint at location 8
+        for i in range(5):
+            loc = 4 + i
+            gl.glEnableVertexAttribArray(loc)
+            gl.glVertexAttribPointer(loc, 4, gl.GL_FLOAT, gl.GL_FALSE, INSTANCE_BYTES, ctypes.c_void_p(i * 16))
+            gl.glVertexAttribDivisor(loc, 1)
+
+        gl.glBindVertexArray(0)
+
+    def visible_ranges(self, camera):
+        """(start, count) instance ranges to draw: visible tiles, adjacent ones merged."""
+        if self.amount == 0:
+            return []
+        if not self.cull:
+            return [(0, self.amount)]
+
+        visible = aabbs_in_frustum(frustum_planes(camera.projection, camera.view), self.tile_mins, self.tile_maxs)
+        ranges = []
+        for start, count in zip(self.tile_starts[visible].tolist(), self.tile_counts[visible].tolist()):
+            if ranges and ranges[-1][0] + ranges[-1][1] == start:
+                ranges[-1][1] += count
+            else:
+                ranges.append([start, count])
+        return ranges
+
+    def draw(self, camera, lights):
+        if self.visible == False or self.amount == 0:
+            return
+
+        if self.VAO is None:
+            self._create_buffers()
+
+        ranges = self.visible_ranges(camera)
+        self.draw_calls = len(ranges)
+        self.drawn_instances = sum(count for _, count in ranges)
+        if not ranges:
+            return
+
+        self.material.set_uniforms(True, self, camera, lights)
+        gl.glBindVertexArray(self.VAO)
+        index_count = len(self.mesh.indices)
+        for start, count in ranges:
+            gl.glDrawElementsInstancedBaseInstance(gl.GL_TRIANGLES, index_count, self.mesh.indexType(), None, count, start)
+        gl.glBindVertexArray(0)
+
+    def delete(self):
+        if self.VAO is None:
+            return
+        gl.glDeleteBuffers(1, [self.instanceVBO])
+        gpu_resources.untrack("buffer", self.instanceVBO)
+        self.mesh.delete()
+        gpu_resources.release(self.material)
+        self.VAO = None
+        self.instanceVBO = None
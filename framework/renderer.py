@@ -9,6 +9,9 @@ from .window import *
 from .shapes import *
 from .shapes import *
 from .light  import *
+from .light_clusters import LightClusters
+from .utils.profiler import profiler
+from .utils.gpu_resources import gpu_resources
 from .materials.shaders import createShader
 import ctypes
 
@@ -33,20 +36,44 @@ class GLRenderer ():
 
         self.objects = []
 
-        # light sources
-        self.lights = []
+        # light sources (a LightList: changes bump its version, see LightClusters.update)
+        self.lights = LightList()
+        # Bins local point lights (PointLight with a radius) into view clusters, created on first render
+        self.light_clusters = None
         self.clear_color = [0.0, 0.0, 0.0, 1.0] # Default to black
 
+        # Offscreen targets are render_scale * output size and upscaled in the post pass
+        # (needs init_post_process). dynamic_resolution: optional DynamicResolution controller.
+        self.render_scale = 1.0
+        self.min_render_scale = 0.25
+        self.dynamic_resolution = None
+
     def setCamera (self, camera):
         self.glwindow.camera = camera
 
     def delete (self):
-        gl.glDeleteFramebuffers(1, [self.fbo])
-        gl.glDeleteTextures([self.texture_color_buffer])
-        gl.glDeleteRenderbuffers(1, [self.rbo])
+        if hasattr(self, 'fbo'):
+            gl.glDeleteFramebuffers(1, [self.fbo])
+            gl.glDeleteTextures([self.texture_color_buffer])
+            gl.glDeleteRenderbuffers(1, [self.rbo])
+            gl.glDeleteProgram(self.post_shader)
+            gl.glDeleteVertexArrays(1, [self.quadVAO])
+            gl.glDeleteBuffers(1, [self.quadVBO])
+            for kind, gl_id in (("framebuffer", self.fbo), ("texture", self.texture_color_buffer), ("renderbuffer", self.rbo),
+                                ("program", self.post_shader), ("vertex_array", self.quadVAO), ("buffer", self.quadVBO)):
+                gpu_resources.untrack(kind, gl_id)
+            del self.fbo
+        if self.dynamic_resolution is not None:
+            self.dynamic_resolution.delete()
+        if self.light_clusters is not None:
+            self.light_clusters.delete()
         return
     
     def init_post_process(self, width, height):
+        self.output_size = (width, height)
+        self.target_size = self._scaled_size(width, height)
+        width, height = self.target_size
+
         # 1. Framebuffer
         self.fbo = gl.glGenFramebuffers(1)
         gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
@@ -70,6 +97,7 @@ class GLRenderer ():
             print("ERROR::FRAMEBUFFER:: Framebuffer is not complete!", file=sys.stderr)
             
         gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
+        self._track_targets(width, height)
         
         # 4. Post-Process Shader
         shader_dir = os.path.join(os.path.dirname(__file__), 'shaders')
@@ -77,6 +105,7 @@ class GLRenderer ():
             os.path.join(shader_dir, "post_process.vert"),
             os.path.join(shader_dir, "post_process.frag")
         )
+        gpu_resources.track("program", self.post_shader, self)
         self.use_post_process = False
         self.aberration_strength = 0.005
         self.blur_strength = 0.0
@@ -84,13 +113,45 @@ class GLRenderer ():
         # 5. Screen Quad VAO
         self.setup_quad()
 
+    def _scaled_size(self, width, height):
+        return (max(1, int(round(width * self.render_scale))), max(1, int(round(height * self.render_scale))))
+
+    def _allocate_targets(self, width, height):
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_color_buffer)
+        gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGB, width, height, 0, gl.GL_RGB, gl.GL_UNSIGNED_BYTE, None)
+
+        gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.rbo)
+        gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_DEPTH24_STENCIL8, width, height)
+        self.target_size = (width, height)
+        self._track_targets(width, height)
+
+    def _track_targets(self, width, height):
+        # RGB8 colour (padded to 4 bytes by most drivers) and D24S8 depth
+        gpu_resources.track("framebuffer", self.fbo, self)
+        gpu_resources.track("texture", self.texture_color_buffer, self, width * height * 4)
+        gpu_resources.track("renderbuffer", self.rbo, self, width * height * 4)
+
     def resize_post_process(self, width, height):
         if hasattr(self, 'texture_color_buffer'):
-            gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_color_buffer)
-            gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGB, width, height, 0, gl.GL_RGB, gl.GL_UNSIGNED_BYTE, None)
-            
-            gl.glBindRenderbuffer(gl.GL_RENDERBUFFER, self.rbo)
-            gl.glRenderbufferStorage(gl.GL_RENDERBUFFER, gl.GL_DEPTH24_STENCIL8, width, height)
+            self.output_size = (width, height)
+            self._allocate_targets(*self._scaled_size(width, height))
+
+    def set_render_scale(self, scale):
+        """
+        Sets the resolution of the offscreen targets relative to the output (clamped to
+        [min_render_scale, 1]). The targets are only reallocated when their pixel size changes.
+        """
+        self.render_scale = min(max(scale, self.min_render_scale), 1.0)
+        if hasattr(self, 'texture_color_buffer'):
+            size = self._scaled_size(*self.output_size)
+            if size != self.target_size:
+                self._allocate_targets(*size)
+
+    def _render_offscreen(self):
+        # Post effects need the offscreen pass, and so does a reduced render scale (for the upscale)
+        if not hasattr(self, 'fbo'):
+            return False
+        return self.use_post_process or self.target_size != self.output_size
 
     def setup_quad(self):
         # Fullscreen quad coordinates
@@ -111,6 +172,8 @@ class GLRenderer ():
         gl.glBindVertexArray(self.quadVAO)
         gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.quadVBO)
         gl.glBufferData(gl.GL_ARRAY_BUFFER, quad_vertices.nbytes, quad_vertices, gl.GL_STATIC_DRAW)
+        gpu_resources.track("vertex_array", self.quadVAO, self)
+        gpu_resources.track("buffer", self.quadVBO, self, quad_vertices.nbytes)
         
         # Position
         gl.glEnableVertexAttribArray(0)
@@ -130,10 +193,30 @@ class GLRenderer ():
             return
         self.objects.append(obj)
 
+    def _post_pass(self):
+        # Bind Default Framebuffer (Screen)
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
+        gl.glViewport(0, 0, *self.output_size)
+        gl.glDisable(gl.GL_DEPTH_TEST) # Disable depth test so quad is always drawn
+        gl.glClearColor(1.0, 1.0, 1.0, 1.0) 
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        
+        gl.glUseProgram(self.post_shader)
+        gl.glUniform1i(gl.glGetUniformLocation(self.post_shader, "screenTexture"), 0)
+        effects = 1.0 if self.use_post_process else 0.0
+        gl.glUniform1f(gl.glGetUniformLocation(self.post_shader, "aberration_strength"), self.aberration_strength * effects)
+        gl.glUniform1f(gl.glGetUniformLocation(self.post_shader, "blur_strength"), self.blur_strength * effects)
+        
+        gl.glBindVertexArray(self.quadVAO)
+        gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_color_buffer)
+        gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+
     def render (self):
         # 1. Bind Framebuffer if enabled
-        if hasattr(self, 'use_post_process') and self.use_post_process:
+        offscreen = self._render_offscreen()
+        if offscreen:
             gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.fbo)
+            gl.glViewport(0, 0, *self.target_size)
         else:
             gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
 
@@ -141,26 +224,28 @@ class GLRenderer ():
         gl.glClear(gl.GL_COLOR_BUFFER_BIT | gl.GL_DEPTH_BUFFER_BIT)
         gl.glEnable(gl.GL_DEPTH_TEST)
 
-        # 2. Draw Scene
-        for o in self.objects:
-            o.draw(self.glwindow.camera, self.lights)
-            
-        # 3. Post-Process Pass
-        if hasattr(self, 'use_post_process') and self.use_post_process:
-            # Bind Default Framebuffer (Screen)
-            gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
-            gl.glDisable(gl.GL_DEPTH_TEST) # Disable depth test so quad is always drawn
-            gl.glClearColor(1.0, 1.0, 1.0, 1.0) 
-            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
-            
-            gl.glUseProgram(self.post_shader)
-            gl.glUniform1i(gl.glGetUniformLocation(self.post_shader, "screenTexture"), 0)
-            gl.glUniform1f(gl.glGetUniformLocation(self.post_shader, "aberration_strength"), self.aberration_strength)
-            gl.glUniform1f(gl.glGetUniformLocation(self.post_shader, "blur_strength"), self.blur_strength)
+        # 2. Cluster the local lights; the global ones go to every draw as uniforms
+        if self.light_clusters is None:
+            self.light_clusters = LightClusters()
+        with profiler.scope("lights", gpu=True):
+            lights = self.light_clusters.update(self.glwindow.camera, self.lights)
+
+        # Time only the scene and post passes: clustering above is CPU work
+        if self.dynamic_resolution is not None:
+            self.dynamic_resolution.begin_frame()
+
+        # 3. Draw Scene
+        with profiler.scope("scene", gpu=True):
+            for o in self.objects:
+                o.draw(self.glwindow.camera, lights)
             
-            gl.glBindVertexArray(self.quadVAO)
-            gl.glBindTexture(gl.GL_TEXTURE_2D, self.texture_color_buffer)
-            gl.glDrawArrays(gl.GL_TRIANGLES, 0, 6)
+        # 4. Post-Process Pass (also upscales a reduced render scale, with bilinear filtering)
+        if offscreen:
+            with profiler.scope("post", gpu=True):
+                self._post_pass()
+
+        if self.dynamic_resolution is not None:
+            self.dynamic_resolution.end_frame()
             
         # if self.glwindow.camera.draw_camera:
             # print("fixme")
@@ -17,9 +17,33 @@ out float dist_to_cam;
 out float v_density;
 flat out vec2 v_scale_ratios;
 
+#ifdef INSTANCED
+// Static per-instance data; the spin is evaluated here from spin_time
+uniform float spin_time;
+layout(location = 4) in mat4 in_instance_model;
+layout(location = 8) in vec4 in_instance_spin; // xyz = unit axis, w = angular speed (rad/s)
+
+// Same matrix as glm.rotate(angle, axis)
+mat4 spin_rotation(vec3 axis, float angle)
+{
+    float c = cos(angle);
+    float s = sin(angle);
+    vec3 t = (1.0 - c) * axis;
+    return mat4(
+        vec4(c + t.x * axis.x, t.x * axis.y + s * axis.z, t.x * axis.z - s * axis.y, 0.0),
+        vec4(t.y * axis.x - s * axis.z, c + t.y * axis.y, t.y * axis.z + s * axis.x, 0.0),
+        vec4(t.z * axis.x + s * axis.y, t.z * axis.y - s * axis.x, c + t.z * axis.z, 0.0),
+        vec4(0.0, 0.0, 0.0, 1.0));
+}
+#endif
+
 void main()
 {
-    vec4 world_pos = model * vec4(position, 1.0);
+    mat4 M = model;
+#ifdef INSTANCED
+    M = model * in_instance_model * spin_rotation(in_instance_spin.xyz, in_instance_spin.w * spin_time);
+#endif
+    vec4 world_pos = M * vec4(position, 1.0);
     frag_pos = world_pos.xyz;
     vec4 view_pos = view * world_pos;
     
@@ -11,6 +11,24 @@ uniform float diffuse_strength = 1.0;
 uniform float shininess = 64.0;
 uniform vec2 texture_scale;
 
+// Clustered local lights (see light_clusters.py)
+struct ClusterLight {
+    vec4 pos_radius;
+    vec4 color;
+};
+layout(std430, binding = 1) readonly buffer ClusterLights {
+    ClusterLight cluster_lights[];
+};
+layout(std430, binding = 2) readonly buffer ClusterGrid {
+    uvec4 cluster_dims;     // x, y, z cluster counts, w = light count
+    vec4 cluster_params;    // viewport width, height, log depth scale, log depth bias
+    uvec2 cluster_ranges[]; // (offset, count) into cluster_light_indices
+};
+layout(std430, binding = 3) readonly buffer ClusterIndices {
+    uint cluster_light_indices[];
+};
+uniform bool use_light_clusters = false;
+
 in vec3 frag_normal;
 in vec4 frag_color;   //diffuse
 in vec4 frag_pos;
@@ -97,5 +115,37 @@ void main()
         result += diffuse + specular;
     }
 
+    if (use_light_clusters) {
+        // Cluster of this fragment: screen tile and exponential depth slice
+        float view_depth = -(view * frag_pos).z;
+        vec2 tile = clamp(gl_FragCoord.xy / cluster_params.xy * vec2(cluster_dims.xy), vec2(0.0), vec2(cluster_dims.xy) - 1.0);
+        float slice = clamp(floor(log(max(view_depth, 1e-4)) * cluster_params.z + cluster_params.w), 0.0, float(cluster_dims.z) - 1.0);
+        uint cluster = (uint(slice) * cluster_dims.y + uint(tile.y)) * cluster_dims.x + uint(tile.x);
+        uvec2 range = cluster_ranges[cluster];
+
+        for (uint i = 0u; i < range.y; ++i) {
+            ClusterLight light = cluster_lights[cluster_light_indices[range.x + i]];
+            vec3 to_light = light.pos_radius.xyz - frag_pos.xyz;
+            float distance = length(to_light);
+            float radius = light.pos_radius.w;
+            if (distance >= radius) continue;
+
+            vec3 L = to_light / max(distance, 1e-4);
+
+            // Same street lamp model as the point lights above, windowed to reach 0 at the radius
+            float window = clamp(1.0 - pow(distance / radius, 4.0), 0.0, 1.0);
+            float attenuation = window * window / (1.0 + 0.1 * distance + 0.05 * distance * distance);
+            float spotEffect = smoothstep(0.3, 0.5, dot(-L, vec3(0.0, -1.0, 0.0)));
+
+            float diff = max(dot(N, L), 0.0);
+            vec3 diffuse = diffuse_strength * base_color * diff * light.color.rgb;
+            vec3 H = normalize(L + V);
+            float spec = pow(max(dot(N, H), 0.0), shininess);
+            vec3 specular = specular_strength * spec * light.color.rgb;
+
+            result += (diffuse + specular) * attenuation * spotEffect;
+        }
+    }
+
     out_color = vec4(result, frag_color.a);
 }
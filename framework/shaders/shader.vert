@@ -3,6 +3,7 @@
 uniform mat4 view;
 uniform mat4 projection;
 uniform mat4 model;
+uniform vec4 tint = vec4(1.0); // per-object colour variation (MeshObject.tint)
 
 layout(location = 0) in vec4 in_position;
 layout(location = 1) in vec3 in_normal;
@@ -13,6 +14,7 @@ layout(location = 3) in vec2 in_uv;
 #ifdef INSTANCED
 layout(location = 4) in mat4 in_instance_model;
 layout(location = 8) in vec4 in_instance_color;
+uniform bool use_vertex_color; // true: instance colour tints the vertex colour instead of replacing it
 #endif
 
 out vec3 frag_normal;
@@ -27,10 +29,10 @@ void main()
 
 #ifdef INSTANCED
     M = model * in_instance_model;
-    base_color = in_instance_color;
+    base_color = use_vertex_color ? in_color * in_instance_color : in_instance_color;
 #else
     M = model;
-    base_color = in_color;
+    base_color = in_color * tint;
 #endif
 
     gl_Position = projection * view * M * in_position;
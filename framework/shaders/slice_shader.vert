@@ -11,11 +11,35 @@ in vec2 uv;
 out vec3 world_pos;
 out vec3 frag_normal;
 
+#ifdef INSTANCED
+// Static per-instance data; the spin is evaluated here from spin_time
+uniform float spin_time;
+layout(location = 4) in mat4 in_instance_model;
+layout(location = 8) in vec4 in_instance_spin; // xyz = unit axis, w = angular speed (rad/s)
+
+// Same matrix as glm.rotate(angle, axis)
+mat4 spin_rotation(vec3 axis, float angle)
+{
+    float c = cos(angle);
+    float s = sin(angle);
+    vec3 t = (1.0 - c) * axis;
+    return mat4(
+        vec4(c + t.x * axis.x, t.x * axis.y + s * axis.z, t.x * axis.z - s * axis.y, 0.0),
+        vec4(t.y * axis.x - s * axis.z, c + t.y * axis.y, t.y * axis.z + s * axis.x, 0.0),
+        vec4(t.z * axis.x + s * axis.y, t.z * axis.y - s * axis.x, c + t.z * axis.z, 0.0),
+        vec4(0.0, 0.0, 0.0, 1.0));
+}
+#endif
+
 void main()
 {
-    vec4 world_pos4 = model * vec4(position, 1.0);
+    mat4 M = model;
+#ifdef INSTANCED
+    M = model * in_instance_model * spin_rotation(in_instance_spin.xyz, in_instance_spin.w * spin_time);
+#endif
+    vec4 world_pos4 = M * vec4(position, 1.0);
     world_pos = world_pos4.xyz;
-    frag_normal = mat3(transpose(inverse(model))) * normal;
+    frag_normal = mat3(transpose(inverse(M))) * normal;
     
     gl_Position = projection * view * world_pos4;
 }
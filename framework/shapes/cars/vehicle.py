@@ -3,14 +3,19 @@ from framework.objects import MeshObject, Object
 from framework.shapes import Cube, Cylinder
 from framework.shapes.trapezoid import Trapezoid
 from framework.materials import Material
+from framework.utils.gpu_resources import gpu_resources
 
-# Shared Materials Builder
-def get_materials():
-    # grey body
+def get_body_material():
+    # grey body (also what merged vehicles are drawn with)
     body = Material()
     body.diffuse_strength = 0.6
     body.specular_strength = 0.9
     body.shininess = 64.0
+    return body
+
+# Shared Materials Builder
+def get_materials():
+    body = get_body_material()
     
     # black wheels
     wheel = Material()
@@ -30,10 +35,16 @@ def get_materials():
     return body, wheel, glass, glow
 
 class BaseVehicle(Object):
-    def __init__(self, transform=glm.mat4(1.0)):
+    def __init__(self, transform=glm.mat4(1.0), materials=None):
+        """
+        materials: (body, wheel, glass, glow); None creates a new set. Geometry that is only
+        merged (VehiclePrototypeCache) passes one shared material four times.
+        """
         super().__init__(transform)
         self.parts = []
-        self.body_mat, self.wheel_mat, self.glass_mat, self.glow_mat = get_materials()
+        if materials is None:
+            materials = get_materials()
+        self.body_mat, self.wheel_mat, self.glass_mat, self.glow_mat = materials
         self.create_geometry()
         
     def regenerate(self):
@@ -42,6 +53,15 @@ class BaseVehicle(Object):
 
     def create_geometry(self):
         pass
+
+    def delete(self):
+        """Releases the parts, then deletes the materials no one else retained (e.g. a batched body_mat survives)."""
+        for part in self.parts:
+            part.delete()
+        self.parts = []
+        for mat in (self.body_mat, self.wheel_mat, self.glass_mat, self.glow_mat):
+            if gpu_resources.refcount(mat) == 0:
+                mat.delete()
         
     def draw(self, camera, lights):
         for part in self.parts:
@@ -2,6 +2,20 @@ from pyglm import glm
 import numpy as np
 import OpenGL.GL as gl
 import ctypes
+from ..utils.gpu_resources import gpu_resources
+
+# Half-float uvs are only used when every |uv| stays below this (error < 1/512 of a tile);
+# tiled building facades go well past it and keep float32 uvs.
+HALF_UV_LIMIT = 4.0
+
+def pack_normals_2_10_10_10(normals):
+    """
+    Packs unit normals (N,3) into GL_INT_2_10_10_10_REV words (x in the low bits, w = 0).
+    """
+    q = np.clip(np.rint(np.asarray(normals, dtype=np.float32) * 511.0), -511, 511).astype(np.int32)
+    q &= 0x3FF
+    return (q[:, 0] | (q[:, 1] << 10) | (q[:, 2] << 20)).astype(np.uint32)
+
 
 class Shape:
     def __init__(self):
@@ -19,6 +33,13 @@ class Shape:
         self.ColorBO  = None
         self.UVBO     = None
         self.IndexBO  = None
+        self.InterleavedBO = None
+
+        # Pre-packed compactLayout() vertices (e.g. mapped from a .bkmesh); uploaded as they are
+        self.interleaved = None
+
+        # bytes per vertex of the uploaded layout (set by createBuffers)
+        self.vertex_stride = 0
 
     def createGeometry(self):
         pass
@@ -26,7 +47,12 @@ class Shape:
     # ----------------------------
     # Buffer creation
     # ----------------------------
-    def createBuffers(self):
+    def createBuffers(self, compact=False):
+        # A pre-packed shape may have no float arrays: it only has the compact layout
+        if compact or self.interleaved is not None:
+            self.createCompactBuffers()
+            return
+
         self.VAO = gl.glGenVertexArrays(1)
         gl.glBindVertexArray(self.VAO)
 
@@ -69,13 +95,151 @@ class Shape:
 
         gl.glBindVertexArray(0)
 
+        self.vertex_stride = self.floatStride()
+        self._track_buffers()
+
+    def floatStride(self):
+        """
+        Bytes per vertex of the separate float32 buffers made by createBuffers.
+        """
+        stride = 4 * 4
+        for arr, comps in ((self.normals, 3), (self.colors, 4), (self.uvs, 2)):
+            if arr.any():
+                stride += 4 * comps
+        return stride
+
+    # ----------------------------
+    # Compact interleaved layout
+    # ----------------------------
+    def compactLayout(self):
+        """
+        Returns the numpy structured dtype used by createCompactBuffers.
+        Same attribute locations as createBuffers, so the shaders work unchanged:
+            position vec3 float32   (w = 1 is supplied by GL)
+            normal   10:10:10:2 snorm
+            color    RGBA8 unorm    (half floats if any channel is outside [0, 1])
+            uv       half2          (float2 if |uv| > HALF_UV_LIMIT)
+        """
+        fields = []
+        verts = np.asarray(self.vertices)
+        # Drop w only if it is always 1
+        if verts.shape[1] == 4 and not np.all(verts[:, 3] == 1.0):
+            fields.append(("position", np.float32, (4,)))
+        else:
+            fields.append(("position", np.float32, (3,)))
+
+        if self.normals.any():
+            fields.append(("normal", np.uint32))
+
+        if self.colors.any():
+            if self.colors.min() < 0.0 or self.colors.max() > 1.0:
+                fields.append(("color", np.float16, (4,)))
+            else:
+                fields.append(("color", np.uint8, (4,)))
+
+        if self.uvs.any():
+            if np.abs(self.uvs).max() <= HALF_UV_LIMIT:
+                fields.append(("uv", np.float16, (2,)))
+            else:
+                fields.append(("uv", np.float32, (2,)))
+
+        return np.dtype(fields)
+
+    def packCompact(self):
+        """
+        Packs the float arrays into one structured array with the compactLayout() dtype.
+        """
+        layout = self.compactLayout()
+        data = np.zeros(len(self.vertices), dtype=layout)
+        data["position"] = np.asarray(self.vertices)[:, :layout["position"].shape[0]]
+        if "normal" in layout.names:
+            data["normal"] = pack_normals_2_10_10_10(self.normals)
+        if "color" in layout.names:
+            if layout["color"].base == np.uint8:
+                data["color"] = np.rint(np.asarray(self.colors) * 255.0)
+            else:
+                data["color"] = self.colors
+        if "uv" in layout.names:
+            data["uv"] = self.uvs
+        return data
+
+    def createCompactBuffers(self):
+        """
+        Uploads one interleaved, quantized VBO instead of four float32 ones.
+        self.interleaved, if set, is uploaded without repacking.
+        """
+        # 1. Pack vertex data
+        data = self.interleaved if self.interleaved is not None else self.packCompact()
+        layout = data.dtype
+
+        # 2. Upload
+        self.VAO = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.VAO)
+
+        self.InterleavedBO = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.InterleavedBO)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data, gl.GL_STATIC_DRAW)
+
+        # 3. Attribute pointers (same locations as the float layout)
+        stride = layout.itemsize
+        for name, location in (("position", 0), ("normal", 1), ("color", 2), ("uv", 3)):
+            if name not in layout.names:
+                continue
+            field, offset = layout.fields[name][:2]
+            ptr = ctypes.c_void_p(offset)
+            gl.glEnableVertexAttribArray(location)
+
+            if name == "normal":
+                gl.glVertexAttribPointer(location, 4, gl.GL_INT_2_10_10_10_REV, gl.GL_TRUE, stride, ptr)
+            elif field.base == np.uint8:
+                gl.glVertexAttribPointer(location, field.shape[0], gl.GL_UNSIGNED_BYTE, gl.GL_TRUE, stride, ptr)
+            elif field.base == np.float16:
+                gl.glVertexAttribPointer(location, field.shape[0], gl.GL_HALF_FLOAT, gl.GL_FALSE, stride, ptr)
+            else:
+                gl.glVertexAttribPointer(location, field.shape[0], gl.GL_FLOAT, gl.GL_FALSE, stride, ptr)
+
+        # 4. Indices
+        if self.indices is not None and self.indices.any():
+            self.IndexBO = gl.glGenBuffers(1)
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.IndexBO)
+            gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, gl.GL_STATIC_DRAW)
+
+        gl.glBindVertexArray(0)
+
+        self.vertex_stride = stride
+        self._track_buffers(interleaved_bytes=data.nbytes)
+
+    def indexType(self):
+        """
+        GL index type matching the dtype of self.indices.
+        """
+        if self.indices is not None and self.indices.dtype == np.uint16:
+            return gl.GL_UNSIGNED_SHORT
+        return gl.GL_UNSIGNED_INT
+
     # ----------------------------
     # Cleanup
     # ----------------------------
+    def _track_buffers(self, interleaved_bytes=0):
+        """Registers the VAO and buffers made by createBuffers/createCompactBuffers with gpu_resources."""
+        gpu_resources.track("vertex_array", self.VAO, self)
+        for bo, arr in ((self.VertexBO, self.vertices), (self.NormalBO, self.normals),
+                        (self.ColorBO, self.colors), (self.UVBO, self.uvs), (self.IndexBO, self.indices)):
+            if bo:
+                gpu_resources.track("buffer", bo, self, arr.nbytes)
+        if self.InterleavedBO:
+            gpu_resources.track("buffer", self.InterleavedBO, self, interleaved_bytes)
+
     def delete(self):
+        """Deletes the GL buffers; safe to call twice. The CPU arrays stay, so createBuffers can run again."""
+        if self.VAO is None:
+            return
         gl.glDeleteVertexArrays(1, [self.VAO])
-        gl.glDeleteBuffers(1, [self.VertexBO])
-        if self.NormalBO: gl.glDeleteBuffers(1, [self.NormalBO])
-        if self.ColorBO:  gl.glDeleteBuffers(1, [self.ColorBO])
-        if self.UVBO:     gl.glDeleteBuffers(1, [self.UVBO])
-        if self.IndexBO:  gl.glDeleteBuffers(1, [self.IndexBO])
+        gpu_resources.untrack("vertex_array", self.VAO)
+        for name in ("VertexBO", "InterleavedBO", "NormalBO", "ColorBO", "UVBO", "IndexBO"):
+            bo = getattr(self, name)
+            if bo:
+                gl.glDeleteBuffers(1, [bo])
+                gpu_resources.untrack("buffer", bo)
+            setattr(self, name, None)
+        self.VAO = None
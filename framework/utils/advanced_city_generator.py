@@ -1,13 +1,110 @@
+import os
 import random
 import math
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pyglm import glm
 from .polygon import Polygon
 from framework.shapes.shape import Shape
 from .road_network import RoadNetwork
 
+DEFAULT_TEXTURES = ["brick1.png", "brick2.jpg", "brick3.jpg", "brick4.jpg", "concrete.jpg", "tile.jpg"]
+
+def _style_lot(lot, rng, available_textures):
+    """
+    Picks corner style, height and facade style for one lot.
+    All randomness comes from rng so a lot seed fully determines its building.
+    Returns (footprint, height, style).
+    """
+    # Random Corner Style
+    r = rng.random()
+    if r < 0.2:
+        lot = lot.chamfer(rng.uniform(2.0, 5.0))
+    elif r < 0.4:
+        lot = lot.fillet(rng.uniform(2.0, 5.0), segments=4)
+        
+    height = rng.uniform(10.0, 40.0) 
+    
+    # Random Style
+    style = {
+        "floor_height": rng.uniform(2.5, 4.0),
+        "window_ratio": rng.uniform(0.4, 0.8),
+        "inset_depth": rng.uniform(0.2, 0.8),
+        "color": glm.vec4(rng.uniform(0.7, 0.9), rng.uniform(0.7, 0.9), rng.uniform(0.7, 0.9), 1.0),
+        "window_color": glm.vec4(0.1, 0.2, 0.3 + rng.random()*0.3, 1.0),
+        "stepped": (height > 25.0) and (rng.random() < 0.4), 
+        "window_style": "vertical_stripes" if rng.random() < 0.5 else "single",
+        "texture": rng.choice(available_textures)
+    }
+    return lot, height, style
+
+def _generate_building_chunk(jobs, available_textures):
+    """
+    Worker entry point for building generation.
+    jobs: list of (lot_coords, seed) with lot_coords an (N, 2) float32 array.
+    Runs identically in a pool process or inline, so serial and parallel output match.
+    Returns the chunk packed by _pack_shapes.
+    """
+    from .building import Building
+    
+    shapes = []
+    for coords, seed in jobs:
+        rng = random.Random(seed)
+        lot = Polygon([glm.vec2(float(x), float(y)) for x, y in coords])
+        footprint, height, style = _style_lot(lot, rng, available_textures)
+        shapes.append(Building(footprint, height, style, rng=rng).generate())
+    return _pack_shapes(shapes)
+
+def _pack_shapes(shapes):
+    """
+    Concatenates many small shapes into a few contiguous arrays.
+    Pickling five large buffers is far cheaper than pickling thousands of Shape objects.
+    """
+    return {
+        "vertices": np.concatenate([s.vertices.reshape(-1, 4) for s in shapes]).astype(np.float32, copy=False),
+        "normals": np.concatenate([s.normals.reshape(-1, 3) for s in shapes]).astype(np.float32, copy=False),
+        "uvs": np.concatenate([s.uvs.reshape(-1, 2) for s in shapes]).astype(np.float32, copy=False),
+        "colors": np.concatenate([s.colors.reshape(-1, 4) for s in shapes]).astype(np.float32, copy=False),
+        "indices": np.concatenate([s.indices for s in shapes]).astype(np.uint32, copy=False),
+        "vertex_counts": np.array([len(s.vertices) for s in shapes], dtype=np.int64),
+        "index_counts": np.array([len(s.indices) for s in shapes], dtype=np.int64),
+        "texture_names": [getattr(s, 'texture_name', 'default') for s in shapes],
+    }
+
+def _unpack_shapes(packed):
+    """
+    Splits a packed chunk back into Shapes. The arrays are views into the packed buffers, no copies.
+    """
+    v_splits = np.cumsum(packed["vertex_counts"])[:-1]
+    i_splits = np.cumsum(packed["index_counts"])[:-1]
+    
+    per_shape = zip(
+        np.split(packed["vertices"], v_splits),
+        np.split(packed["normals"], v_splits),
+        np.split(packed["uvs"], v_splits),
+        np.split(packed["colors"], v_splits),
+        np.split(packed["indices"], i_splits),
+        packed["texture_names"]
+    )
+    
+    shapes = []
+    for verts, norms, uvs, cols, inds, t_name in per_shape:
+        shape = Shape()
+        shape.vertices = verts
+        shape.normals = norms
+        shape.uvs = uvs
+        shape.colors = cols
+        shape.indices = inds
+        shape.texture_name = t_name
+        shapes.append(shape)
+    return shapes
+
 class AdvancedCityGenerator:
-    def __init__(self, width=400.0, depth=400.0, min_block_area=4000.0, min_lot_area=1000.0, ortho_chance=0.9, town_square_radius=40.0):
+    # Below this many lots the process pool start-up costs more than it saves
+    PARALLEL_MIN_LOTS = 32
+
+    def __init__(self, width=400.0, depth=400.0, min_block_area=4000.0, min_lot_area=1000.0, ortho_chance=0.9, town_square_radius=40.0, seed=None, workers=None):
         self.width = width
         self.depth = depth
         self.min_block_area = min_block_area
@@ -15,6 +112,12 @@ class AdvancedCityGenerator:
         self.ortho_chance = ortho_chance
         self.town_square_radius = town_square_radius
         
+        # Explicit seed makes generate() reproducible (None = fresh entropy on every generate)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Building worker processes: None = one per CPU, 0 or 1 = generate inline
+        self.workers = workers
+        
         # Root Polygon (Rectangle centered at origin)
         self.root = Polygon([
             glm.vec2(-width/2, -depth/2),
@@ -32,7 +135,23 @@ class AdvancedCityGenerator:
         self.road_network = None
         self.street_light_poses = [] # List of glm.mat4
 
+    def get_params(self):
+        """
+        Returns the layout parameters that, together with the seed, fully determine the city.
+        """
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "min_block_area": self.min_block_area,
+            "min_lot_area": self.min_lot_area,
+            "ortho_chance": self.ortho_chance,
+            "town_square_radius": self.town_square_radius,
+        }
+
     def generate(self, texture_list=None):
+        # Restart the random stream so the same seed always yields the same city
+        self.rng = random.Random(self.seed)
+        
         self.blocks = []
         self.lots = []
         self.buildings = []
@@ -133,38 +252,49 @@ class AdvancedCityGenerator:
             self.lots.extend(block_lots)
             
         # 6. Generate Buildings
-        from .building import Building 
-        
         if texture_list and len(texture_list) > 0:
-            available_textures = texture_list
+            available_textures = list(texture_list)
         else:
-            available_textures = ["brick1.png", "brick2.jpg", "brick3.jpg", "brick4.jpg", "concrete.jpg", "tile.jpg"]
+            available_textures = DEFAULT_TEXTURES
+            
+        self.buildings = self._generate_buildings(available_textures)
+
+    def _generate_buildings(self, available_textures):
+        """
+        Styles and meshes every lot. Each lot gets its own seed derived from the master seed,
+        so the result is identical whether the lots run inline or across a process pool.
+        """
+        seed_rng = random.Random(self.rng.getrandbits(32))
         
+        jobs = []
         for lot in self.lots:
-            # Random Corner Style
-            r = random.random()
-            if r < 0.2:
-                lot = lot.chamfer(random.uniform(2.0, 5.0))
-            elif r < 0.4:
-                lot = lot.fillet(random.uniform(2.0, 5.0), segments=4)
-                
-            height = random.uniform(10.0, 40.0) 
+            coords = np.array([[v.x, v.y] for v in lot.vertices], dtype=np.float32)
+            jobs.append((coords, seed_rng.getrandbits(32)))
+            
+        if not jobs:
+            return []
             
-            # Random Style
-            style = {
-                "floor_height": random.uniform(2.5, 4.0),
-                "window_ratio": random.uniform(0.4, 0.8),
-                "inset_depth": random.uniform(0.2, 0.8),
-                "color": glm.vec4(random.uniform(0.7, 0.9), random.uniform(0.7, 0.9), random.uniform(0.7, 0.9), 1.0),
-                "window_color": glm.vec4(0.1, 0.2, 0.3 + random.random()*0.3, 1.0),
-                "stepped": (height > 25.0) and (random.random() < 0.4), 
-                "window_style": "vertical_stripes" if random.random() < 0.5 else "single",
-                "texture": random.choice(available_textures)
-            }
+        workers = self.workers if self.workers is not None else (os.cpu_count() or 1)
+        
+        if workers > 1 and len(jobs) >= self.PARALLEL_MIN_LOTS:
+            # Several chunks per worker keeps the pool balanced when lot sizes vary
+            chunk_count = min(len(jobs), workers * 4)
+            chunk_size = math.ceil(len(jobs) / chunk_count)
+            chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+            
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    packed_chunks = list(pool.map(_generate_building_chunk, chunks, repeat(available_textures)))
+            except (OSError, RuntimeError) as e:
+                print(f"[AdvancedCityGenerator] Process pool unavailable ({e}), generating buildings inline")
+                packed_chunks = [_generate_building_chunk(jobs, available_textures)]
+        else:
+            packed_chunks = [_generate_building_chunk(jobs, available_textures)]
             
-            building = Building(lot, height, style)
-            shape = building.generate()
-            self.buildings.append(shape)
+        buildings = []
+        for packed in packed_chunks:
+            buildings.extend(_unpack_shapes(packed))
+        return buildings
 
 
     def _generate_sidewalk(self, outer, inner):
@@ -319,8 +449,8 @@ class AdvancedCityGenerator:
         dx, dy = (max_x - min_x) / 2, (max_y - min_y) / 2
         
         split_point = glm.vec2(
-            random.uniform(cx - dx*0.4, cx + dx*0.4),
-            random.uniform(cy - dy*0.4, cy + dy*0.4)
+            self.rng.uniform(cx - dx*0.4, cx + dx*0.4),
+            self.rng.uniform(cy - dy*0.4, cy + dy*0.4)
         )
         
         # Determine Angle based on Aspect Ratio
@@ -328,12 +458,12 @@ class AdvancedCityGenerator:
         height = max_y - min_y
         aspect = width / height if height > 0 else 1.0
         
-        if random.random() < self.ortho_chance:
+        if self.rng.random() < self.ortho_chance:
             if aspect > 1.5: angle = math.pi / 2
             elif aspect < 0.66: angle = 0
-            else: angle = 0 if random.random() < 0.5 else math.pi / 2
+            else: angle = 0 if self.rng.random() < 0.5 else math.pi / 2
         else:
-            angle = random.uniform(0, math.pi * 2)
+            angle = self.rng.uniform(0, math.pi * 2)
             
         split_dir = glm.vec2(math.cos(angle), math.sin(angle))
         
@@ -385,8 +515,8 @@ class AdvancedCityGenerator:
         dy = (max_y - min_y) * 0.3
         
         split_point = glm.vec2(
-            random.uniform(cx - dx, cx + dx),
-            random.uniform(cy - dy, cy + dy)
+            self.rng.uniform(cx - dx, cx + dx),
+            self.rng.uniform(cy - dy, cy + dy)
         )
         
         # Determine Angle based on Aspect Ratio
@@ -394,7 +524,7 @@ class AdvancedCityGenerator:
         height = max_y - min_y
         aspect = width / height if height > 0 else 1.0
         
-        if random.random() < self.ortho_chance:
+        if self.rng.random() < self.ortho_chance:
             # Orthogonal split (0 or 90 degrees)
             # Bias towards cutting the long axis to make pieces square
             if aspect > 1.5:
@@ -405,13 +535,13 @@ class AdvancedCityGenerator:
                 angle = 0
             else:
                 # Square-ish: Randomly pick
-                if random.random() < 0.5:
+                if self.rng.random() < 0.5:
                     angle = 0
                 else:
                     angle = math.pi / 2
         else:
             # Random angle
-            angle = random.uniform(0, math.pi * 2)
+            angle = self.rng.uniform(0, math.pi * 2)
             
         split_dir = glm.vec2(math.cos(angle), math.sin(angle))
         
@@ -0,0 +1,62 @@
+"""
+Recycles CarAgents instead of constructing and discarding one per spawn.
+
+Released agents leave their lane and their MeshObject stays in the renderer, hidden.
+acquire() resets a free agent on the new lane, points its MeshObject at the requested
+vehicle archetype (VehiclePrototypeCache.assign) and shows it again. The pool's render
+slots are only created when the population grows past its previous peak.
+"""
+import random
+from .car_agent import CarAgent
+
+
+class AgentPool:
+    def __init__(self, renderer=None, prototypes=None):
+        """
+        renderer: receives the MeshObjects of new agents (None: headless agents without meshes).
+        prototypes: VehiclePrototypeCache giving new and recycled agents their vehicle mesh.
+        """
+        self.renderer = renderer
+        self.prototypes = prototypes
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, lane, is_reckless=False, vehicle_class=None, rng=random):
+        with_mesh = self.renderer is not None and self.prototypes is not None and vehicle_class is not None
+        if self.free:
+            agent = self.free.pop()
+            scale = None
+            if with_mesh and agent.mesh_object is not None:
+                scale = self.prototypes.assign(agent.mesh_object, vehicle_class, rng)
+                agent.mesh_object.visible = True
+            agent.reset(lane, is_reckless, scale)
+            self.reused += 1
+            return agent
+
+        if with_mesh:
+            mesh, scale = self.prototypes.create_mesh(vehicle_class, rng)
+            agent = CarAgent(lane, is_reckless=is_reckless, mesh_object=mesh, scale=scale)
+            self.renderer.addObject(mesh)
+        else:
+            agent = CarAgent(lane, is_reckless=is_reckless, with_mesh=False)
+        self.created += 1
+        return agent
+
+    def release(self, agent):
+        """Retires the agent and keeps it (and its hidden render slot) for the next acquire()."""
+        agent.retire()
+        if agent.mesh_object is not None:
+            agent.mesh_object.visible = False
+        self.free.append(agent)
+
+    def clear(self):
+        """Deletes the free agents' meshes (e.g. before the GL context goes away)."""
+        for agent in self.free:
+            if self.renderer is not None and agent.mesh_object in self.renderer.objects:
+                self.renderer.objects.remove(agent.mesh_object)
+            agent.delete()
+        self.free = []
+
+    def stats(self):
+        return f"{self.created} created, {self.reused} recycled, {len(self.free)} free"
@@ -5,10 +5,12 @@ from framework.shapes.shape import Shape
 from framework.utils.polygon import Polygon
 
 class Building:
-    def __init__(self, footprint, height, style_params=None):
+    def __init__(self, footprint, height, style_params=None, rng=None):
         self.footprint = footprint
         self.height = height
         self.style_params = style_params or {}
+        # Random source for antenna placement; pass a seeded random.Random for reproducible output
+        self.rng = rng if rng is not None else random
         
         # Style defaults
         self.floor_height = self.style_params.get("floor_height", 3.0)
@@ -59,7 +61,7 @@ class Building:
             self._generate_block(poly3, h1+h2, h1+h2+h3, all_vertices, all_normals, all_colors, all_indices, all_uvs)
             
             # Antenna on top
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self._add_antenna(poly3.centroid, h1+h2+h3, all_vertices, all_normals, all_colors, all_indices, all_uvs)
                 
         else:
@@ -67,7 +69,7 @@ class Building:
             self._generate_block(self.footprint, 0, self.height, all_vertices, all_normals, all_colors, all_indices, all_uvs)
             
             # Antenna
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 self._add_antenna(self.footprint.centroid, self.height, all_vertices, all_normals, all_colors, all_indices, all_uvs)
 
         # Populate Shape
@@ -280,7 +282,7 @@ class Building:
 
     def _add_antenna(self, pos, y_start, verts, norms, cols, inds, uvs):
         # Simple pole
-        h = random.uniform(2.0, 8.0)
+        h = self.rng.uniform(2.0, 8.0)
         w = 0.2
         
         p = glm.vec3(pos.x, 0, pos.y)
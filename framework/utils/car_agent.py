@@ -1,23 +1,49 @@
 from pyglm import glm
 import random
 import math
-from framework.objects.mesh_object import MeshObject
-from framework.shapes.uvsphere import UVSphere
-from framework.materials.material import Material
-from framework.utils.mesh_batcher import MeshBatcher
 
 class CarAgent:
+    __slots__ = (
+        "transform", "mesh_object", "scale_matrix", "id",
+        "current_lane", "current_curve", "next_lane_after_curve", "path", "target_index",
+        "route", "route_index", "arrived",
+        "position", "orientation", "last_position", "max_speed", "speed",
+        "time_since_last_move", "alive", "debug_stop_index", "manual_brake", "blocked_by_id", "is_reckless",
+    )
 
     debug_sphere_mesh = None
     _id_counter = 0 # Identity Persistence
 
-    def __init__(self, start_lane, car_shape=None, is_reckless=False):
+    def __init__(self, start_lane, car_shape=None, is_reckless=False, with_mesh=True, mesh_object=None, scale=None):
+        """
+        with_mesh: False skips all geometry and GL objects (mesh_object stays None), for
+        headless simulation such as the benchmarks; the pose is still kept in self.transform.
+        mesh_object: a ready MeshObject (e.g. from VehiclePrototypeCache.create_mesh) used
+        instead of building one from car_shape. scale: vec3 model scale (default 1.5).
+        """
+        self.transform = glm.mat4(1.0)
+        self.mesh_object = mesh_object
+        self.reset(start_lane, is_reckless, scale)
+
+        if with_mesh and mesh_object is None:
+            self._create_mesh(car_shape)
+            self._update_transform()
+
+    def reset(self, start_lane, is_reckless=False, scale=None):
+        """
+        (Re)starts the agent on start_lane with a new id, as if freshly constructed.
+        Used by AgentPool to recycle dead agents; the mesh object is kept.
+        """
         self.id = CarAgent._id_counter
         CarAgent._id_counter += 1
         
         self.current_lane = start_lane
         self.register_on_lane(self.current_lane) # Register immediately
-        self.current_curve = None # List of points if turning
+        self.current_curve = None # Connection points if turning
+        self.next_lane_after_curve = None
+        self.route = None # Lanes to the destination (route[route_index] is the current one), None: wander
+        self.route_index = 0
+        self.arrived = False
         self.max_speed = 15.0
         self.speed = self.max_speed # Units/sec
         
@@ -47,6 +73,31 @@ class CarAgent:
         self.is_reckless = is_reckless
 
         # Visuals
+        self.scale_matrix = glm.scale(scale if scale is not None else glm.vec3(1.5))
+        self._update_transform()
+
+    def set_route(self, route):
+        """
+        Drives along route (a list of Lanes from RoutingService, starting with the current
+        lane) and retires at the end of its last lane. None goes back to random turns.
+        """
+        if route and route[0] is not self.current_lane:
+            route = None
+        self.route = route
+        self.route_index = 0
+
+    def retire(self):
+        """Takes the agent out of the simulation (crashed or despawned): off its lane and not alive."""
+        self.deregister_from_lane(self.current_lane)
+        self.alive = False
+
+    def _create_mesh(self, car_shape):
+        # Imported here so headless agents (with_mesh=False) need no GL/material modules
+        from framework.objects.mesh_object import MeshObject
+        from framework.shapes.uvsphere import UVSphere
+        from framework.materials.material import Material
+        from framework.utils.mesh_batcher import MeshBatcher
+
         if car_shape is None:
             # Color Logic
             if self.is_reckless:
@@ -74,6 +125,9 @@ class CarAgent:
             
             # Build returns MeshObject if material provided, Shape if not
             self.mesh_object = batcher.build(mat)
+            # The parts were only needed for batching; free their other materials
+            if hasattr(car_shape, 'delete'):
+                car_shape.delete()
         
         # Init static debug mesh if needed
         if CarAgent.debug_sphere_mesh is None:
@@ -83,6 +137,12 @@ class CarAgent:
              mat.uniforms = { "ambientStrength": 1.0, "diffuseStrength": 0.0, "specularStrength": 0.0 }
              CarAgent.debug_sphere_mesh = MeshObject(sphere, mat)
 
+    def delete(self):
+        """Releases the mesh (and through it the shape and material) once the agent is gone."""
+        if self.mesh_object is not None:
+            self.mesh_object.delete()
+            self.mesh_object = None
+
     def update(self, dt, print_stuck_debug=False, print_despawn_debug=False):
         if not self.alive: return # Don't update dead agents
         
@@ -220,9 +280,10 @@ class CarAgent:
         yaw = math.atan2(self.orientation.x, self.orientation.z)
         
         rot = glm.rotate(yaw, glm.vec3(0, 1, 0))
-        scale = glm.scale(glm.vec3(1.5, 1.5, 1.5))
         
-        self.mesh_object.transform = mat * rot * scale
+        self.transform = mat * rot * self.scale_matrix
+        if self.mesh_object is not None:
+            self.mesh_object.transform = self.transform
 
     def pick_next_path(self, print_despawn_debug=False):
         # We reached end of current path
@@ -248,6 +309,13 @@ class CarAgent:
             # We reached end of a Lane. Look for connections at the Dest Node.
             node = self.current_lane.dest_node
             
+            # Routed: the destination lane is done
+            if self.route and self.route_index >= len(self.route) - 1:
+                self.deregister_from_lane(self.current_lane)
+                self.alive = False
+                self.arrived = True
+                return
+
             if not len(node.connections):
                  # No connections at all
                  if (print_despawn_debug):
@@ -260,8 +328,18 @@ class CarAgent:
             valid_keys = [k for k in node.connections.keys() if k[0] == self.current_lane.id]
             
             if valid_keys:
-                # Pick Random
-                key = random.choice(valid_keys)
+                key = None
+                if self.route:
+                    key = (self.current_lane.id, self.route[self.route_index + 1].id)
+                    if key in node.connections:
+                        self.route_index += 1
+                    else:
+                        # Connection gone (graph edited): wander from here
+                        key = None
+                        self.route = None
+                if key is None:
+                    # Pick Random
+                    key = random.choice(valid_keys)
                 
                 # key is (from_id, to_id)
                 next_lane_id = key[1]
@@ -0,0 +1,284 @@
+import os
+import json
+import hashlib
+import numpy as np
+from pyglm import glm
+from .mesh_file import write_mesh_file, read_mesh_file
+from .polygon import Polygon
+from .road_network import RoadNetwork
+from .city_graph import CityGraph, Node, Lane, as_points
+
+# Bump whenever the on-disk layout below changes
+CACHE_FORMAT_VERSION = 2
+
+# Source files whose contents determine the generated city.
+# Editing any of them changes the code hash and invalidates old entries.
+_GENERATOR_SOURCES = [
+    "advanced_city_generator.py",
+    "building.py",
+    "polygon.py",
+    "road_network.py",
+    "city_graph.py",
+    "city_generator.py",
+    "mesh_batcher.py",
+    "city_cache.py",
+    "mesh_file.py",
+]
+
+_code_hash = None
+
+def get_code_hash():
+    """
+    Hash of the generator source files, computed once per process.
+    """
+    global _code_hash
+    if _code_hash is None:
+        h = hashlib.sha1()
+        base = os.path.dirname(os.path.abspath(__file__))
+        for name in _GENERATOR_SOURCES:
+            path = os.path.join(base, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    h.update(f.read())
+        _code_hash = h.hexdigest()
+    return _code_hash
+
+
+class CachedCity:
+    """
+    Everything CityManager needs to show a city, restored from disk.
+    layout: AdvancedCityGenerator with blocks, lots, street lights and road segments (no per-shape meshes).
+    graph: CityGraph with lanes, connections and signal phases.
+    batches: list of (name, Shape) holding the merged static meshes, memory-mapped and not yet uploaded.
+    """
+    def __init__(self, layout, graph, dead_end_lanes, batches):
+        self.layout = layout
+        self.graph = graph
+        self.dead_end_lanes = dead_end_lanes
+        self.batches = batches
+
+
+class CityCache:
+    """
+    On-disk cache of generated cities.
+    Per city an uncompressed .npz (layout + graph) and a .bkmesh (merged static meshes),
+    keyed on a hash of (seed, params, code version), so reopening the same city skips
+    BSP layout, road meshing, graph building and batching. The meshes are stored in the
+    compact interleaved layout, memory-mapped on load and uploaded straight from the page cache.
+    """
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def make_key(self, seed, params):
+        payload = json.dumps({
+            "seed": seed,
+            "params": params,
+            "format": CACHE_FORMAT_VERSION,
+            "code": get_code_hash(),
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"city_{key}.npz")
+
+    def _mesh_path(self, key):
+        return os.path.join(self.cache_dir, f"city_{key}.bkmesh")
+
+    def has(self, key):
+        return os.path.exists(self._path(key)) and os.path.exists(self._mesh_path(key))
+
+    # ----------------------------
+    # Saving
+    # ----------------------------
+    def save(self, key, layout, city_gen, batches):
+        """
+        layout: AdvancedCityGenerator after generate()
+        city_gen: CityGenerator after build_graph_from_layout()
+        batches: list of (name, Shape) merged static meshes, uploaded with compact=True
+        """
+        data = {"format_version": np.array(CACHE_FORMAT_VERSION, dtype=np.int32)}
+
+        self._pack_layout(layout, data)
+        self._pack_graph(city_gen.graph, getattr(city_gen, 'dead_end_lanes', []), data)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Meshes first: has() requires both files, so the entry only appears once complete
+        mesh_path = self._mesh_path(key)
+        write_mesh_file(mesh_path, batches, interleaved=True)
+
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        # Write to a temp file first so an interrupted save never leaves a truncated entry
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **data)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path) + os.path.getsize(mesh_path)
+        print(f"[CityCache] Saved city {key[:8]} ({size / 1e6:.1f} MB)")
+
+    def _pack_layout(self, layout, data):
+        data["layout_params"] = np.array(json.dumps(layout.get_params()))
+
+        poses = [np.array(m.to_list(), dtype=np.float32) for m in layout.street_light_poses]
+        data["street_light_poses"] = np.array(poses, dtype=np.float32).reshape(-1, 4, 4)
+
+        for name in ("blocks", "lots"):
+            polys = getattr(layout, name)
+            data[f"{name}_counts"] = np.array([len(p.vertices) for p in polys], dtype=np.int64)
+            data[f"{name}_verts"] = np.array([[v.x, v.y] for p in polys for v in p.vertices], dtype=np.float32).reshape(-1, 2)
+
+        segments = layout.road_network.segments if layout.road_network else []
+        data["road_segments"] = np.array([[p1.x, p1.y, p2.x, p2.y, w, l] for p1, p2, w, l in segments], dtype=np.float64).reshape(-1, 6)
+
+    def _pack_graph(self, graph, dead_end_lanes, data):
+        node_index = {node.id: i for i, node in enumerate(graph.nodes)}
+
+        data["node_ids"] = np.array([n.id for n in graph.nodes], dtype=np.int64)
+        data["node_xy"] = np.array([[n.x, n.y] for n in graph.nodes], dtype=np.float64).reshape(-1, 2)
+        data["node_phase_state"] = np.array([[n.current_phase_index, n.phase_timer] for n in graph.nodes], dtype=np.float64).reshape(-1, 2)
+        data["node_states"] = np.array([n.state for n in graph.nodes])
+
+        # Phases: per node a list of lists of lane ids -> flattened with two levels of counts
+        data["phase_counts"] = np.array([len(n.phases) for n in graph.nodes], dtype=np.int64)
+        data["phase_lane_counts"] = np.array([len(ph) for n in graph.nodes for ph in n.phases], dtype=np.int64)
+        data["phase_lanes"] = np.array([lid for n in graph.nodes for ph in n.phases for lid in ph], dtype=np.int64)
+
+        data["edge_nodes"] = np.array([[node_index[e.start_node.id], node_index[e.end_node.id]] for e in graph.edges], dtype=np.int64).reshape(-1, 2)
+        data["edge_props"] = np.array([[e.width, e.lanes_count] for e in graph.edges], dtype=np.float64).reshape(-1, 2)
+        data["edge_lane_counts"] = np.array([len(e.lanes) for e in graph.edges], dtype=np.int64)
+
+        lanes = [lane for e in graph.edges for lane in e.lanes]
+        data["lane_ids"] = np.array([l.id for l in lanes], dtype=np.int64)
+        data["lane_widths"] = np.array([l.width for l in lanes], dtype=np.float64)
+        data["lane_dest"] = np.array([node_index[l.dest_node.id] for l in lanes], dtype=np.int64)
+        data["lane_wp_counts"] = np.array([len(l.waypoints) for l in lanes], dtype=np.int64)
+        data["lane_wps"] = np.concatenate([np.asarray(l.waypoints) for l in lanes] or [np.zeros((0, 3), np.float32)]).reshape(-1, 3)
+
+        # Connections: (node index, from lane, to lane) + curve points
+        conn_keys = []
+        conn_counts = []
+        conn_points = []
+        for i, node in enumerate(graph.nodes):
+            for (from_id, to_id), curve in node.connections.items():
+                conn_keys.append([i, from_id, to_id])
+                conn_counts.append(len(curve))
+                conn_points.append(np.asarray(curve))
+        data["conn_keys"] = np.array(conn_keys, dtype=np.int64).reshape(-1, 3)
+        data["conn_counts"] = np.array(conn_counts, dtype=np.int64)
+        data["conn_points"] = np.concatenate(conn_points or [np.zeros((0, 3), np.float32)]).reshape(-1, 3)
+
+        data["dead_end_lanes"] = np.array([l.id for l in dead_end_lanes], dtype=np.int64)
+
+    # ----------------------------
+    # Loading
+    # ----------------------------
+    def load(self, key, seed=None):
+        """
+        Returns a CachedCity, or None if the entry is missing, stale or unreadable.
+        """
+        path = self._path(key)
+        if not self.has(key):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["format_version"]) != CACHE_FORMAT_VERSION:
+                    print(f"[CityCache] Ignoring city {key[:8]}: format version mismatch")
+                    return None
+
+                layout = self._unpack_layout(data, seed)
+                graph, dead_end_lanes = self._unpack_graph(data)
+            batches = read_mesh_file(self._mesh_path(key))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"[CityCache] Failed to read city {key[:8]}: {e}")
+            return None
+
+        return CachedCity(layout, graph, dead_end_lanes, batches)
+
+    def _unpack_layout(self, data, seed):
+        from .advanced_city_generator import AdvancedCityGenerator
+
+        params = json.loads(str(data["layout_params"]))
+        layout = AdvancedCityGenerator(seed=seed, **params)
+
+        layout.street_light_poses = [glm.mat4(*m.flatten()) for m in data["street_light_poses"]]
+
+        for name in ("blocks", "lots"):
+            verts = data[f"{name}_verts"]
+            splits = np.cumsum(data[f"{name}_counts"])[:-1]
+            polys = [Polygon([glm.vec2(float(x), float(y)) for x, y in chunk]) for chunk in np.split(verts, splits)] if len(verts) else []
+            setattr(layout, name, polys)
+
+        layout.road_network = RoadNetwork()
+        for x1, y1, x2, y2, w, l in data["road_segments"]:
+            layout.road_network.segments.append((glm.vec2(x1, y1), glm.vec2(x2, y2), float(w), int(l)))
+        return layout
+
+    def _unpack_graph(self, data):
+        graph = CityGraph()
+        graph.clear()
+
+        # Nodes
+        node_xy = data["node_xy"]
+        phase_state = data["node_phase_state"]
+        states = data["node_states"]
+        phase_counts = data["phase_counts"]
+        phase_lane_counts = data["phase_lane_counts"]
+        phase_lanes = data["phase_lanes"].tolist()
+
+        ph_idx = 0
+        lane_cursor = 0
+        for i, node_id in enumerate(data["node_ids"].tolist()):
+            node = graph.add_node(float(node_xy[i, 0]), float(node_xy[i, 1]))
+            node.id = node_id
+            node.current_phase_index = int(phase_state[i, 0])
+            node.phase_timer = float(phase_state[i, 1])
+            node.state = str(states[i])
+
+            phases = []
+            for _ in range(int(phase_counts[i])):
+                n = int(phase_lane_counts[ph_idx])
+                phases.append(phase_lanes[lane_cursor:lane_cursor + n])
+                lane_cursor += n
+                ph_idx += 1
+            node.phases = phases
+
+        # Edges & Lanes
+        lane_ids = data["lane_ids"].tolist()
+        lane_widths = data["lane_widths"].tolist()
+        lane_dest = data["lane_dest"].tolist()
+        wp_counts = data["lane_wp_counts"].tolist()
+        wps = data["lane_wps"]
+        edge_props = data["edge_props"]
+
+        lanes_by_id = {}
+        lane_i = 0
+        wp_cursor = 0
+        for e_i, (a, b) in enumerate(data["edge_nodes"].tolist()):
+            edge = graph.add_edge(graph.nodes[a], graph.nodes[b], width=float(edge_props[e_i, 0]), lanes=int(edge_props[e_i, 1]), build_lanes=False)
+            for _ in range(int(data["edge_lane_counts"][e_i])):
+                n = wp_counts[lane_i]
+                waypoints = as_points(wps[wp_cursor:wp_cursor + n])
+                wp_cursor += n
+
+                lane = Lane(width=lane_widths[lane_i], waypoints=waypoints, parent_edge=edge, dest_node=graph.nodes[lane_dest[lane_i]])
+                lane.id = lane_ids[lane_i]
+                edge.lanes.append(lane)
+                lanes_by_id[lane.id] = lane
+                lane_i += 1
+            graph.spatial.add_edge(edge)
+
+        # Connections
+        conn_points = data["conn_points"]
+        cursor = 0
+        for (node_i, from_id, to_id), n in zip(data["conn_keys"].tolist(), data["conn_counts"].tolist()):
+            graph.nodes[node_i].connections[(from_id, to_id)] = as_points(conn_points[cursor:cursor + n])
+            cursor += n
+
+        # Keep fresh ids unique if the graph is extended later
+        Node._id_counter = max((n.id for n in graph.nodes), default=-1) + 1
+        Lane._id_counter = max(lanes_by_id.keys(), default=-1) + 1
+        # Lanes and connections were filled in directly
+        graph.invalidate()
+
+        dead_end_lanes = [lanes_by_id[i] for i in data["dead_end_lanes"].tolist() if i in lanes_by_id]
+        return graph, dead_end_lanes
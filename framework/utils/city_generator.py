@@ -11,14 +11,23 @@ class CityGenerator:
     Converts a spatial layout (BSP) into a Node/Edge graph for traffic simulation.
     Also handles zoning/building placement along the graph edges.
     """
-    def __init__(self):
+    def __init__(self, seed=None):
         self.graph = CityGraph()
         self.buildings = []
+        self.dead_end_lanes = []
+        # Explicit seed makes signal phases and zoning reproducible
+        self.seed = seed
+        self.rng = random.Random(seed)
 
-    def build_graph_from_layout(self, layout_generator):
+    def build_graph_from_layout(self, layout_generator, seed=None):
         """
         Ingests the road network from a layout generator (e.g., AdvancedCityGenerator).
+        seed: overrides the generator seed for this build (None keeps the current one).
         """
+        if seed is not None:
+            self.seed = seed
+        self.rng = random.Random(self.seed)
+        
         self.graph.clear()
         rn = layout_generator.road_network
         raw_segments = getattr(rn, 'segments', [])
@@ -81,7 +90,8 @@ class CityGenerator:
         print("DEBUG: Generating Intersection Curves...")
         for node in self.graph.nodes:
             node.generate_connections()
-            node.calculate_phases() # [NEW] Traffic Lights
+            node.calculate_phases(self.rng) # [NEW] Traffic Lights
+        self.graph.invalidate() # Connections changed outside the graph's own methods
             
         # 5. [NEW] Audit Graph
         self.audit_graph()
@@ -192,8 +202,8 @@ class CityGenerator:
                 # We place two buildings: Left (-Normal) and Right (+Normal)
                 for side in [-1, 1]:
                     # Randomize Lot Size
-                    width = random.uniform(10.0, 14.0)
-                    depth = random.uniform(12.0, 20.0)
+                    width = self.rng.uniform(10.0, 14.0)
+                    depth = self.rng.uniform(12.0, 20.0)
                     
                     # Calculate Center
                     center_dist = frontage_dist + depth / 2.0
@@ -214,17 +224,17 @@ class CityGenerator:
                     poly = Polygon([c1, c2, c3, c4])
                     
                     # Create Building Instance
-                    height = random.uniform(20.0, 60.0)
+                    height = self.rng.uniform(20.0, 60.0)
                     
                     # Random Style
                     style = {
-                        "color": glm.vec4(random.random(), random.random(), random.random(), 1.0),
-                        "stepped": random.random() < 0.4,
-                        "window_ratio": random.uniform(0.4, 0.7)
+                        "color": glm.vec4(self.rng.random(), self.rng.random(), self.rng.random(), 1.0),
+                        "stepped": self.rng.random() < 0.4,
+                        "window_ratio": self.rng.uniform(0.4, 0.7)
                     }
                     
-                    b = Building(poly, height, style)
+                    b = Building(poly, height, style, rng=self.rng)
                     self.buildings.append(b.generate())
                 
                 # Advance
-                curr_dist += width + random.uniform(2.0, 5.0) # Gap between buildings
\ No newline at end of file
+                curr_dist += width + self.rng.uniform(2.0, 5.0) # Gap between buildings
\ No newline at end of file
@@ -1,18 +1,37 @@
 import math
 import random
+import numpy as np
 from pyglm import glm
+from .spatial_index import SpatialIndex
+
+
+def as_points(points):
+    """
+    Compact float32 storage for waypoints and connection curves: a glm.array of vec3.
+    Indexing, iteration and len() give glm.vec3 like the lists they replace (as copies, so
+    moving a point never edits the path), and np.asarray(points) is an (n, 3) float32 view.
+    """
+    if isinstance(points, glm.array):
+        return points
+    if isinstance(points, np.ndarray):
+        return glm.array(np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3))
+    if len(points) == 0:
+        return glm.array.zeros(0, glm.vec3)
+    return glm.array([glm.vec3(p) for p in points])
+
 
 class Lane:
     """
     Represents a single traffic lane.
     """
+    __slots__ = ("id", "width", "waypoints", "parent_edge", "dest_node", "start_node", "active_agents")
     _id_counter = 0
 
     def __init__(self, width, waypoints, parent_edge, dest_node):
         self.id = Lane._id_counter
         Lane._id_counter += 1
         self.width = width
-        self.waypoints = waypoints # List of glm.vec3
+        self.waypoints = as_points(waypoints) # glm.array of vec3
         self.parent_edge = parent_edge
         self.dest_node = dest_node # [NEW] Explicit destination
         self.start_node = parent_edge.start_node if dest_node == parent_edge.end_node else parent_edge.end_node
@@ -40,6 +59,7 @@ class Node:
     """
     Represents an intersection in the city graph.
     """
+    __slots__ = ("id", "x", "y", "edges", "connections", "phases", "current_phase_index", "phase_timer", "state")
     _id_counter = 0
 
     def __init__(self, x, y):
@@ -48,7 +68,7 @@ class Node:
         self.x = x
         self.y = y
         self.edges = []
-        # Mapping (from_lane_id, to_lane_id) -> List[vec3] waypoints
+        # Mapping (from_lane_id, to_lane_id) -> glm.array of vec3 waypoints
         self.connections = {} 
         
         # [NEW] Traffic Light State
@@ -146,13 +166,15 @@ class Node:
                 
                 curve = get_bezier_points(p0, p1, p2, p3, steps=8)
                 
-                self.connections[(in_lane.id, out_lane.id)] = curve
+                self.connections[(in_lane.id, out_lane.id)] = as_points(curve)
 
-    def calculate_phases(self):
+    def calculate_phases(self, rng=None):
         """
         Groups incoming lanes into phases based on opposing directions.
         Called once after graph is built.
+        rng: optional random.Random for a reproducible start state.
         """
+        if rng is None: rng = random
         self.phases = []
         
         # 1. Gather all incoming lanes and their vectors
@@ -215,8 +237,8 @@ class Node:
             self.phases.append([])
             
         # [NEW] Randomize Start State
-        self.current_phase_index = random.randint(0, len(self.phases) - 1)
-        self.phase_timer = random.uniform(0.0, 5.0) # Random offset into the cycle
+        self.current_phase_index = rng.randint(0, len(self.phases) - 1)
+        self.phase_timer = rng.uniform(0.0, 5.0) # Random offset into the cycle
 
     def update(self, dt, print_debug=False):
         """
@@ -274,7 +296,9 @@ class Edge:
     Represents a road segment between two nodes.
     Now contains detailed Lane objects.
     """
-    def __init__(self, start_node, end_node, width=10.0, lanes_count=2):
+    __slots__ = ("start_node", "end_node", "width", "lanes_count", "lanes")
+
+    def __init__(self, start_node, end_node, width=10.0, lanes_count=2, build_lanes=True):
         self.start_node = start_node
         self.end_node = end_node
         self.width = width
@@ -285,8 +309,9 @@ class Edge:
         start_node.add_edge(self)
         end_node.add_edge(self)
         
-        # Auto-generate lanes on creation
-        self.generate_lanes()
+        # Auto-generate lanes on creation (skipped when lanes are restored from a cache)
+        if build_lanes:
+            self.generate_lanes()
 
     @property
     def length(self):
@@ -374,15 +399,41 @@ class CityGraph:
     def __init__(self):
         self.nodes = []
         self.edges = []
+        self.version = 0 # Bumped by every change; cached views rebuild when it moves
+        self._arrays = None
+        self._arrays_version = -1
+        self.spatial = SpatialIndex() # Nearest node / lane queries, kept up to date below
+
+    def invalidate(self):
+        """
+        Marks cached views (arrays()) stale. The graph's own methods call it; call it after
+        editing nodes, edges or lanes directly (e.g. regenerating connections or lanes, then
+        also self.spatial.add_edge(edge) for the edges whose lanes changed).
+        """
+        self.version += 1
+
+    def arrays(self):
+        """The graph as CSR arrays (GraphArrays), rebuilt lazily after changes."""
+        if self._arrays_version != self.version:
+            from .graph_arrays import GraphArrays
+            if self._arrays is not None:
+                self._arrays.close(unlink=True)
+            self._arrays = GraphArrays(self)
+            self._arrays_version = self.version
+        return self._arrays
 
     def add_node(self, x, y):
         node = Node(x, y)
         self.nodes.append(node)
+        self.spatial.add_node(node)
+        self.invalidate()
         return node
 
-    def add_edge(self, node_a, node_b, width=10.0, lanes=2):
-        edge = Edge(node_a, node_b, width, lanes)
+    def add_edge(self, node_a, node_b, width=10.0, lanes=2, build_lanes=True):
+        edge = Edge(node_a, node_b, width, lanes, build_lanes=build_lanes)
         self.edges.append(edge)
+        self.spatial.add_edge(edge)
+        self.invalidate()
         return edge
 
     def remove_edge(self, edge):
@@ -390,29 +441,27 @@ class CityGraph:
             self.edges.remove(edge)
             edge.start_node.remove_edge(edge)
             edge.end_node.remove_edge(edge)
+            self.spatial.remove_edge(edge)
+            self.invalidate()
 
     def clear(self):
         self.nodes = []
         self.edges = []
         Node._id_counter = 0
         Lane._id_counter = 0
+        self.spatial.clear()
+        self.invalidate()
 
     def get_nearest_node(self, x, y, threshold):
         """
         Finds the nearest node within a threshold distance.
         Returns None if no node is close enough.
         """
-        best_node = None
-        min_dist_sq = threshold * threshold
-
-        for node in self.nodes:
-            dx = node.x - x
-            dy = node.y - y
-            dist_sq = dx*dx + dy*dy
-            if dist_sq < min_dist_sq:
-                min_dist_sq = dist_sq
-                best_node = node
-        
-        if best_node:
-            return best_node, math.sqrt(min_dist_sq)
-        return None, float('inf')
+        return self.spatial.nearest_node(x, y, threshold)
+
+    def get_nearest_lane(self, x, y, threshold=float('inf')):
+        """
+        The closest point on any lane within threshold (LaneHit: lane, distance, arc_length,
+        x, y), or None.
+        """
+        return self.spatial.nearest_lane(x, y, threshold)
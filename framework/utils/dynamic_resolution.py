@@ -0,0 +1,94 @@
+import math
+import time
+from .gpu_timer import GpuTimer
+
+
+class DynamicResolution:
+    """
+    Adjusts a GLRenderer's render scale every frame to hold a target GPU frame time.
+    The frame is timed on the GPU (GpuTimer); since the cost of a fill-rate bound frame
+    scales with the pixel count (render_scale^2), the scale is moved towards
+    scale * sqrt(target / measured), limited per step; after each change the samples still
+    in flight at the old scale are skipped. Between the target and target / (1 + tolerance)
+    nothing changes, so the targets are not reallocated every frame.
+
+    An elapsed-time query also counts the GPU waiting for the CPU to submit draws, so a
+    CPU-bound frame reads about as long as its submit time. The scale is only lowered while
+    the GPU time clearly exceeds the CPU time between begin_frame() and end_frame()
+    (gpu_bound_ratio); otherwise lowering it would cost quality and gain nothing.
+    Attach with renderer.dynamic_resolution = DynamicResolution(renderer); the renderer
+    needs init_post_process() for its offscreen targets.
+    """
+    def __init__(self, renderer, target_ms=16.6, min_scale=0.5, max_scale=1.0,
+                 tolerance=0.15, smoothing=0.5, max_step=0.05, settle_samples=4,
+                 gpu_bound_ratio=1.25):
+        self.renderer = renderer
+        self.target_ms = target_ms
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.max_step = max_step
+        self.settle_samples = settle_samples
+        self.gpu_bound_ratio = gpu_bound_ratio
+        self.enabled = True
+
+        self.timer = GpuTimer()
+        self.gpu_ms = None        # smoothed measured GPU frame time
+        self.cpu_ms = None        # smoothed CPU submit time of the same section
+        self.cpu_bound = False    # True while over budget but not limited by the GPU
+        self._cpu_start = None
+        self._samples_seen = 0
+        self._settle = 0
+
+    def begin_frame(self):
+        """Call right before the GPU-heavy passes (scene and post), after CPU-only setup."""
+        if self.enabled:
+            self._cpu_start = time.perf_counter()
+            self.timer.begin()
+
+    def end_frame(self):
+        # Submit time up to here: end() also polls earlier queries
+        submit_ms = (time.perf_counter() - self._cpu_start) * 1000.0 if self._cpu_start is not None else None
+        self.timer.end()
+        if not self.enabled or submit_ms is None:
+            return
+        self._cpu_start = None
+        if self.cpu_ms is None:
+            self.cpu_ms = submit_ms
+        else:
+            self.cpu_ms += (submit_ms - self.cpu_ms) * self.smoothing
+
+        # 1. Only react to new measurements
+        if self.timer.samples == self._samples_seen:
+            return
+        self._samples_seen = self.timer.samples
+        sample = self.timer.last_ms
+        # Results lag a few frames: skip those measured before the last scale change
+        if self._settle > 0:
+            self._settle -= 1
+            return
+        if self.gpu_ms is None:
+            self.gpu_ms = sample
+        else:
+            self.gpu_ms += (sample - self.gpu_ms) * self.smoothing
+
+        # 2. Scale down as soon as the frame is over budget, up only once it is clearly under
+        ratio = self.target_ms / max(self.gpu_ms, 1e-3)
+        # Over budget, but the GPU mostly waited for the CPU: fewer pixels would not help
+        self.cpu_bound = ratio < 1.0 and self.gpu_ms < self.cpu_ms * self.gpu_bound_ratio
+        if self.cpu_bound or 1.0 <= ratio <= 1.0 + self.tolerance:
+            return
+
+        # 3. Pixel count ~ scale^2, so the matching scale changes with sqrt of the time ratio
+        scale = self.renderer.render_scale
+        wanted = scale * math.sqrt(ratio)
+        step = min(max(wanted - scale, -self.max_step), self.max_step)
+        new_scale = min(max(scale + step, self.min_scale), self.max_scale)
+        if new_scale != scale:
+            self.renderer.set_render_scale(new_scale)
+            self._settle = self.settle_samples
+            self.gpu_ms = None
+
+    def delete(self):
+        self.timer.delete()
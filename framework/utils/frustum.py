@@ -0,0 +1,30 @@
+"""
+View-frustum tests for culling whole groups of instances on the CPU.
+"""
+import numpy as np
+
+
+def frustum_planes(projection, view):
+    """
+    (6, 4) planes (a, b, c, d) of the camera frustum in world space, with a*x + b*y + c*z + d >= 0 inside.
+    Order: left, right, bottom, top, near, far.
+    """
+    # np.array(glm.mat4) is in math (row) layout, so rows can be combined directly (Gribb/Hartmann)
+    m = np.array(projection * view, dtype=np.float64)
+    planes = np.array([m[3] + m[0], m[3] - m[0],
+                       m[3] + m[1], m[3] - m[1],
+                       m[3] + m[2], m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1, keepdims=True)
+    return planes
+
+
+def aabbs_in_frustum(planes, mins, maxs):
+    """
+    mins/maxs: (N, 3) box corners. Returns a bool array, True where the box may be visible
+    (conservative: boxes crossing a frustum corner can pass).
+    """
+    normals = planes[:, :3]
+    # Per plane, the box corner furthest along the plane normal
+    far_corner = np.where(normals[None, :, :] >= 0.0, maxs[:, None, :], mins[:, None, :])
+    dist = np.einsum('npk,pk->np', far_corner, normals) + planes[None, :, 3]
+    return np.all(dist >= 0.0, axis=1)
@@ -0,0 +1,123 @@
+"""
+Keyed cache of uploaded Shapes, shared between objects that draw the same geometry.
+Typical keys: ("cube", (1.5,), None) for a solid primitive, ("cube", (1.5,), 0.4) for its point cloud.
+
+Entries are reference counted; acquire() adds a reference, release() drops it.
+Unreferenced entries stay resident (and reusable) until the byte budget is exceeded,
+then the least recently used ones are evicted and their GL buffers deleted.
+"""
+from collections import OrderedDict
+from ..shapes import Cube, UVSphere, Cylinder, Cone
+from .grid_point_cloud_generator import GridPointCloudGenerator
+
+DEFAULT_BUDGET_BYTES = 64 * 1024 * 1024
+
+# Primitive name -> constructor taking the key parameters in order
+PRIMITIVES = {
+    "cube": lambda side_length: Cube(side_length=side_length),
+    "sphere": lambda radius: UVSphere(radius=radius),
+    "cylinder": lambda radius, height: Cylinder(radius=radius, height=height),
+    "cone": lambda radius, height: Cone(radius=radius, height=height),
+}
+
+
+def shape_nbytes(shape):
+    """Bytes of vertex and index data held by a Shape (what its buffers occupy on the GPU)."""
+    total = 0
+    for arr in (shape.vertices, shape.normals, shape.colors, shape.uvs, shape.indices):
+        if arr is not None:
+            total += arr.nbytes
+    return total
+
+
+class _Entry:
+    def __init__(self, shape):
+        self.shape = shape
+        self.nbytes = shape_nbytes(shape)
+        self.refs = 0
+
+
+class GeometryCache:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()  # key -> _Entry, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, key, factory):
+        """
+        Returns the uploaded Shape for key and adds a reference.
+        factory() builds the Shape (with buffers) on a miss.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = _Entry(factory())
+            self.entries[key] = entry
+            self.total_bytes += entry.nbytes
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        entry.refs += 1
+        self._evict()
+        return entry.shape
+
+    def release(self, key):
+        """Drops one reference; the entry stays cached until evicted."""
+        entry = self.entries.get(key)
+        if entry is None or entry.refs == 0:
+            return
+        entry.refs -= 1
+        self._evict()
+
+    def _evict(self):
+        # Oldest unreferenced entries first; referenced ones are never evicted
+        if self.total_bytes <= self.budget_bytes:
+            return
+        for key in [k for k, e in self.entries.items() if e.refs == 0]:
+            if self.total_bytes <= self.budget_bytes:
+                break
+            entry = self.entries.pop(key)
+            self.total_bytes -= entry.nbytes
+            self.evictions += 1
+            if entry.shape.VAO is not None:
+                entry.shape.delete()
+
+    def clear(self):
+        """Deletes every entry, referenced or not (e.g. before the GL context goes away)."""
+        for entry in self.entries.values():
+            if entry.shape.VAO is not None:
+                entry.shape.delete()
+        self.entries.clear()
+        self.total_bytes = 0
+
+    # ----------------------------
+    # Primitive helpers
+    # ----------------------------
+    def primitive(self, name, params, spacing=None):
+        """
+        Solid primitive (spacing None) or its grid point cloud, uploaded once per
+        (name, params, spacing). Returns (key, shape); pass key to release().
+        """
+        key = (name, tuple(params), spacing)
+        return key, self.acquire(key, lambda: self._build_primitive(name, params, spacing))
+
+    @staticmethod
+    def _build_primitive(name, params, spacing):
+        shape = PRIMITIVES[name](*params)
+        shape.createGeometry()
+        if spacing is not None:
+            shape = GridPointCloudGenerator.generate(shape, spacing=spacing)
+        shape.createBuffers()
+        return shape
+
+    def stats(self):
+        return (f"{len(self.entries)} entries, {self.total_bytes / 1e6:.2f} MB, "
+                f"{self.hits} hits, {self.misses} misses, {self.evictions} evictions")
+
+
+# Shared by all holograms
+geometry_cache = GeometryCache()
@@ -0,0 +1,118 @@
+"""
+Registry of live GL objects and reference counts of shared GPU owners.
+
+Every GL object is tracked by (kind, id) with the owner that created it and its size:
+    gpu_resources.track("buffer", vbo, self, nbytes)    after glGenBuffers + glBufferData
+    gpu_resources.untrack("buffer", vbo)                next to glDeleteBuffers
+Kinds: "buffer", "vertex_array", "texture", "program", "framebuffer", "renderbuffer".
+
+Shapes and Materials shared by several objects are reference counted:
+    gpu_resources.retain(shape)     an object starts using it
+    gpu_resources.release(shape)    it stops; the last release calls shape.delete()
+Owners nobody retained are deleted by their first release().
+"""
+
+
+def owner_label(owner):
+    """Category an owner's resources are reported under: its class name, or a string owner as is."""
+    if owner is None:
+        return "unowned"
+    if isinstance(owner, str):
+        return owner
+    return type(owner).__name__
+
+
+class GpuResources:
+    def __init__(self):
+        self.live = {}  # (kind, id) -> [owner label, bytes]
+        self.refs = {}  # id(owner) -> [owner, count]
+        self.created = 0
+        self.deleted = 0
+
+    # ----------------------------
+    # GL objects
+    # ----------------------------
+    def track(self, kind, gl_id, owner=None, nbytes=0):
+        if gl_id is None:
+            return
+        key = (kind, int(gl_id))
+        if key not in self.live:
+            self.created += 1
+        self.live[key] = [owner_label(owner), int(nbytes)]
+
+    def resize(self, kind, gl_id, nbytes):
+        """New size of a tracked object (e.g. a buffer reallocated by glBufferData)."""
+        entry = self.live.get((kind, int(gl_id))) if gl_id is not None else None
+        if entry is not None:
+            entry[1] = int(nbytes)
+
+    def untrack(self, kind, gl_id):
+        if gl_id is None:
+            return
+        if self.live.pop((kind, int(gl_id)), None) is not None:
+            self.deleted += 1
+
+    # ----------------------------
+    # Shared owners
+    # ----------------------------
+    def retain(self, owner):
+        if owner is None:
+            return owner
+        entry = self.refs.get(id(owner))
+        if entry is None:
+            self.refs[id(owner)] = [owner, 1]
+        else:
+            entry[1] += 1
+        return owner
+
+    def release(self, owner):
+        """Drops one reference; deletes the owner's GL objects with the last one. Returns True if deleted."""
+        if owner is None:
+            return False
+        entry = self.refs.get(id(owner))
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] > 0:
+                return False
+            del self.refs[id(owner)]
+        owner.delete()
+        return True
+
+    def refcount(self, owner):
+        entry = self.refs.get(id(owner))
+        return entry[1] if entry is not None else 0
+
+    # ----------------------------
+    # Reporting
+    # ----------------------------
+    def report(self, by="kind"):
+        """{category: (count, bytes)} of the live objects, by "kind" or by "owner"."""
+        totals = {}
+        for (kind, _), (owner, nbytes) in self.live.items():
+            category = kind if by == "kind" else owner
+            count, total = totals.get(category, (0, 0))
+            totals[category] = (count + 1, total + nbytes)
+        return dict(sorted(totals.items(), key=lambda item: -item[1][1]))
+
+    def total_bytes(self):
+        return sum(nbytes for _, nbytes in self.live.values())
+
+    def stats(self):
+        return (f"{len(self.live)} GL objects, {self.total_bytes() / 1e6:.2f} MB, "
+                f"{self.created} created, {self.deleted} deleted, {len(self.refs)} shared owners")
+
+    def print_report(self):
+        print(f"[GpuResources] {self.stats()}")
+        for by in ("kind", "owner"):
+            for category, (count, nbytes) in self.report(by).items():
+                print(f"[GpuResources]   {category:<24}{count:6d}{nbytes / 1e6:10.2f} MB")
+
+    def draw_imgui(self):
+        import imgui
+        imgui.text(self.stats())
+        for category, (count, nbytes) in self.report("owner").items():
+            imgui.text(f"  {category:<24}{count:6d}{nbytes / 1e6:8.2f} MB")
+
+
+# Shared by the whole process (one GL context)
+gpu_resources = GpuResources()
@@ -0,0 +1,67 @@
+import ctypes
+import OpenGL.GL as gl
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as _glGetQueryObjectui64v
+
+
+def read_query_ns(query):
+    """
+    64-bit result of a finished query (GL_TIME_ELAPSED: nanoseconds, GL_TIMESTAMP: GPU clock).
+    Read through the raw binding: the wrapped gl.glGetQueryObjectui64v looks up an output
+    size for GL_UNSIGNED_INT64_AMD, which some PyOpenGL versions lack (KeyError).
+    """
+    result = ctypes.c_uint64()
+    _glGetQueryObjectui64v(query, gl.GL_QUERY_RESULT, ctypes.byref(result))
+    return result.value
+
+
+class GpuTimer:
+    """
+    Measures GPU time between begin() and end() with GL_TIME_ELAPSED queries.
+    Queries are kept in a small ring and read back only once their result is available,
+    so measuring never stalls the pipeline; the reported time lags a few frames behind.
+    Elapsed-time queries cannot nest: use one GpuTimer per non-overlapping section.
+    """
+    def __init__(self, latency=4):
+        self.queries = list(gl.glGenQueries(latency))
+        self.pending = []   # issued queries, oldest first
+        self.active = None
+        self.last_ms = None
+        self.samples = 0    # number of results read back so far
+
+    def begin(self):
+        if self.active is not None:
+            return
+        # All queries in flight: skip this frame rather than wait for the GPU
+        if not self.queries:
+            self.poll()
+            if not self.queries:
+                return
+        self.active = self.queries.pop()
+        gl.glBeginQuery(gl.GL_TIME_ELAPSED, self.active)
+
+    def end(self):
+        if self.active is None:
+            return
+        gl.glEndQuery(gl.GL_TIME_ELAPSED)
+        self.pending.append(self.active)
+        self.active = None
+        self.poll()
+
+    def poll(self):
+        """Reads back finished queries; returns the newest GPU time in ms (or None if none yet)."""
+        while self.pending:
+            query = self.pending[0]
+            if not gl.glGetQueryObjectiv(query, gl.GL_QUERY_RESULT_AVAILABLE):
+                break
+            self.last_ms = read_query_ns(query) / 1.0e6
+            self.samples += 1
+            self.queries.append(self.pending.pop(0))
+        return self.last_ms
+
+    def delete(self):
+        queries = self.queries + self.pending + ([self.active] if self.active is not None else [])
+        if queries:
+            gl.glDeleteQueries(len(queries), queries)
+        self.queries = []
+        self.pending = []
+        self.active = None
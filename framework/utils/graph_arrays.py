@@ -0,0 +1,196 @@
+"""
+Compressed-sparse-row (CSR) arrays of a CityGraph, for whole-graph algorithms.
+
+The graph itself is object-linked (Node.edges, Edge.lanes, Node.connections). GraphArrays
+flattens it into NumPy arrays indexed by row: node i is graph.nodes[i], edge j is
+graph.edges[j], lane k is the k-th lane of the edges in order. CSR adjacency means the
+neighbours of row i are entries ptr[i]:ptr[i + 1] of the index (and weight) arrays:
+
+    node_ptr, node_adj, node_edge, node_weight   node -> neighbour node, via edge, edge length
+    turn_ptr, turn_to, turn_weight               lane -> next lane through its destination
+                                                 node, curve length + next lane length
+
+Built by CityGraph.arrays() and rebuilt there after the graph changes. to_scipy() gives
+scipy.sparse matrices (scipy is optional), share()/attach() pass the arrays to worker
+processes through one shared memory block without copying.
+"""
+import numpy as np
+
+# Every array field, in the order they are packed into shared memory
+FIELDS = (
+    "node_ids", "node_xy",
+    "edge_nodes", "edge_length", "edge_width",
+    "node_ptr", "node_adj", "node_edge", "node_weight",
+    "lane_ids", "lane_edge", "lane_start", "lane_dest", "lane_length", "lane_width",
+    "turn_ptr", "turn_to", "turn_weight",
+)
+
+
+def _csr(rows, count):
+    """Sort order of rows and the (count + 1) row pointer of the sorted entries."""
+    order = np.argsort(rows, kind="stable")
+    ptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=count), out=ptr[1:])
+    return order, ptr
+
+
+def _path_lengths(paths):
+    """Arc length of each glm.array of vec3 points."""
+    counts = np.array([len(p) for p in paths], dtype=np.int64)
+    if not counts.sum():
+        return np.zeros(len(paths), dtype=np.float64)
+    points = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 3) for p in paths])
+    seg = np.zeros(len(points), dtype=np.float64)
+    seg[1:] = np.linalg.norm(np.diff(points, axis=0), axis=1)
+    # Segment k joins point k-1 and k: drop the ones that cross from one path to the next
+    starts = np.cumsum(counts) - counts
+    seg[starts[counts > 0]] = 0.0
+    lengths = np.zeros(len(paths), dtype=np.float64)
+    nonempty = counts > 0
+    lengths[nonempty] = np.add.reduceat(seg, starts[nonempty])
+    return lengths
+
+
+class GraphArrays:
+    def __init__(self, graph=None):
+        """graph: the CityGraph to flatten (None: empty, e.g. for attach())."""
+        self.nodes = []
+        self.edges = []
+        self.lanes = []
+        self.node_index = {}  # node id -> row
+        self.lane_index = {}  # lane id -> row
+        self.shm = None
+        if graph is not None:
+            self._build(graph)
+
+    def _build(self, graph):
+        # 1. Nodes
+        self.nodes = list(graph.nodes)
+        self.node_index = {node.id: i for i, node in enumerate(self.nodes)}
+        self.node_ids = np.array([n.id for n in self.nodes], dtype=np.int64)
+        self.node_xy = np.array([[n.x, n.y] for n in self.nodes], dtype=np.float64).reshape(-1, 2)
+
+        # 2. Edges
+        self.edges = list(graph.edges)
+        self.edge_nodes = np.array([[self.node_index[e.start_node.id], self.node_index[e.end_node.id]]
+                                    for e in self.edges], dtype=np.int64).reshape(-1, 2)
+        self.edge_length = np.linalg.norm(self.node_xy[self.edge_nodes[:, 1]] - self.node_xy[self.edge_nodes[:, 0]], axis=1)
+        self.edge_width = np.array([e.width for e in self.edges], dtype=np.float64)
+
+        # 3. Node adjacency: every edge in both directions
+        edge_rows = np.arange(len(self.edges), dtype=np.int64)
+        src = np.concatenate([self.edge_nodes[:, 0], self.edge_nodes[:, 1]])
+        dst = np.concatenate([self.edge_nodes[:, 1], self.edge_nodes[:, 0]])
+        via = np.concatenate([edge_rows, edge_rows])
+        order, self.node_ptr = _csr(src, len(self.nodes))
+        self.node_adj = dst[order]
+        self.node_edge = via[order]
+        self.node_weight = self.edge_length[via][order]
+
+        # 4. Lanes
+        self.lanes = [lane for e in self.edges for lane in e.lanes]
+        self.lane_index = {lane.id: i for i, lane in enumerate(self.lanes)}
+        self.lane_ids = np.array([l.id for l in self.lanes], dtype=np.int64)
+        self.lane_edge = np.array([j for j, e in enumerate(self.edges) for _ in e.lanes], dtype=np.int64)
+        self.lane_start = np.array([self.node_index[l.start_node.id] for l in self.lanes], dtype=np.int64)
+        self.lane_dest = np.array([self.node_index[l.dest_node.id] for l in self.lanes], dtype=np.int64)
+        self.lane_length = _path_lengths([l.waypoints for l in self.lanes])
+        self.lane_width = np.array([l.width for l in self.lanes], dtype=np.float64)
+
+        # 5. Turns: the connections of each lane's destination node
+        turn_from, turn_to, curves = [], [], []
+        for node in self.nodes:
+            for (from_id, to_id), curve in node.connections.items():
+                a = self.lane_index.get(from_id)
+                b = self.lane_index.get(to_id)
+                if a is None or b is None:
+                    continue
+                turn_from.append(a)
+                turn_to.append(b)
+                curves.append(curve)
+        turn_from = np.array(turn_from, dtype=np.int64)
+        turn_to = np.array(turn_to, dtype=np.int64)
+        order, self.turn_ptr = _csr(turn_from, len(self.lanes))
+        self.turn_to = turn_to[order]
+        self.turn_weight = (_path_lengths(curves) + self.lane_length[turn_to])[order] if curves else np.zeros(0)
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def neighbours(self, node_row):
+        """(neighbour node rows, edge rows, lengths) of one node."""
+        a, b = self.node_ptr[node_row], self.node_ptr[node_row + 1]
+        return self.node_adj[a:b], self.node_edge[a:b], self.node_weight[a:b]
+
+    def turns(self, lane_row):
+        """(next lane rows, costs) reachable from the end of one lane."""
+        a, b = self.turn_ptr[lane_row], self.turn_ptr[lane_row + 1]
+        return self.turn_to[a:b], self.turn_weight[a:b]
+
+    def dead_end_lanes(self):
+        """Rows of the lanes without a turn out of their destination node."""
+        return np.flatnonzero(np.diff(self.turn_ptr) == 0)
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in FIELDS)
+
+    def stats(self):
+        return (f"{len(self.node_ids)} nodes, {len(self.edge_length)} edges, {len(self.lane_ids)} lanes, "
+                f"{len(self.turn_to)} turns, {self.nbytes() / 1024:.1f} KB")
+
+    # ----------------------------
+    # Export
+    # ----------------------------
+    def to_scipy(self):
+        """(node matrix, turn matrix) as scipy.sparse.csr_matrix weighted by length."""
+        # Imported here: scipy is only needed by callers that ask for it
+        from scipy.sparse import csr_matrix
+        n, l = len(self.node_ids), len(self.lane_ids)
+        nodes = csr_matrix((self.node_weight, self.node_adj, self.node_ptr), shape=(n, n))
+        turns = csr_matrix((self.turn_weight, self.turn_to, self.turn_ptr), shape=(l, l))
+        return nodes, turns
+
+    def share(self):
+        """
+        Copies the arrays into one shared memory block. Returns a picklable spec for attach()
+        in other processes; the block lives until close(unlink=True) on this object.
+        """
+        from multiprocessing import shared_memory
+
+        self.close(unlink=True)
+        layout = []
+        offset = 0
+        for name in FIELDS:
+            arr = getattr(self, name)
+            layout.append((name, offset, arr.shape, arr.dtype.str))
+            offset += (arr.nbytes + 7) // 8 * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for name, start, shape, dtype in layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            view[...] = getattr(self, name)
+            setattr(self, name, view)
+        return {"name": self.shm.name, "layout": layout}
+
+    @classmethod
+    def attach(cls, spec):
+        """Zero-copy arrays over a block made by share() (no Node/Edge/Lane objects)."""
+        from multiprocessing import shared_memory
+
+        arrays = cls()
+        arrays.shm = shared_memory.SharedMemory(name=spec["name"])
+        for name, start, shape, dtype in spec["layout"]:
+            setattr(arrays, name, np.ndarray(tuple(shape), dtype=dtype, buffer=arrays.shm.buf, offset=start))
+        arrays.node_index = {int(i): row for row, i in enumerate(arrays.node_ids)}
+        arrays.lane_index = {int(i): row for row, i in enumerate(arrays.lane_ids)}
+        return arrays
+
+    def close(self, unlink=False):
+        """Detaches from shared memory (copying the arrays back first); unlink frees the block."""
+        if self.shm is None:
+            return
+        for name in FIELDS:
+            setattr(self, name, np.array(getattr(self, name)))
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+        self.shm = None
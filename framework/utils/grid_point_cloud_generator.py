@@ -2,180 +2,327 @@ from pyglm import glm
 import numpy as np
 from ..shapes.shape import Shape
 
+# Candidate grid points evaluated per NumPy pass (bounds temporary memory)
+_CHUNK_CANDIDATES = 1 << 21
+
+# For each dominant axis: (outer scan axis, inner scan axis). The remaining axis is solved
+# from the plane equation, e.g. X-dominant scans y then z and solves x.
+_SCAN_AXES = {0: (1, 2), 1: (0, 2), 2: (0, 1)}
+
+
+def _dot3(a, b):
+    # float32, summed as (x + y) + z like glm.dot
+    return (a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1]) + a[..., 2] * b[..., 2]
+
+
+def _grid_table(starts, bounds, spacing):
+    """
+    Scan coordinates per triangle, accumulated exactly like `v = start; v += spacing`.
+    Returns (table, row per triangle, count per triangle): values for triangle t are
+    table[row[t], :count[t]], i.e. every accumulated value <= bound.
+    """
+    uniq, rows = np.unique(starts, return_inverse=True)
+    rows = rows.ravel()
+
+    # Estimate, with room for the accumulation drifting off start + k * spacing
+    estimate = np.floor((bounds - starts) / spacing).astype(np.int64) + 1
+    width = max(int(estimate.max()) + 2, 1) if len(estimate) else 1
+
+    table = np.empty((len(uniq), width), dtype=np.float64)
+    table[:, 0] = uniq
+    for k in range(1, width):
+        table[:, k] = table[:, k - 1] + spacing
+
+    # Exact count: number of leading values <= bound (the sequence is increasing)
+    counts = np.clip(estimate, 0, width)
+    for _ in range(2):
+        over = (counts > 0) & (table[rows, np.maximum(counts - 1, 0)] > bounds)
+        counts[over] -= 1
+        under = (counts < width) & (table[rows, np.minimum(counts, width - 1)] <= bounds)
+        counts[under] += 1
+    return table, rows, counts
+
+
+def _row_spans(po, pi, o, delta):
+    """
+    Conservative inner-axis span of the projected triangle on scan row o.
+    po, pi: (R, 3) projected vertex coordinates; o, delta: (R,).
+    Every point within delta of the triangle (in the projection plane) on this row lies
+    in [i_lo, i_hi]; `miss` marks rows that cannot contain such points at all.
+    """
+    w_lo = o - delta
+    w_hi = o + delta
+    i_lo = np.full_like(o, np.inf)
+    i_hi = np.full_like(o, -np.inf)
+
+    for ea, eb in ((0, 1), (1, 2), (2, 0)):
+        oa, ob, ia, ib = po[:, ea], po[:, eb], pi[:, ea], pi[:, eb]
+        d_o = ob - oa
+        flat = d_o == 0
+        slope = np.where(flat, 0.0, (ib - ia) / np.where(flat, 1.0, d_o))
+
+        # The edge is linear in o: its values over the window lie between the two clamped ends
+        for w in (w_lo, w_hi):
+            i_w = ia + (np.clip(w, np.minimum(oa, ob), np.maximum(oa, ob)) - oa) * slope
+            i_lo = np.minimum(i_lo, i_w)
+            i_hi = np.maximum(i_hi, i_w)
+
+        # Edges parallel to the inner axis cover both end points
+        i_lo = np.where(flat, np.minimum(i_lo, np.minimum(ia, ib)), i_lo)
+        i_hi = np.where(flat, np.maximum(i_hi, np.maximum(ia, ib)), i_hi)
+
+    miss = (w_hi < po.min(axis=1)) | (w_lo > po.max(axis=1))
+    return i_lo - delta, i_hi + delta, miss
+
+
+def _row_deep_spans(po, pi, o, delta):
+    """
+    Inner-axis span on scan row o of points at least delta away from every edge line of
+    the projected triangle. Barycentrics of such points are >= delta / longest edge, far
+    beyond float32 rounding, so the scalar test would accept them: they skip it.
+    """
+    d_lo = np.full_like(o, -np.inf)
+    d_hi = np.full_like(o, np.inf)
+
+    for ea, eb, ec in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+        oa, ia = po[:, ea], pi[:, ea]
+        # Edge normal (-(ib - ia), ob - oa), oriented towards the third vertex
+        n_o = -(pi[:, eb] - ia)
+        n_i = po[:, eb] - oa
+        side = np.sign((po[:, ec] - oa) * n_o + (pi[:, ec] - ia) * n_i)
+        n_o = n_o * side
+        n_i = n_i * side
+        length = np.sqrt(n_o * n_o + n_i * n_i)
+
+        # (o - oa) * n_o + (i - ia) * n_i >= delta * length
+        rest = delta * length - (o - oa) * n_o
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bound = ia + rest / n_i
+        d_lo = np.where(n_i > 0, np.maximum(d_lo, bound), d_lo)
+        d_hi = np.where(n_i < 0, np.minimum(d_hi, bound), d_hi)
+        # Edge along the inner axis: the whole row is either deep or not
+        d_hi = np.where((n_i == 0) & (rest > 0), -np.inf, d_hi)
+
+    return d_lo, d_hi
+
+
+def _sample_axis(tris, normals, tri_ids, axis, spacing, epsilon):
+    """
+    Grid-samples the triangles whose dominant normal axis is `axis`.
+    Returns (triangle id per point, points float32 (N, 3)) in scan order per triangle.
+    """
+    outer, inner = _SCAN_AXES[axis]
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+
+    # 1. Per-triangle scan ranges
+    lo = tris.min(axis=1).astype(np.float64)
+    hi = tris.max(axis=1).astype(np.float64)
+    start_o = np.floor(lo[:, outer] / spacing) * spacing
+    start_i = np.floor(lo[:, inner] / spacing) * spacing
+    table_o, rows_o, count_o = _grid_table(start_o, hi[:, outer] + spacing, spacing)
+    table_i, rows_i, count_i = _grid_table(start_i, hi[:, inner] + spacing, spacing)
+
+    # 2. Plane and barycentric constants (float32 vectors, float64 scalars, as the scalar version)
+    D = _dot3(normals, a).astype(np.float64)
+    e0 = c - a
+    e1 = b - a
+    dot00 = _dot3(e0, e0).astype(np.float64)
+    dot01 = _dot3(e0, e1).astype(np.float64)
+    dot11 = _dot3(e1, e1).astype(np.float64)
+    denom = dot00 * dot11 - dot01 * dot01
+    valid = np.abs(denom) >= 1e-8
+    inv_denom = np.zeros_like(denom)
+    inv_denom[valid] = 1.0 / denom[valid]
+
+    n = normals.astype(np.float64)
+
+    # Accepted points lie within ~3 * epsilon * edge length of the triangle; the margin is far
+    # wider to absorb float32 rounding. Thin (ill-conditioned) triangles scan their full box
+    # and test every candidate.
+    edges = np.stack([e0, e1, c - b], axis=1).astype(np.float64)
+    longest = np.sqrt((edges ** 2).sum(axis=2)).max(axis=1)
+    scale = np.abs(tris).max(axis=(1, 2)).astype(np.float64)
+    delta = 1e-3 * (longest + spacing) + 1e-4 * (scale + 1.0)
+    narrow = valid & (denom >= 1e-2 * dot00 * dot11)
+
+    # 3. Scan rows (triangle, outer value) and the inner index ranges on each:
+    #    [k_lo, k_hi) may hold points, [deep_lo, deep_hi) certainly does
+    rows_per_tri = np.where(valid, count_o, 0)
+    row_cum = np.cumsum(rows_per_tri)
+    t_row = np.repeat(np.arange(len(tris)), rows_per_tri)
+    k_o = np.arange(len(t_row)) - np.repeat(row_cum - rows_per_tri, rows_per_tri)
+    o_row = table_o[rows_o[t_row], k_o]
+
+    k_lo = np.zeros(len(t_row), dtype=np.int64)
+    k_hi = count_i[t_row].copy()
+    deep_lo = np.zeros(len(t_row), dtype=np.int64)
+    deep_hi = np.zeros(len(t_row), dtype=np.int64)
+    r = np.nonzero(narrow[t_row])[0]
+    if len(r):
+        tr = t_row[r]
+        po = tris[tr][:, :, outer].astype(np.float64)
+        pi = tris[tr][:, :, inner].astype(np.float64)
+        start = start_i[tr]
+        count = count_i[tr]
+
+        # Table values sit within rounding of start + k * spacing; pad by one index each side
+        i_lo, i_hi, miss = _row_spans(po, pi, o_row[r], delta[tr])
+        k_lo[r] = np.clip(np.floor((i_lo - start) / spacing) - 1, 0, count)
+        k_hi[r] = np.where(miss, 0, np.clip(np.floor((i_hi - start) / spacing) + 2, 0, count))
+
+        d_lo, d_hi = _row_deep_spans(po, pi, o_row[r], delta[tr])
+        deep_lo[r] = np.clip(np.ceil((d_lo - start) / spacing) + 1, 0, count)
+        deep_hi[r] = np.clip(np.floor((d_hi - start) / spacing), 0, count)
+    sizes = np.maximum(k_hi - k_lo, 0)
+
+    # 4. Per-row terms, in the same precision and operation order as the scalar version
+    t = t_row
+    o32 = o_row.astype(np.float32)
+    e2_o = o32 - a[t, outer]
+    A = D[t] - n[t, outer] * o_row
+    n_i = n[t, inner]
+    n_a = n[t, axis]
+    q0_o = e0[t, outer] * e2_o
+    q1_o = e1[t, outer] * e2_o
+    table_row = rows_i[t] * table_i.shape[1]
+    table_flat = table_i.ravel()
+
+    out_ids = []
+    out_points = []
+
+    # 5. Candidates in chunks of whole rows
+    cum = np.cumsum(sizes)
+    r0 = 0
+    while r0 < len(sizes):
+        base = cum[r0 - 1] if r0 > 0 else 0
+        r1 = min(max(int(np.searchsorted(cum, base + _CHUNK_CANDIDATES, side='right')), r0 + 1), len(sizes))
+
+        sz = sizes[r0:r1]
+        total = int(sz.sum())
+        if total == 0:
+            r0 = r1
+            continue
+        c_row = np.repeat(np.arange(r0, r1), sz)
+        k_i = np.arange(total) - np.repeat(cum[r0:r1] - sz - base - k_lo[r0:r1], sz)
+
+        # Solve the dominant coordinate from the plane
+        i = table_flat[table_row[c_row] + k_i]
+        s = (A[c_row] - n_i[c_row] * i) / n_a[c_row]
+        i32 = i.astype(np.float32)
+        s32 = s.astype(np.float32)
+
+        # Barycentric test for candidates near the row ends only;
+        # dot products summed in x, y, z order like glm.dot
+        inside = (k_i >= deep_lo[c_row]) & (k_i < deep_hi[c_row])
+        test = np.nonzero(~inside)[0]
+        tr = c_row[test]
+        tt = t[tr]
+        e2_i = i32[test] - a[tt, inner]
+        e2_a = s32[test] - a[tt, axis]
+        q0 = [None] * 3
+        q1 = [None] * 3
+        q0[outer], q0[inner], q0[axis] = q0_o[tr], e0[tt, inner] * e2_i, e0[tt, axis] * e2_a
+        q1[outer], q1[inner], q1[axis] = q1_o[tr], e1[tt, inner] * e2_i, e1[tt, axis] * e2_a
+        dot02 = ((q0[0] + q0[1]) + q0[2]).astype(np.float64)
+        dot12 = ((q1[0] + q1[1]) + q1[2]).astype(np.float64)
+
+        u = (dot11[tt] * dot02 - dot01[tt] * dot12) * inv_denom[tt]
+        v = (dot00[tt] * dot12 - dot01[tt] * dot02) * inv_denom[tt]
+        inside[test] = (u >= -epsilon) & (v >= -epsilon) & (u + v <= 1 + epsilon)
+
+        keep_row = c_row[inside]
+        pts = np.empty((len(keep_row), 3), dtype=np.float32)
+        pts[:, outer] = o32[keep_row]
+        pts[:, inner] = i32[inside]
+        pts[:, axis] = s32[inside]
+
+        out_ids.append(tri_ids[t[keep_row]])
+        out_points.append(pts)
+        r0 = r1
+
+    if not out_ids:
+        return np.empty(0, dtype=np.int64), np.empty((0, 3), dtype=np.float32)
+    return np.concatenate(out_ids), np.concatenate(out_points)
+
+
 class GridPointCloudGenerator:
     @staticmethod
     def generate(source_shape, spacing=0.2, color=glm.vec4(1.0)):
         """
         Generates a point cloud Shape from a source Shape by sampling its surface
         using a triplanar grid projection.
-        
+
         spacing: distance between grid points in world space units.
         """
         # Ensure source geometry is created
         if len(source_shape.vertices) == 0:
             source_shape.createGeometry()
-            
-        vertices = source_shape.vertices
+
+        vertices = np.asarray(source_shape.vertices)[:, :3].astype(np.float32)
         indices = source_shape.indices
-        
-        # Extract triangles
-        triangles = []
+
+        # Extract triangles (T, 3, 3)
         if indices is not None and len(indices) > 0:
             # Indexed mesh
-            for i in range(0, len(indices), 3):
-                idx0 = indices[i]
-                idx1 = indices[i+1]
-                idx2 = indices[i+2]
-                v0 = glm.vec3(vertices[idx0][0], vertices[idx0][1], vertices[idx0][2])
-                v1 = glm.vec3(vertices[idx1][0], vertices[idx1][1], vertices[idx1][2])
-                v2 = glm.vec3(vertices[idx2][0], vertices[idx2][1], vertices[idx2][2])
-                # Access normals if available for better dominant axis selection?
-                # We can compute face normal from vertices.
-                triangles.append((v0, v1, v2))
+            idx = np.asarray(indices, dtype=np.int64)
+            tris = vertices[idx[:len(idx) // 3 * 3]].reshape(-1, 3, 3)
         else:
             # Non-indexed mesh
-            for i in range(0, len(vertices), 3):
-                v0 = glm.vec3(vertices[i][0], vertices[i][1], vertices[i][2])
-                v1 = glm.vec3(vertices[i+1][0], vertices[i+1][1], vertices[i+1][2])
-                v2 = glm.vec3(vertices[i+2][0], vertices[i+2][1], vertices[i+2][2])
-                triangles.append((v0, v1, v2))
-
-        new_verts = []
-        new_norms = []
-        new_uvs = []
-        
+            tris = vertices[:len(vertices) // 3 * 3].reshape(-1, 3, 3)
+
         # Small epsilon to catch points exactly on edges
         epsilon = 1e-5
 
-        for v0, v1, v2 in triangles:
-            # Calculate geometric normal
-            edge1 = v1 - v0
-            edge2 = v2 - v0
-            normal = glm.normalize(glm.cross(edge1, edge2))
-            
-            # 1. Determine Dominant Axis
-            nx, ny, nz = abs(normal.x), abs(normal.y), abs(normal.z)
-            
-            # Helper to check point is in triangle 3D
-            def is_in_triangle(p, a, b, c):
-                # Barycentric technique
-                v0 = c - a
-                v1 = b - a
-                v2 = p - a
-
-                dot00 = glm.dot(v0, v0)
-                dot01 = glm.dot(v0, v1)
-                dot02 = glm.dot(v0, v2)
-                dot11 = glm.dot(v1, v1)
-                dot12 = glm.dot(v1, v2)
-
-                denominator = dot00 * dot11 - dot01 * dot01
-                if abs(denominator) < 1e-8:
-                    return False
-                    
-                invDenom = 1 / denominator
-                u = (dot11 * dot02 - dot01 * dot12) * invDenom
-                v = (dot00 * dot12 - dot01 * dot02) * invDenom
-
-                return (u >= -epsilon) and (v >= -epsilon) and (u + v <= 1 + epsilon)
-
-            points_on_tri = []
-            
-            # Determine projection plane and scan
-            if nx >= ny and nx >= nz:
-                # X-Dominant: Project to YZ plane
-                # Plane eq: normal.x * x + normal.y * y + normal.z * z = D
-                # D = dot(normal, v0)
-                # x = (D - normal.y*y - normal.z*z) / normal.x
-                
-                D = glm.dot(normal, v0)
-                
-                min_y = min(v0.y, v1.y, v2.y)
-                max_y = max(v0.y, v1.y, v2.y)
-                min_z = min(v0.z, v1.z, v2.z)
-                max_z = max(v0.z, v1.z, v2.z)
-                
-                start_y = np.floor(min_y / spacing) * spacing
-                start_z = np.floor(min_z / spacing) * spacing
-                
-                y = start_y
-                while y <= max_y + spacing:
-                    z = start_z
-                    while z <= max_z + spacing:
-                        # Solve X
-                        if abs(normal.x) > 1e-4:
-                            x = (D - normal.y * y - normal.z * z) / normal.x
-                            p = glm.vec3(x, y, z)
-                            if is_in_triangle(p, v0, v1, v2):
-                                points_on_tri.append(p)
-                        z += spacing
-                    y += spacing
-
-            elif ny >= nx and ny >= nz:
-                # Y-Dominant: Project to XZ plane
-                # y = (D - normal.x*x - normal.z*z) / normal.y
-                D = glm.dot(normal, v0)
-                
-                min_x = min(v0.x, v1.x, v2.x)
-                max_x = max(v0.x, v1.x, v2.x)
-                min_z = min(v0.z, v1.z, v2.z)
-                max_z = max(v0.z, v1.z, v2.z)
-                
-                start_x = np.floor(min_x / spacing) * spacing
-                start_z = np.floor(min_z / spacing) * spacing
-                
-                x = start_x
-                while x <= max_x + spacing:
-                    z = start_z
-                    while z <= max_z + spacing:
-                        if abs(normal.y) > 1e-4:
-                            y = (D - normal.x * x - normal.z * z) / normal.y
-                            p = glm.vec3(x, y, z)
-                            if is_in_triangle(p, v0, v1, v2):
-                                points_on_tri.append(p)
-                        z += spacing
-                    x += spacing
-                    
-            else:
-                # Z-Dominant: Project to XY plane
-                # z = (D - normal.x*x - normal.y*y) / normal.z
-                D = glm.dot(normal, v0)
-                
-                min_x = min(v0.x, v1.x, v2.x)
-                max_x = max(v0.x, v1.x, v2.x)
-                min_y = min(v0.y, v1.y, v2.y)
-                max_y = max(v0.y, v1.y, v2.y)
-                
-                start_x = np.floor(min_x / spacing) * spacing
-                start_y = np.floor(min_y / spacing) * spacing
-                
-                x = start_x
-                while x <= max_x + spacing:
-                    y = start_y
-                    while y <= max_y + spacing:
-                        if abs(normal.z) > 1e-4:
-                            z = (D - normal.x * x - normal.y * y) / normal.z
-                            p = glm.vec3(x, y, z)
-                            if is_in_triangle(p, v0, v1, v2):
-                                points_on_tri.append(p)
-                        y += spacing
-                    x += spacing
-
-            for p in points_on_tri:
-                new_verts.append(glm.vec4(p.x, p.y, p.z, 1.0))
-                new_norms.append(normal)
-                # Use simplified density or grid UVs
-                # For grid, UV could be world position
-                new_uvs.append(glm.vec2(0.0, 0.0))
+        # 1. Geometric normals in float32 (glm.normalize(glm.cross(...)))
+        edge1 = tris[:, 1] - tris[:, 0]
+        edge2 = tris[:, 2] - tris[:, 0]
+        cross = np.empty_like(edge1)
+        cross[:, 0] = edge1[:, 1] * edge2[:, 2] - edge2[:, 1] * edge1[:, 2]
+        cross[:, 1] = edge1[:, 2] * edge2[:, 0] - edge2[:, 2] * edge1[:, 0]
+        cross[:, 2] = edge1[:, 0] * edge2[:, 1] - edge2[:, 0] * edge1[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normals = cross * (np.float32(1.0) / np.sqrt(_dot3(cross, cross)))[:, None]
+
+        # 2. Bucket by dominant axis; degenerate triangles (NaN/inf normals) produce no points
+        nabs = np.abs(normals)
+        nx, ny, nz = nabs[:, 0], nabs[:, 1], nabs[:, 2]
+        dominant = np.where((nx >= ny) & (nx >= nz), 0, np.where((ny >= nx) & (ny >= nz), 1, 2))
+        usable = np.all(np.isfinite(normals), axis=1) & (nabs[np.arange(len(normals)), dominant] > 1e-4)
+
+        ids = []
+        points = []
+        for axis in range(3):
+            tri_ids = np.nonzero(usable & (dominant == axis))[0]
+            if len(tri_ids) == 0:
+                continue
+            t_ids, pts = _sample_axis(tris[tri_ids], normals[tri_ids], tri_ids, axis, spacing, epsilon)
+            ids.append(t_ids)
+            points.append(pts)
+
+        # 3. Back to triangle order (stable, so scan order within a triangle is kept)
+        if ids:
+            ids = np.concatenate(ids)
+            points = np.concatenate(points)
+            order = np.argsort(ids, kind='stable')
+            ids = ids[order]
+            points = points[order]
+        count = len(ids)
 
         # Create new Shape
         pc_shape = Shape()
-        pc_shape.vertices = np.array(new_verts, dtype=np.float32)
-        pc_shape.normals = np.array(new_norms, dtype=np.float32)
-        pc_shape.colors = np.full((len(new_verts), 4), color, dtype=np.float32)
-        pc_shape.uvs = np.array(new_uvs, dtype=np.float32)
+        if count:
+            pc_shape.vertices = np.ones((count, 4), dtype=np.float32)
+            pc_shape.vertices[:, :3] = points
+            pc_shape.normals = normals[ids]
+            # Use simplified density or grid UVs
+            pc_shape.uvs = np.zeros((count, 2), dtype=np.float32)
+        else:
+            pc_shape.vertices = np.array([], dtype=np.float32)
+            pc_shape.normals = np.array([], dtype=np.float32)
+            pc_shape.uvs = np.array([], dtype=np.float32)
+        pc_shape.colors = np.full((count, 4), color, dtype=np.float32)
         pc_shape.indices = None
-        
-        pc_shape.createGeometry = lambda: None 
-        
+
+        pc_shape.createGeometry = lambda: None
+
         return pc_shape
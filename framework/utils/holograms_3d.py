@@ -2,10 +2,10 @@ from pyglm import glm
 import random
 import OpenGL.GL as gl
 from .l_system import LSystem
-from .grid_point_cloud_generator import GridPointCloudGenerator
-from ..shapes import Cube, UVSphere, Cylinder, Cone
+from .geometry_cache import geometry_cache
+from .gpu_resources import gpu_resources
 from ..materials import Material
-from ..objects import MeshObject
+from ..objects import SpinningInstancesObject
 
 class HologramConfig:
     # L-System Parameters
@@ -34,9 +34,19 @@ class HologramConfig:
     # Post Process shared? Or per-object?
     # Usually post-process is global, but these are object properties.
 
+# Pool of shapes as (geometry_cache primitive, parameters)
+HOLOGRAM_POOL = [
+    ("cube", (1.5,)),
+    ("sphere", (0.7,)),
+    ("cylinder", (0.7, 1.5)),
+    ("cone", (0.7, 1.5)),
+]
+
 class Holograms3D:
     def __init__(self, root_position=glm.vec3(0, -1.0, 0), scale=1.0):
         self.objects = []
+        self._geometry_keys = [] # geometry_cache references held by self.objects
+        self.material = None # shared by self.objects, owned by the cluster
         self.root_position = root_position
         self.scale = scale
         
@@ -44,21 +54,15 @@ class Holograms3D:
         self.group_rotation = 0.0
         self.group_speed = 0.3
         
-        # Internal storage for individual animations
-        self._anim_data = [] 
+        # Seconds since regenerate; drives the per-instance spin in the shader
+        self.spin_time = 0.0
         
     def regenerate(self, config):
-        """Rebuilds the cluster based on config."""
-        self.objects = []
-        self._anim_data = []
-        
-        # Pool of shapes
-        pool = [
-            Cube(side_length=1.5),
-            UVSphere(radius=0.7),
-            Cylinder(radius=0.7, height=1.5),
-            Cone(radius=0.7, height=1.5)
-        ]
+        """
+        Rebuilds the cluster based on config: one instanced draw per pool primitive,
+        with geometry from the shared geometry_cache and the spin done on the GPU.
+        """
+        self.release()
         
         # L-System Logic
         lsys = LSystem(
@@ -67,98 +71,99 @@ class Holograms3D:
             length=config.L_LENGTH,
             angle_range=(config.L_ANGLE_MIN, config.L_ANGLE_MAX)
         )
-        s = lsys.generate_string(iterations=config.L_ITERATIONS)
-        transforms = lsys.interpret_transforms(s, max_points=config.L_SIZE_LIMIT)
+        # Streamed: only the symbols needed for L_SIZE_LIMIT transforms are expanded
+        transforms = lsys.interpret_array(lsys.iter_symbols(config.L_ITERATIONS), max_points=config.L_SIZE_LIMIT)
         
-        # Create Objects
-        pool_idx = 0
+        # 1. Assign transforms to pool primitives round-robin, with a random spin each
+        groups = [[] for _ in HOLOGRAM_POOL]
+        for pool_idx, local_t in enumerate(transforms):
+            axis = glm.normalize(glm.vec3(random.uniform(-1,1), random.uniform(-1,1), random.uniform(-1,1)))
+            speed = random.uniform(0.5, 2.0)
+            groups[pool_idx % len(HOLOGRAM_POOL)].append((local_t, axis, speed))
         
-        # Prepare Slice Material if needed (lazy load or just init)
-        slice_mat = Material(vertex_shader="slice_shader.vert", fragment_shader="slice_shader.frag")
+        # 2. One material for the whole cluster (all its objects share the config)
+        if config.USE_POINT_CLOUD:
+            mat = self._create_hologram_material(glm.vec3(*config.POINT_CLOUD_COLOR))
+            draw_mode = gl.GL_POINTS
+        else:
+            mat = Material(vertex_shader="slice_shader.vert", fragment_shader="slice_shader.frag")
+            draw_mode = gl.GL_TRIANGLES
+        self.material = gpu_resources.retain(mat)
         
-        for local_t in transforms:
-            shape = pool[pool_idx % len(pool)]
-            pool_idx += 1
-            
+        # 3. One instanced object per primitive
+        for (name, params), group in zip(HOLOGRAM_POOL, groups):
+            if not group:
+                continue
             if config.USE_POINT_CLOUD:
-                # Wrap as Hologram (Internal Helper)
-                obj = self._create_hologram_object(
-                    shape,
-                    spacing=config.GRID_SPACING,
-                    color=glm.vec3(*config.POINT_CLOUD_COLOR),
-                    transform=local_t
-                )
+                key, shape = geometry_cache.primitive(name, params, spacing=config.GRID_SPACING)
             else:
-                # Solid / Slice Mode
-                if shape.VAO is None:
-                    shape.createGeometry()
-                    shape.createBuffers()
-                
-                obj = MeshObject(shape, slice_mat, transform=local_t, draw_mode=gl.GL_TRIANGLES)
+                key, shape = geometry_cache.primitive(name, params)
+            self._geometry_keys.append(key)
             
+            obj = SpinningInstancesObject(
+                shape, mat,
+                base_transforms=[g[0] for g in group],
+                axes=[g[1] for g in group],
+                speeds=[g[2] for g in group],
+                draw_mode=draw_mode
+            )
             self.objects.append(obj)
+        
+        self.spin_time = 0.0
+        self.update(0.0)
             
-            # Init Anim Data
-            self._anim_data.append({
-                'obj': obj,
-                'initial_local_transform': glm.mat4(local_t),
-                'axis': glm.normalize(glm.vec3(random.uniform(-1,1), random.uniform(-1,1), random.uniform(-1,1))),
-                'speed': random.uniform(0.5, 2.0),
-                'angle': 0.0
-            })
-            
+    def release(self):
+        """Deletes this cluster's objects and material and drops its references into the geometry cache."""
+        for obj in self.objects:
+            obj.delete()
+        for key in self._geometry_keys:
+            geometry_cache.release(key)
+        self._geometry_keys = []
+        if self.material is not None:
+            gpu_resources.release(self.material)
+            self.material = None
+        self.objects = []
+
     def update(self, dt):
-        """Updates group and individual animations."""
-        # 1. Update Group
+        """Updates the group transform; the individual spins are evaluated in the vertex shader."""
         self.group_rotation += self.group_speed * dt
+        self.spin_time += dt
+        
         # Apply Translation * Rotation * Scale
         model = glm.translate(self.root_position) * glm.rotate(self.group_rotation, glm.vec3(0, 1, 0))
         group_parent_transform = glm.scale(model, glm.vec3(self.scale))
         
-        # 2. Update Individuals
-        for data in self._anim_data:
-            data['angle'] += data['speed'] * dt
-            
-            # Local Spin
-            spin_rot = glm.rotate(data['angle'], data['axis'])
-            
-            # Compose: Parent * LSystemPos * Spin
-            local_final = data['initial_local_transform'] * spin_rot
-            
-            # Apply Global
-            data['obj'].transform = group_parent_transform * local_final
+        for obj in self.objects:
+            obj.transform = group_parent_transform
+            obj.spin_time = self.spin_time
             
     def update_uniforms(self, config, time):
-        """Updates visual uniforms (color, size, etc)."""
-        for obj in self.objects:
+        """Updates visual uniforms (color, size, etc). The cluster's objects share one material."""
+        materials = {id(obj.material): obj.material for obj in self.objects}
+        for material in materials.values():
              # Check if it has our custom uniforms (not slice mat)
              # Slice mat has different uniform names
-            if hasattr(obj.material, 'uniforms') and "enable_glow" in obj.material.uniforms:
-                obj.material.uniforms["enable_glow"] = config.ENABLE_GLOW
-                obj.material.uniforms["base_color"] = glm.vec3(*config.POINT_CLOUD_COLOR)
-                obj.material.uniforms["point_size"] = config.POINT_SIZE
-                obj.material.uniforms["time"] = time
-            elif hasattr(obj.material, 'vertex_shader') and "slice_shader" in obj.material.vertex_shader:
+            if hasattr(material, 'uniforms') and "enable_glow" in material.uniforms:
+                material.uniforms["enable_glow"] = config.ENABLE_GLOW
+                material.uniforms["base_color"] = glm.vec3(*config.POINT_CLOUD_COLOR)
+                material.uniforms["point_size"] = config.POINT_SIZE
+                material.uniforms["time"] = time
+            elif hasattr(material, 'vertex_shader') and "slice_shader" in material.vertex_shader:
                 # Update Slice Shader Uniforms
                 offset = time * config.SLICE_SPEED
                 
-                obj.material.uniforms["slice_spacing"] = config.SLICE_SPACING
-                obj.material.uniforms["slice_thickness"] = config.SLICE_THICKNESS
-                obj.material.uniforms["slice_normal"] = glm.vec3(*config.SLICE_NORMAL)
-                obj.material.uniforms["warp_factor"] = config.SLICE_WARP
-                obj.material.uniforms["slice_offset"] = offset
-                obj.material.uniforms["color"] = glm.vec3(*config.POINT_CLOUD_COLOR)
+                material.uniforms["slice_spacing"] = config.SLICE_SPACING
+                material.uniforms["slice_thickness"] = config.SLICE_THICKNESS
+                material.uniforms["slice_normal"] = glm.vec3(*config.SLICE_NORMAL)
+                material.uniforms["warp_factor"] = config.SLICE_WARP
+                material.uniforms["slice_offset"] = offset
+                material.uniforms["color"] = glm.vec3(*config.POINT_CLOUD_COLOR)
 
-    def _create_hologram_object(self, source_shape, spacing, color, transform):
-        """Internal helper to create a Point Cloud MeshObject."""
-        # 1. Generate Point Cloud Geometry
-        pc_shape = GridPointCloudGenerator.generate(source_shape, spacing=spacing)
-        pc_shape.createBuffers()
-        
-        # 2. Create Unique Material Instance
+    def _create_hologram_material(self, color):
+        """Internal helper to create the point cloud material of a cluster."""
         mat = Material(vertex_shader="mikoshi_shader.vert", fragment_shader="mikoshi_shader.frag")
         
-        # 3. Configure Material Uniforms (Defaults)
+        # Configure Material Uniforms (Defaults)
         mat.uniforms["enable_glow"] = True
         mat.uniforms["is_point_mode"] = True
         mat.uniforms["base_color"] = color
@@ -167,7 +172,4 @@ class Holograms3D:
         mat.uniforms["anim_x"] = True 
         mat.uniforms["anim_y"] = True 
         mat.uniforms["time"] = 0.0
-        
-        # 4. Create and Return MeshObject
-        obj = MeshObject(pc_shape, mat, transform=transform, draw_mode=gl.GL_POINTS)
-        return obj
+        return mat
@@ -1,6 +1,50 @@
 from pyglm import glm
+from functools import lru_cache
+import numpy as np
 import random
 
+# Turtle rotations: symbol -> (axis, sign)
+TURNS = {
+    "+": (glm.vec3(0, 0, 1), 1.0),  # Rotate Z
+    "-": (glm.vec3(0, 0, 1), -1.0), # Rotate -Z
+    "&": (glm.vec3(1, 0, 0), 1.0),  # Rotate X
+    "^": (glm.vec3(1, 0, 0), -1.0), # Rotate -X
+    "\\": (glm.vec3(0, 1, 0), 1.0), # Rotate Y
+    "/": (glm.vec3(0, 1, 0), -1.0), # Rotate -Y
+}
+
+@lru_cache(maxsize=64)
+def _expand(axiom, rules_items, iterations):
+    table = str.maketrans(dict(rules_items))
+    s = axiom
+    for _ in range(iterations):
+        s = s.translate(table)
+    return s
+
+def expand(axiom, rules, iterations):
+    """
+    Rewrites axiom `iterations` times. Each pass is one str.translate (linear in the
+    output length); results are memoized per (axiom, rules, iterations).
+    """
+    return _expand(axiom, tuple(sorted(rules.items())), iterations)
+
+def iter_expand(axiom, rules, iterations):
+    """
+    Yields the symbols of expand(axiom, rules, iterations) depth-first without building
+    the string, so a consumer that stops early never expands the rest.
+    """
+    stack = [(iter(axiom), iterations)]
+    while stack:
+        symbols, depth = stack[-1]
+        for char in symbols:
+            if depth > 0 and char in rules:
+                stack.append((iter(rules[char]), depth - 1))
+                break
+            yield char
+        else:
+            stack.pop()
+
+
 class LSystem:
     def __init__(self, axiom="F", rules=None, angle=30.0, length=2.0, angle_range=None):
         self.axiom = axiom
@@ -10,69 +54,70 @@ class LSystem:
         self.angle_range = angle_range # Tuple (min_deg, max_deg)
 
     def generate_string(self, iterations=2):
-        s = self.axiom
-        for _ in range(iterations):
-            next_s = ""
-            for char in s:
-                next_s += self.rules.get(char, char)
-            s = next_s
-        return s
-        
+        return expand(self.axiom, self.rules, iterations)
+
+    def iter_symbols(self, iterations=2):
+        return iter_expand(self.axiom, self.rules, iterations)
+
     def get_turn_angle(self):
         if self.angle_range:
             deg = random.uniform(self.angle_range[0], self.angle_range[1])
             return glm.radians(deg)
         return self.angle
 
-    def interpret_transforms(self, s, max_points=None):
+    def interpret_array(self, s, max_points=None):
         """
-        Interprets the string 's' into a list of glm.mat4 transforms.
-        Returns at most max_points transforms (if specified).
+        Interprets the symbols of 's' (a string or any iterable, e.g. iter_symbols())
+        into a (N, 4, 4) float32 array of transforms in glm (column-major, to_list()) layout.
+        Stops reading symbols as soon as max_points transforms have been produced.
         """
-        stack = []
-        
-        pos = glm.vec3(0, 0, 0)
+        # 1. Preallocate: one transform per F
+        if isinstance(s, str):
+            capacity = s.count("F")
+            if max_points is not None:
+                capacity = min(capacity, max_points)
+        elif max_points is not None:
+            capacity = max_points
+        else:
+            s = "".join(s)
+            capacity = s.count("F")
+        out = np.empty((capacity, 4, 4), dtype=np.float32)
+        if capacity == 0:
+            return out
+        out_bytes = out.reshape(-1).view(np.uint8).data
+
+        # 2. Walk the turtle; transforms are written straight into out as raw bytes
+        move = glm.translate(glm.vec3(0, self.length, 0))
+        fixed_turns = {c: glm.rotate(sign * self.angle, axis) for c, (axis, sign) in TURNS.items()}
         current_transform = glm.mat4(1.0)
-        
-        results = []
-        
-        def add_result(mat):
-            if max_points is None or len(results) < max_points:
-                results.append(glm.mat4(mat)) 
+        stack = []
+        count = 0
 
         for char in s:
-            if max_points is not None and len(results) >= max_points:
-                break
-                
             if char == "F":
-                move = glm.translate(glm.vec3(0, self.length, 0))
                 current_transform = current_transform * move
-                add_result(current_transform)
-                
-            elif char == "+": # Rotate Z
-                rot = glm.rotate(self.get_turn_angle(), glm.vec3(0, 0, 1))
-                current_transform = current_transform * rot
-            elif char == "-": # Rotate -Z
-                rot = glm.rotate(-self.get_turn_angle(), glm.vec3(0, 0, 1))
-                current_transform = current_transform * rot
-            elif char == "&": # Rotate X
-                rot = glm.rotate(self.get_turn_angle(), glm.vec3(1, 0, 0))
-                current_transform = current_transform * rot
-            elif char == "^": # Rotate -X
-                rot = glm.rotate(-self.get_turn_angle(), glm.vec3(1, 0, 0))
-                current_transform = current_transform * rot
-            elif char == "\\": # Rotate Y
-                rot = glm.rotate(self.get_turn_angle(), glm.vec3(0, 1, 0))
-                current_transform = current_transform * rot
-            elif char == "/": # Rotate -Y
-                rot = glm.rotate(-self.get_turn_angle(), glm.vec3(0, 1, 0))
-                current_transform = current_transform * rot
+                out_bytes[count * 64:(count + 1) * 64] = current_transform.to_bytes()
+                count += 1
+                if count == capacity:
+                    break
+            elif char in TURNS:
+                if self.angle_range:
+                    axis, sign = TURNS[char]
+                    current_transform = current_transform * glm.rotate(sign * self.get_turn_angle(), axis)
+                else:
+                    current_transform = current_transform * fixed_turns[char]
             elif char == "[":
-                stack.append(glm.mat4(current_transform))
+                stack.append(current_transform)
             elif char == "]":
                 if stack:
                     current_transform = stack.pop()
-                    
-        return results
 
+        return out[:count]
 
+    def interpret_transforms(self, s, max_points=None):
+        """
+        Interprets the string 's' into a list of glm.mat4 transforms.
+        Returns at most max_points transforms (if specified).
+        """
+        raw = self.interpret_array(s, max_points).tobytes()
+        return [glm.mat4.from_bytes(raw[i:i + 64]) for i in range(0, len(raw), 64)]
@@ -0,0 +1,62 @@
+"""
+Array helpers shared by the merged-mesh builders (MeshBatcher, DynamicBatchObject,
+StreetLightLayer): glm transforms to NumPy matrices and transformed shape copies
+written into preallocated arrays. NumPy only, so both framework.objects and
+framework.utils can import it.
+"""
+import numpy as np
+
+
+def to_matrix_array(transforms):
+    """
+    list of glm.mat4 (or an array already in that layout) -> (K, 4, 4) float32 in to_list() layout,
+    i.e. ready for row-vector products V @ M.
+    """
+    if isinstance(transforms, np.ndarray):
+        return transforms.astype(np.float32, copy=False).reshape(-1, 4, 4)
+    # np.array(glm.mat4) is row-major math layout; transpose to to_list() layout
+    return np.array([np.array(m, dtype=np.float32).T for m in transforms], dtype=np.float32).reshape(-1, 4, 4)
+
+
+def fill_transformed(shape, mats, cols, out_v, out_n, out_c, out_u):
+    """
+    Writes K transformed copies of shape into preallocated (K, n, c) output views.
+    mats: (K, 4, 4) in to_list() layout or None; cols: (K, 4) overrides (NaN rows keep the shape colours) or None.
+    """
+    s_verts = np.asarray(shape.vertices, dtype=np.float32)
+    s_norms = shape.normals
+    s_uvs = shape.uvs
+    s_cols = shape.colors
+    has_norms = s_norms is not None and len(s_norms) > 0
+
+    # Positions: V' = V @ M for all instances at once
+    if mats is not None:
+        np.matmul(s_verts[None, :, :], mats, out=out_v)
+    else:
+        out_v[:] = s_verts
+
+    # Normals: 3x3 part, renormalized
+    if not has_norms:
+        out_n[:] = (0.0, 1.0, 0.0)
+    elif mats is not None:
+        np.matmul(np.asarray(s_norms, dtype=np.float32)[None, :, :], mats[:, :3, :3], out=out_n)
+        lengths = np.linalg.norm(out_n, axis=2, keepdims=True)
+        lengths[lengths < 0.0001] = 1.0
+        out_n /= lengths
+    else:
+        out_n[:] = s_norms
+
+    # Colours: shape colours (or white), then per-instance overrides
+    if s_cols is not None and len(s_cols) > 0:
+        out_c[:] = s_cols
+    else:
+        out_c[:] = 1.0
+    if cols is not None:
+        override = ~np.isnan(cols[:, 0])
+        out_c[override] = cols[override][:, None, :]
+
+    # UVs
+    if s_uvs is not None and len(s_uvs) > 0:
+        out_u[:] = s_uvs
+    else:
+        out_u[:] = 0.0
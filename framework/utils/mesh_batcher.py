@@ -2,16 +2,39 @@ import numpy as np
 import OpenGL.GL as gl
 from framework.objects import MeshObject
 from framework.shapes.shape import Shape
+from framework.utils.mesh_file import write_mesh_file, read_mesh_file
+from framework.utils.mesh_optimizer import optimize_shape, format_stats
+from framework.utils.mesh_arrays import to_matrix_array, fill_transformed
 from pyglm import glm
 
+_IDENTITY = np.identity(4, dtype=np.float32)
+
+
 class MeshBatcher:
+    """
+    Merges many shapes into one mesh in two passes:
+    add_shape()/add_instances() only record (shape, transforms, colours) and count vertices;
+    concatenate() allocates the output arrays once at their exact size and fills them in place.
+    Entries that reference the same Shape are transformed together with one batched matmul.
+
+    Peak memory while concatenating is the final mesh (52 bytes per vertex + 4 per index)
+    plus one float per vertex of the largest shared-shape group for normal lengths;
+    no per-shape copies or vstack doubling.
+    Shapes are referenced, not copied: don't modify them between add and build.
+    """
     def __init__(self):
-        self.vertices = []
-        self.normals = []
-        self.uvs = []
-        self.colors = []
-        self.indices = []
-        self.index_offset = 0
+        self.entries = []
+        self.vertex_count = 0
+        self.index_count = 0
+
+    @property
+    def vertices(self):
+        """Legacy view: source vertex array of every added shape (one per add call)."""
+        return [shape.vertices for shape, transforms, colors in self.entries]
+
+    @property
+    def index_offset(self):
+        return self.vertex_count
 
     def add_shape(self, shape, transform=None, color=None):
         """
@@ -20,82 +43,46 @@ class MeshBatcher:
         transform: glm.mat4 (optional)
         color: glm.vec4 (optional override)
         """
+        if not self._ensure_geometry(shape):
+            return
+
+        transforms = None if transform is None else [transform]
+        colors = None if color is None else np.array([color.to_list()], dtype=np.float32)
+        self._record(shape, transforms, colors)
+
+    def add_instances(self, shape, transforms, colors=None):
+        """
+        Adds one shape many times, e.g. every street light pose.
+        transforms: list of glm.mat4 or (K, 4, 4) array in glm (column-major) layout
+        colors: optional list of glm.vec4 or (K, 4) array, one per instance
+        """
+        if len(transforms) == 0 or not self._ensure_geometry(shape):
+            return
+
+        if colors is not None:
+            colors = np.array([c.to_list() if hasattr(c, 'to_list') else c for c in colors], dtype=np.float32).reshape(-1, 4)
+        self._record(shape, transforms, colors)
+
+    def _ensure_geometry(self, shape):
         # Ensure shape has geometry
         if not hasattr(shape, 'vertices') or shape.vertices is None or len(shape.vertices) == 0:
             if hasattr(shape, 'createGeometry'):
                 shape.createGeometry()
             else:
                 print(f"[MeshBatcher] Shape has no vertices and no createGeometry method, skipping")
-                return
-        
+                return False
+
         # Check again after creation attempt
         if not hasattr(shape, 'vertices') or shape.vertices is None or len(shape.vertices) == 0:
             print(f"[MeshBatcher] Still no vertices after createGeometry!")
-            return
-        
-        s_verts = shape.vertices
-        s_norms = shape.normals
-        s_uvs = shape.uvs
-        s_inds = shape.indices
-        s_cols = shape.colors
-        
-        count = len(s_verts)
-        if count == 0:
-            return
+            return False
+        return True
 
-        # Apply Transform
-        if transform is not None:
-            # Convert glm matrix to numpy
-            mat_list = transform.to_list()
-            m_np = np.array(mat_list, dtype=np.float32).reshape(4, 4)
-            
-            # Transform vertices: V' = V @ M
-            v_new = s_verts @ m_np
-            
-            # Transform normals using 3x3 rotation part
-            rot_3x3 = m_np[:3, :3]
-            
-            # Handle normals
-            if s_norms is None or len(s_norms) == 0:
-                n_new = np.tile([0, 1, 0], (count, 1)).astype(np.float32)
-            else:
-                n_new = s_norms @ rot_3x3
-                # Normalize
-                norms = np.linalg.norm(n_new, axis=1, keepdims=True)
-                norms[norms < 0.0001] = 1.0
-                n_new = n_new / norms
-            
-        else:
-            v_new = s_verts
-            if s_norms is None or len(s_norms) == 0:
-                n_new = np.tile([0, 1, 0], (count, 1)).astype(np.float32)
-            else:
-                n_new = s_norms
-            
-        # Colors
-        if color is not None:
-            # Override colors
-            c_new = np.tile(np.array(color.to_list(), dtype=np.float32), (count, 1))
-        else:
-            if s_cols is not None and len(s_cols) > 0:
-                c_new = s_cols
-            else:
-                c_new = np.ones((count, 4), dtype=np.float32)
-
-        # UVs
-        u_new = s_uvs if s_uvs is not None and len(s_uvs) > 0 else np.zeros((count, 2), dtype=np.float32)
-
-        # Append
-        self.vertices.append(v_new)
-        self.normals.append(n_new)
-        self.uvs.append(u_new)
-        self.colors.append(c_new)
-        
-        # Indices - offset them
-        i_new = s_inds + self.index_offset
-        self.indices.append(i_new)
-        
-        self.index_offset += count
+    def _record(self, shape, transforms, colors):
+        instances = 1 if transforms is None else len(transforms)
+        self.entries.append((shape, transforms, colors))
+        self.vertex_count += len(shape.vertices) * instances
+        self.index_count += len(shape.indices) * instances
 
     def add_vehicle(self, vehicle):
         """
@@ -114,44 +101,158 @@ class MeshBatcher:
             local_tf = part.local_transform if hasattr(part, 'local_transform') else glm.mat4(1.0)
             self.add_shape(part.mesh, transform=local_tf)
 
-    def build(self, material=None):
+    def concatenate(self):
         """
-        Returns a MeshObject containing all batched geometry.
-        If material is None, returns just the Shape.
+        Concatenates all batched geometry into a single Shape without creating GL buffers.
+        Returns None if the batch is empty.
         """
-        if not self.vertices:
+        if not self.entries:
             return None
-            
-        # Concatenate
-        all_verts = np.vstack(self.vertices)
-        all_norms = np.vstack(self.normals)
-        all_uvs = np.vstack(self.uvs)
-        all_cols = np.vstack(self.colors)
-        all_inds = np.concatenate(self.indices)
-        
+
+        # 1. Allocate once
+        out_v = np.empty((self.vertex_count, 4), dtype=np.float32)
+        out_n = np.empty((self.vertex_count, 3), dtype=np.float32)
+        out_c = np.empty((self.vertex_count, 4), dtype=np.float32)
+        out_u = np.empty((self.vertex_count, 2), dtype=np.float32)
+        out_i = np.empty(self.index_count, dtype=np.uint32)
+
+        # 2. Group entries by shape (first-appearance order) so shared geometry is one matmul
+        groups = {}
+        for shape, transforms, colors in self.entries:
+            groups.setdefault(id(shape), (shape, []))[1].append((transforms, colors))
+
+        v0 = 0
+        i0 = 0
+        for shape, group in groups.values():
+            count = len(shape.vertices)
+            n_inds = len(shape.indices)
+            mats, cols = self._stack_group(group)
+            k = len(mats) if mats is not None else sum(1 if t is None else len(t) for t, _ in group)
+            v1 = v0 + k * count
+            i1 = i0 + k * n_inds
+
+            fill_transformed(shape, mats, cols,
+                             out_v[v0:v1].reshape(k, count, 4), out_n[v0:v1].reshape(k, count, 3),
+                             out_c[v0:v1].reshape(k, count, 4), out_u[v0:v1].reshape(k, count, 2))
+
+            # Indices: shape indices offset per instance
+            offsets = v0 + np.arange(k, dtype=np.uint32) * count
+            np.add(np.asarray(shape.indices, dtype=np.uint32)[None, :], offsets[:, None], out=out_i[i0:i1].reshape(k, n_inds))
+
+            v0, i0 = v1, i1
+
         # Create Shape
         shape = Shape()
-        shape.vertices = all_verts
-        shape.normals = all_norms
-        shape.uvs = all_uvs
-        shape.colors = all_cols
-        shape.indices = all_inds
-        
-        shape.createBuffers()
+        shape.vertices = out_v
+        shape.normals = out_n
+        shape.uvs = out_u
+        shape.colors = out_c
+        shape.indices = out_i
+        return shape
+
+    def _stack_group(self, group):
+        """
+        Returns ((K, 4, 4) matrices in numpy row-vector layout or None, (K, 4) colours or None).
+        Matrices are None only if no entry of the group has a transform.
+        """
+        has_tf = any(t is not None for t, _ in group)
+        has_col = any(c is not None for _, c in group)
+
+        mats = []
+        cols = []
+        for transforms, colors in group:
+            k = 1 if transforms is None else len(transforms)
+            if has_tf:
+                if transforms is None:
+                    mats.append(_IDENTITY[None])
+                else:
+                    mats.append(to_matrix_array(transforms))
+            if has_col:
+                if colors is None:
+                    # No override: keep the shape's own colours, marked with NaN
+                    cols.append(np.full((k, 4), np.nan, dtype=np.float32))
+                else:
+                    cols.append(np.broadcast_to(colors, (k, 4)) if len(colors) == 1 else colors)
+
+        mats = np.concatenate(mats) if has_tf else None
+        cols = np.concatenate(cols) if has_col else None
+        return mats, cols
+
+    def optimize(self, split=False):
+        """
+        Concatenates, then welds duplicate vertices and reorders triangles for the
+        vertex cache (see mesh_optimizer.py). Indices come out as uint16 when they fit.
+        split: cut into chunks of at most 65,536 vertices so every chunk gets uint16 indices.
+        Returns a list of Shapes without GL buffers.
+        """
+        shape = self.concatenate()
+        if shape is None:
+            return []
+
+        chunks, stats = optimize_shape(shape, split=split)
+        print(f"[MeshBatcher] Optimized: {format_stats(stats)}")
+        return chunks
+
+    def build(self, material=None, mesh_file=None, compact=False, optimize=False):
+        """
+        Returns a MeshObject containing all batched geometry.
+        If material is None, returns just the Shape.
+        If mesh_file is given, the merged geometry is also written there (see mesh_file.py).
+        compact: upload with the interleaved quantized layout (Shape.createCompactBuffers).
+        optimize: weld vertices and reorder for the vertex cache before uploading.
+        """
+        if optimize:
+            chunks = self.optimize()
+            shape = chunks[0] if chunks else None
+        else:
+            shape = self.concatenate()
+        if shape is None:
+            return None
+
+        if mesh_file is not None:
+            write_mesh_file(mesh_file, [("batch", shape)])
+
+        shape.createBuffers(compact)
         
         if material is None:
             return shape
         else:
             return MeshObject(shape, material)
     
+    def build_chunks(self, material=None, compact=False):
+        """
+        Like build(optimize=True), but split into 16-bit indexed chunks.
+        Returns a list of MeshObjects (or Shapes if material is None) sharing the material.
+        """
+        results = []
+        for shape in self.optimize(split=True):
+            shape.createBuffers(compact)
+            results.append(shape if material is None else MeshObject(shape, material))
+        return results
+
+    @staticmethod
+    def load(mesh_file, material=None, compact=False):
+        """
+        Counterpart of build(mesh_file=...): maps a previously written batch
+        and uploads it without re-batching.
+        """
+        chunks = read_mesh_file(mesh_file)
+        if not chunks:
+            return None
+
+        shape = chunks[0][1]
+        shape.createBuffers(compact)
+
+        if material is None:
+            return shape
+        else:
+            return MeshObject(shape, material)
+
     def reset(self):
         """Clear the batcher to start a new batch"""
-        self.vertices = []
-        self.normals = []
-        self.uvs = []
-        self.colors = []
-        self.indices = []
-        self.index_offset = 0
+        self.entries = []
+        self.vertex_count = 0
+        self.index_count = 0
 
 
 # Backwards compatibility alias
@@ -0,0 +1,175 @@
+"""
+Binary mesh container (.bkmesh) that can be opened with np.memmap.
+
+Layout (little endian):
+    header      HEADER_DTYPE, 64 bytes
+    blocks      attribute and index blocks, each starting on a BLOCK_ALIGN boundary
+    chunk table CHUNK_DTYPE[chunk_count] at header.table_offset
+
+Each chunk is one mesh (e.g. one texture batch of the city). Its table entry stores
+vertex/index counts plus an (offset, nbytes) pair per block in BLOCK_LAYOUT order.
+A chunk holds either the float attribute blocks or one "interleaved" block in the
+Shape.compactLayout() format, whose dtype is kept in the table as JSON.
+Reading maps the whole file once and hands out views, so Shape.createBuffers uploads
+straight from the mapped pages without an intermediate copy.
+"""
+import json
+import os
+import numpy as np
+from framework.shapes.shape import Shape
+
+MESH_FILE_MAGIC = b"BKMESH\0\0"
+MESH_FILE_VERSION = 2
+BLOCK_ALIGN = 256
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("chunk_count", "<u4"),
+    ("table_offset", "<u8"),
+    ("reserved", "u1", (40,)),
+])
+
+# (attribute, dtype, components); indices may be stored as uint16 or uint32
+BLOCK_LAYOUT = [
+    ("vertices", np.float32, 4),
+    ("normals", np.float32, 3),
+    ("colors", np.float32, 4),
+    ("uvs", np.float32, 2),
+    ("indices", None, 1),
+    ("interleaved", None, 1),
+]
+FLOAT_BLOCKS = ("vertices", "normals", "colors", "uvs")
+
+CHUNK_DTYPE = np.dtype([
+    ("name", "S64"),
+    ("vertex_count", "<u8"),
+    ("index_count", "<u8"),
+    ("index_bytes", "<u4"),
+    ("pad", "<u4"),
+    ("offsets", "<u8", (len(BLOCK_LAYOUT),)),
+    ("nbytes", "<u8", (len(BLOCK_LAYOUT),)),
+    ("interleaved_dtype", "S256"),
+])
+
+
+def _align(offset):
+    return (offset + BLOCK_ALIGN - 1) // BLOCK_ALIGN * BLOCK_ALIGN
+
+
+def _dtype_to_json(dtype):
+    return json.dumps([[name, dtype.fields[name][0].base.str, list(dtype.fields[name][0].shape)] for name in dtype.names])
+
+
+def _dtype_from_json(text):
+    return np.dtype([(name, base, tuple(shape)) for name, base, shape in json.loads(text)])
+
+
+def write_mesh_file(path, chunks, interleaved=False):
+    """
+    Writes meshes to a .bkmesh file.
+    chunks: list of (name, Shape). Missing attributes are stored as empty blocks.
+    interleaved: store each mesh's compact vertices (shape.interleaved, or packCompact())
+    instead of its float arrays, for upload with Shape.createCompactBuffers.
+    """
+    table = np.zeros(len(chunks), dtype=CHUNK_DTYPE)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, 'wb') as f:
+        f.write(b"\0" * HEADER_DTYPE.itemsize)
+        offset = HEADER_DTYPE.itemsize
+
+        for c_i, (name, shape) in enumerate(chunks):
+            entry = table[c_i]
+            entry["name"] = name.encode("utf-8")[:64]
+            packed = None
+            if interleaved:
+                packed = shape.interleaved if shape.interleaved is not None else shape.packCompact()
+                entry["interleaved_dtype"] = _dtype_to_json(packed.dtype).encode("utf-8")
+            entry["vertex_count"] = len(packed) if packed is not None else len(shape.vertices)
+
+            for b_i, (attr, dtype, comps) in enumerate(BLOCK_LAYOUT):
+                if attr == "interleaved":
+                    arr = packed
+                elif attr in FLOAT_BLOCKS and packed is not None:
+                    continue
+                else:
+                    arr = getattr(shape, attr, None)
+                if arr is None or len(arr) == 0:
+                    continue
+
+                if attr == "interleaved":
+                    dtype = arr.dtype
+                elif attr == "indices":
+                    dtype = np.uint16 if arr.dtype == np.uint16 else np.uint32
+                    entry["index_count"] = len(arr)
+                    entry["index_bytes"] = np.dtype(dtype).itemsize
+                data = np.ascontiguousarray(arr, dtype=dtype).reshape(-1)
+
+                # Pad up to the next block boundary
+                aligned = _align(offset)
+                f.write(b"\0" * (aligned - offset))
+                f.write(data.tobytes())
+
+                entry["offsets"][b_i] = aligned
+                entry["nbytes"][b_i] = data.nbytes
+                offset = aligned + data.nbytes
+
+        table_offset = _align(offset)
+        f.write(b"\0" * (table_offset - offset))
+        f.write(table.tobytes())
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MESH_FILE_MAGIC
+        header["version"] = MESH_FILE_VERSION
+        header["chunk_count"] = len(chunks)
+        header["table_offset"] = table_offset
+        f.seek(0)
+        f.write(header.tobytes())
+
+    # Atomic rename so readers never see a half-written file
+    os.replace(tmp_path, path)
+
+
+def read_mesh_file(path):
+    """
+    Memory-maps a .bkmesh file.
+    Returns a list of (name, Shape) whose arrays are read-only views into the mapping.
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+
+    header = mm[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+    # Compare raw bytes: the S8 field would strip the trailing NULs
+    if mm[:len(MESH_FILE_MAGIC)].tobytes() != MESH_FILE_MAGIC:
+        raise ValueError(f"{path} is not a mesh file")
+    if header["version"] != MESH_FILE_VERSION:
+        raise ValueError(f"{path} has mesh file version {header['version']}, expected {MESH_FILE_VERSION}")
+
+    t_start = int(header["table_offset"])
+    t_end = t_start + int(header["chunk_count"]) * CHUNK_DTYPE.itemsize
+    table = mm[t_start:t_end].view(CHUNK_DTYPE)
+
+    chunks = []
+    for entry in table:
+        shape = Shape()
+        for b_i, (attr, dtype, comps) in enumerate(BLOCK_LAYOUT):
+            nbytes = int(entry["nbytes"][b_i])
+            if nbytes == 0:
+                continue
+            start = int(entry["offsets"][b_i])
+            # Plain ndarray view over the mapping (the memmap stays alive as its base),
+            # so PyOpenGL passes the mapped pointer straight to glBufferData
+            block = np.asarray(mm[start:start + nbytes])
+
+            if attr == "indices":
+                dtype = np.uint16 if entry["index_bytes"] == 2 else np.uint32
+                setattr(shape, attr, block.view(dtype))
+            elif attr == "interleaved":
+                shape.interleaved = block.view(_dtype_from_json(entry["interleaved_dtype"].decode("utf-8")))
+                # Positions as a strided view, for the vertex count and CPU-side bounds
+                shape.vertices = shape.interleaved["position"]
+            else:
+                setattr(shape, attr, block.view(dtype).reshape(-1, comps))
+
+        chunks.append((entry["name"].decode("utf-8"), shape))
+    return chunks
@@ -0,0 +1,254 @@
+"""
+Index buffer optimization for merged meshes:
+    weld_vertices          - merge vertices with equal position, normal, uv and colour (within tolerance)
+    optimize_vertex_cache  - reorder triangles for post-transform cache locality (Tipsify, Sander et al. 2007)
+    reorder_vertices       - renumber vertices in order of first use
+    split_chunks           - cut a mesh into pieces that fit 16-bit indices
+Shapes coming out of here keep the usual Shape arrays; indices are uint16 whenever the
+vertex count allows it, and the draw calls pick the index type from the dtype.
+"""
+import numpy as np
+from framework.shapes.shape import Shape
+
+UINT16_LIMIT = 65536
+
+# Quantization steps used to decide whether two vertices are "the same"
+WELD_TOLERANCE = {
+    "vertices": 1e-4,
+    "normals": 1e-3,
+    "uvs": 1e-4,
+    "colors": 1.0 / 255.0,
+}
+
+_ATTRIBUTES = ("vertices", "normals", "colors", "uvs")
+
+
+def _present(shape, attr):
+    arr = getattr(shape, attr, None)
+    return arr is not None and len(arr) == len(shape.vertices)
+
+
+def _subset(shape, vertex_ids, indices):
+    """
+    New Shape with the given vertices (in that order) and already remapped indices.
+    """
+    out = Shape()
+    for attr in _ATTRIBUTES:
+        if _present(shape, attr):
+            setattr(out, attr, np.ascontiguousarray(getattr(shape, attr)[vertex_ids]))
+    out.indices = indices.astype(np.uint16 if len(vertex_ids) <= UINT16_LIMIT else np.uint32)
+    return out
+
+
+def weld_vertices(shape, tolerance=WELD_TOLERANCE):
+    """
+    Merges duplicate vertices. Attributes are quantized to the tolerance steps and
+    compared as one key per vertex; the first occurrence of each key is kept.
+    Returns a new Shape.
+    """
+    count = len(shape.vertices)
+    keys = [np.rint(np.asarray(getattr(shape, attr), dtype=np.float64) / tolerance[attr]).astype(np.int64).reshape(count, -1)
+            for attr in _ATTRIBUTES if _present(shape, attr)]
+    keys = np.ascontiguousarray(np.hstack(keys))
+
+    # View each row as one opaque item so np.unique does a 1D sort
+    rows = keys.view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    # Keep the kept vertices in their original relative order
+    order = np.argsort(first, kind='stable')
+    remap = np.empty(len(first), dtype=np.int64)
+    remap[order] = np.arange(len(first))
+
+    indices = remap[inverse.ravel()][np.asarray(shape.indices, dtype=np.int64)]
+    return _subset(shape, first[order], indices)
+
+
+def optimize_vertex_cache(indices, vertex_count, cache_size=16):
+    """
+    Tipsify: greedy fan-out from the current vertex, preferring neighbours still in the
+    simulated FIFO cache. Linear in the number of triangles. Returns reordered indices.
+    """
+    tris = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    tri_count = len(tris)
+    if tri_count == 0:
+        return np.asarray(indices, dtype=np.int64)
+
+    # 1. Vertex -> triangle adjacency (CSR)
+    flat = tris.ravel()
+    counts = np.bincount(flat, minlength=vertex_count)
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+    adjacency = (np.argsort(flat, kind='stable') // 3).tolist()
+    tri_list = tris.tolist()
+
+    live = counts.tolist()
+    cache_time = [0] * vertex_count
+    emitted = bytearray(tri_count)
+    dead_end = []
+    out = []
+
+    stamp = cache_size + 1
+    cursor = 0
+    f = int(flat[0])
+
+    # 2. Fan out
+    while f >= 0:
+        candidates = []
+        for t in adjacency[offsets[f]:offsets[f + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = 1
+            out.append(t)
+            for v in tri_list[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if stamp - cache_time[v] > cache_size:
+                    cache_time[v] = stamp
+                    stamp += 1
+
+        # 3. Next fanning vertex: the candidate that stays in cache longest
+        f = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if stamp - cache_time[v] + 2 * live[v] <= cache_size:
+                    priority = stamp - cache_time[v]
+                if priority > best:
+                    best = priority
+                    f = v
+
+        # 4. Dead end: back up through recently used vertices, then scan
+        if f == -1:
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    f = v
+                    break
+            else:
+                while cursor < vertex_count:
+                    if live[cursor] > 0:
+                        f = cursor
+                        break
+                    cursor += 1
+
+    return tris[np.asarray(out, dtype=np.int64)].ravel()
+
+
+def reorder_vertices(shape, indices):
+    """
+    Renumbers vertices in order of first use so the vertex fetch walks memory forward.
+    Unreferenced vertices are dropped. Returns a new Shape.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    used, first = np.unique(indices, return_index=True)
+    order = used[np.argsort(first, kind='stable')]
+
+    remap = np.empty(len(shape.vertices), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return _subset(shape, order, remap[indices])
+
+
+def split_chunks(shape, max_vertices=UINT16_LIMIT):
+    """
+    Splits a mesh into consecutive triangle ranges that each reference at most
+    max_vertices distinct vertices. Vertices shared across a cut are duplicated.
+    """
+    shape = reorder_vertices(shape, shape.indices)
+    if len(shape.vertices) <= max_vertices:
+        return [shape]
+
+    indices = np.asarray(shape.indices, dtype=np.int64)
+    tri_count = len(indices) // 3
+
+    # After first-use ordering, the running max vertex id tells how many new vertices
+    # a range introduces; only references back into earlier ranges can push it over.
+    running_max = np.maximum.accumulate(indices.reshape(-1, 3).max(axis=1))
+
+    chunks = []
+    start = 0
+    while start < tri_count:
+        first_new = int(running_max[start - 1]) + 1 if start > 0 else 0
+        end = max(int(np.searchsorted(running_max, first_new + max_vertices, side='left')), start + 1)
+
+        # Shrink if back references overflow the chunk
+        if len(np.unique(indices[start * 3:end * 3])) > max_vertices:
+            lo, hi = start + 1, end - 1
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if len(np.unique(indices[start * 3:mid * 3])) <= max_vertices:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            end = lo
+
+        chunks.append(reorder_vertices(shape, indices[start * 3:end * 3]))
+        start = end
+    return chunks
+
+
+def cache_miss_ratio(indices, cache_size=16):
+    """
+    ACMR: vertex shader invocations per triangle with a FIFO post-transform cache.
+    1.0 is excellent, 3.0 is no reuse at all.
+    """
+    indices = np.asarray(indices).tolist()
+    if not indices:
+        return 0.0
+
+    cache = []
+    in_cache = set()
+    misses = 0
+    for v in indices:
+        if v in in_cache:
+            continue
+        misses += 1
+        cache.append(v)
+        in_cache.add(v)
+        if len(cache) > cache_size:
+            in_cache.discard(cache.pop(0))
+    return misses / (len(indices) // 3)
+
+
+def optimize_shape(shape, split=False, cache_size=16):
+    """
+    Welds, cache-optimizes and (optionally) splits a merged Shape.
+    Returns (list of Shapes, stats dict).
+    """
+    before_vertices = len(shape.vertices)
+    before_bytes = shape.indices.nbytes
+    before_acmr = cache_miss_ratio(shape.indices, cache_size)
+
+    # 1. Weld
+    welded = weld_vertices(shape)
+
+    # 2. Triangle order for the post-transform cache
+    indices = optimize_vertex_cache(welded.indices, len(welded.vertices), cache_size)
+
+    # 3. Vertex order by first use, then fit 16-bit indices
+    if split:
+        welded.indices = indices
+        chunks = split_chunks(welded)
+    else:
+        chunks = [reorder_vertices(welded, indices)]
+
+    stats = {
+        "vertices_before": before_vertices,
+        "vertices_after": sum(len(c.vertices) for c in chunks),
+        "index_bytes_before": before_bytes,
+        "index_bytes_after": sum(c.indices.nbytes for c in chunks),
+        "acmr_before": before_acmr,
+        "acmr_after": float(np.mean([cache_miss_ratio(c.indices, cache_size) for c in chunks])),
+        "chunks": len(chunks),
+    }
+    return chunks, stats
+
+
+def format_stats(stats):
+    v0, v1 = stats["vertices_before"], stats["vertices_after"]
+    b0, b1 = stats["index_bytes_before"], stats["index_bytes_after"]
+    return (f"vertices {v0} -> {v1} (-{100.0 * (1 - v1 / max(v0, 1)):.0f}%), "
+            f"index bytes {b0} -> {b1} (-{100.0 * (1 - b1 / max(b0, 1)):.0f}%), "
+            f"ACMR {stats['acmr_before']:.2f} -> {stats['acmr_after']:.2f}, "
+            f"{stats['chunks']} chunk(s)")
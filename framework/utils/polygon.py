@@ -3,6 +3,8 @@ from pyglm import glm
 from framework.shapes.shape import Shape
 
 class Polygon:
+    __slots__ = ("vertices",)
+
     def __init__(self, vertices):
         """
         vertices: List of glm.vec2 or (x, z) tuples representing the polygon corners in order (CCW).
@@ -0,0 +1,225 @@
+import json
+import time
+from collections import deque
+import OpenGL.GL as gl
+from .gpu_timer import read_query_ns
+
+
+class _NullScope:
+    """Returned by Profiler.scope() while disabled: entering and leaving it does nothing."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+    def __init__(self, profiler, name, gpu):
+        self.profiler = profiler
+        self.name = name
+        self.gpu = gpu
+
+    def __enter__(self):
+        self.profiler._push(self.name, self.gpu)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._pop()
+        return False
+
+
+class Profiler:
+    """
+    Hierarchical frame profiler.
+    with profiler.scope("render/scene", gpu=True): ... times a block on the CPU (perf_counter)
+    and optionally on the GPU. Scopes nest; each frame (begin_frame/end_frame) keeps a list of
+    records {name, path, depth, start_ms, cpu_ms, gpu_ms} in a bounded history.
+
+    GPU times come from GL_TIMESTAMP queries (glQueryCounter) at both ends of the scope.
+    Unlike GL_TIME_ELAPSED they nest and can overlap the GpuTimer of DynamicResolution.
+    They are read back LATENCY frames late, only once available, so nothing stalls.
+
+    While disabled, scope() returns a shared no-op context and begin/end_frame return at once.
+    """
+    LATENCY = 3
+
+    def __init__(self, history=240):
+        self.enabled = False
+        self.gpu_enabled = True
+        self.frames = deque(maxlen=history)
+
+        self._frame = None
+        self._frame_index = 0
+        self._frame_start = 0.0
+        self._stack = []
+        self._epoch = time.perf_counter()
+
+        # GPU queries: free pool, and per frame in flight the (record, begin, end) triples
+        self._query_pool = []
+        self._in_flight = deque()
+        self._frame_queries = []
+
+    # ----------------------------
+    # Recording
+    # ----------------------------
+    def scope(self, name, gpu=False):
+        if not self.enabled or self._frame is None:
+            return _NULL_SCOPE
+        return _Scope(self, name, gpu)
+
+    def begin_frame(self):
+        if not self.enabled:
+            self._frame = None
+            return
+        self._frame_start = time.perf_counter()
+        self._frame = {"frame": self._frame_index, "start_ms": (self._frame_start - self._epoch) * 1000.0,
+                       "cpu_ms": 0.0, "scopes": []}
+        self._frame_queries = []
+        self._stack = []
+
+    def end_frame(self):
+        if self._frame is None:
+            self._read_gpu()
+            return
+        # Close scopes left open by an exception
+        while self._stack:
+            self._pop()
+        self._frame["cpu_ms"] = (time.perf_counter() - self._frame_start) * 1000.0
+        self.frames.append(self._frame)
+        if self._frame_queries:
+            self._in_flight.append(self._frame_queries)
+        self._frame = None
+        self._frame_index += 1
+        self._read_gpu()
+
+    def _push(self, name, gpu):
+        parent = self._stack[-1][0] if self._stack else None
+        record = {
+            "name": name,
+            "path": parent["path"] + "/" + name if parent else name,
+            "depth": len(self._stack),
+            "start_ms": 0.0,
+            "cpu_ms": 0.0,
+            "gpu_ms": None,
+        }
+        self._frame["scopes"].append(record)
+
+        queries = None
+        if gpu and self.gpu_enabled:
+            queries = self._take_queries()
+            gl.glQueryCounter(queries[0], gl.GL_TIMESTAMP)
+        start = time.perf_counter()
+        record["start_ms"] = (start - self._epoch) * 1000.0
+        self._stack.append((record, start, queries))
+
+    def _pop(self):
+        record, start, queries = self._stack.pop()
+        record["cpu_ms"] = (time.perf_counter() - start) * 1000.0
+        if queries is not None:
+            gl.glQueryCounter(queries[1], gl.GL_TIMESTAMP)
+            self._frame_queries.append((record, queries))
+
+    # ----------------------------
+    # GPU readback
+    # ----------------------------
+    def _take_queries(self):
+        if len(self._query_pool) < 2:
+            self._query_pool.extend(gl.glGenQueries(16))
+        return (self._query_pool.pop(), self._query_pool.pop())
+
+    def _read_gpu(self):
+        """Fills gpu_ms of frames at least LATENCY frames old whose queries have finished."""
+        while len(self._in_flight) > self.LATENCY or (self._in_flight and not self.enabled):
+            frame_queries = self._in_flight[0]
+            last_end = frame_queries[-1][1][1]
+            if not gl.glGetQueryObjectiv(last_end, gl.GL_QUERY_RESULT_AVAILABLE):
+                if self.enabled:
+                    return
+            self._in_flight.popleft()
+            for record, (q_begin, q_end) in frame_queries:
+                t0 = read_query_ns(q_begin)
+                t1 = read_query_ns(q_end)
+                record["gpu_ms"] = (t1 - t0) / 1.0e6
+                self._query_pool.extend((q_begin, q_end))
+
+    # ----------------------------
+    # Reporting
+    # ----------------------------
+    def summary(self, frames=60):
+        """
+        Per scope path over the last 'frames' frames: [(path, depth, avg cpu_ms, max cpu_ms, avg gpu_ms or None)],
+        in the order the scopes first ran.
+        """
+        stats = {}
+        for frame in list(self.frames)[-frames:]:
+            for r in frame["scopes"]:
+                s = stats.get(r["path"])
+                if s is None:
+                    s = stats[r["path"]] = [r["depth"], 0.0, 0.0, 0, 0.0, 0]
+                s[1] += r["cpu_ms"]
+                s[2] = max(s[2], r["cpu_ms"])
+                s[3] += 1
+                if r["gpu_ms"] is not None:
+                    s[4] += r["gpu_ms"]
+                    s[5] += 1
+        return [(path, s[0], s[1] / s[3], s[2], s[4] / s[5] if s[5] else None) for path, s in stats.items()]
+
+    def frame_ms(self, frames=60):
+        recent = list(self.frames)[-frames:]
+        return sum(f["cpu_ms"] for f in recent) / len(recent) if recent else 0.0
+
+    def write_csv(self, path):
+        """One row per scope per frame."""
+        with open(path, "w") as f:
+            f.write("frame,path,depth,start_ms,cpu_ms,gpu_ms\n")
+            for frame in self.frames:
+                for r in frame["scopes"]:
+                    gpu = "" if r["gpu_ms"] is None else f"{r['gpu_ms']:.4f}"
+                    f.write(f"{frame['frame']},{r['path']},{r['depth']},{r['start_ms']:.4f},{r['cpu_ms']:.4f},{gpu}\n")
+        print(f"[Profiler] Wrote {len(self.frames)} frames to {path}")
+
+    def write_json(self, path):
+        """Chrome trace event format (chrome://tracing, Perfetto): CPU scopes on thread 0, GPU durations on thread 1."""
+        events = []
+        for frame in self.frames:
+            events.append({"name": f"frame {frame['frame']}", "ph": "X", "pid": 0, "tid": 0,
+                           "ts": frame["start_ms"] * 1000.0, "dur": frame["cpu_ms"] * 1000.0})
+            for r in frame["scopes"]:
+                events.append({"name": r["name"], "ph": "X", "pid": 0, "tid": 0,
+                               "ts": r["start_ms"] * 1000.0, "dur": r["cpu_ms"] * 1000.0,
+                               "args": {"path": r["path"], "frame": frame["frame"]}})
+                if r["gpu_ms"] is not None:
+                    # GPU timestamps are in another clock: shown aligned to the CPU scope start
+                    events.append({"name": r["name"], "ph": "X", "pid": 0, "tid": 1,
+                                   "ts": r["start_ms"] * 1000.0, "dur": r["gpu_ms"] * 1000.0,
+                                   "args": {"path": r["path"], "frame": frame["frame"]}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"[Profiler] Wrote {len(self.frames)} frames to {path}")
+
+    def draw_imgui(self, frames=60):
+        import imgui
+        imgui.text(f"Frame: {self.frame_ms(frames):.2f} ms CPU (avg of {min(frames, len(self.frames))})")
+        imgui.text(f"{'Scope':<32}{'CPU avg':>9}{'max':>8}{'GPU':>8}")
+        for path, depth, cpu_avg, cpu_max, gpu_avg in self.summary(frames):
+            name = "  " * depth + path.rsplit("/", 1)[-1]
+            gpu = f"{gpu_avg:8.2f}" if gpu_avg is not None else f"{'-':>8}"
+            imgui.text(f"{name:<32}{cpu_avg:9.2f}{cpu_max:8.2f}{gpu}")
+
+    def clear(self):
+        self.frames.clear()
+
+    def delete(self):
+        self.enabled = False
+        self._read_gpu()
+        if self._query_pool:
+            gl.glDeleteQueries(len(self._query_pool), self._query_pool)
+        self._query_pool = []
+
+
+# Shared instance, enabled from the UI
+profiler = Profiler()
@@ -0,0 +1,73 @@
+"""
+Range bookkeeping for GPU arenas that are edited in place (DynamicBatchObject, CloudField):
+RangeAllocator hands out [offset, offset + size) ranges from a coalescing free list, and
+merge_ranges joins the dirty ranges of a frame into as few sub-range uploads as possible.
+"""
+import bisect
+
+
+class RangeAllocator:
+    """
+    First-fit allocator over [0, capacity) with a sorted free list that coalesces on release.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.free = [(0, capacity)] if capacity > 0 else []  # sorted (offset, size)
+        self.used = 0
+
+    def alloc(self, size):
+        for i, (offset, free_size) in enumerate(self.free):
+            if free_size >= size:
+                if free_size == size:
+                    del self.free[i]
+                else:
+                    self.free[i] = (offset + size, free_size - size)
+                self.used += size
+                return offset
+        return None
+
+    def release(self, offset, size):
+        self.used -= size
+        self._insert(offset, size)
+
+    def grow(self, capacity):
+        self._insert(self.capacity, capacity - self.capacity)
+        self.capacity = capacity
+
+    def reset(self, used):
+        """Everything below `used` is allocated, the rest is one free block."""
+        self.used = used
+        self.free = [(used, self.capacity - used)] if used < self.capacity else []
+
+    def high_water(self):
+        """End of the last allocated range."""
+        if self.free and self.free[-1][0] + self.free[-1][1] == self.capacity:
+            return self.free[-1][0]
+        return self.capacity
+
+    def _insert(self, offset, size):
+        if size <= 0:
+            return
+        i = bisect.bisect_left(self.free, (offset, 0))
+        # Merge with the following block
+        if i < len(self.free) and offset + size == self.free[i][0]:
+            size += self.free[i][1]
+            del self.free[i]
+        # Merge with the preceding block
+        if i > 0 and self.free[i - 1][0] + self.free[i - 1][1] == offset:
+            i -= 1
+            offset = self.free[i][0]
+            size += self.free[i][1]
+            del self.free[i]
+        self.free.insert(i, (offset, size))
+
+
+def merge_ranges(ranges):
+    """(start, end) ranges -> sorted [start, end] lists with overlapping or touching ranges joined."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
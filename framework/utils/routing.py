@@ -0,0 +1,255 @@
+"""
+Shortest routes over the lane-level turn graph of a CityGraph.
+
+A route is a list of Lanes from the agent's lane to its destination lane, each one reached
+through a connection at the previous lane's destination node. Costs are lengths: a turn
+costs its curve plus the lane it leads to (CityGraph.arrays().turn_weight).
+
+Two ways to answer a query:
+  - Shortest-path trees: one reverse Dijkstra from a destination gives the next lane and
+    remaining cost towards it from every lane. Trees are cached per destination (LRU), so
+    every agent heading to the same place shares one search; routes() groups a batch of
+    queries by destination.
+  - ALT (A*, landmarks, triangle inequality): with landmarks > 0 the service precomputes
+    distances to and from a few far-apart lanes, and a one-off query without a cached tree
+    runs an A* that usually visits a small part of the graph.
+"""
+import heapq
+import random
+from collections import OrderedDict
+
+import numpy as np
+
+INF = float("inf")
+DEFAULT_MAX_TREES = 256
+
+
+def _dijkstra(ptr, to, weight, source, target=-1, heuristic=None):
+    """
+    Dijkstra (A* with a heuristic) over CSR lists from one source row.
+    Returns (dist, parent) lists; with a target the search stops when it is settled.
+    """
+    n = len(ptr) - 1
+    dist = [INF] * n
+    parent = [-1] * n
+    dist[source] = 0.0
+    queue = [(heuristic(source) if heuristic else 0.0, source)]
+    done = [False] * n
+    while queue:
+        _, u = heapq.heappop(queue)
+        if done[u]:
+            continue
+        done[u] = True
+        if u == target:
+            break
+        du = dist[u]
+        for e in range(ptr[u], ptr[u + 1]):
+            v = to[e]
+            d = du + weight[e]
+            if d < dist[v]:
+                dist[v] = d
+                parent[v] = u
+                heapq.heappush(queue, (d + heuristic(v) if heuristic else d, v))
+    return dist, parent
+
+
+class RoutingService:
+    def __init__(self, graph, landmarks=0, max_trees=DEFAULT_MAX_TREES, seed=0):
+        """
+        graph: the CityGraph (its arrays() are re-read after the graph changes).
+        landmarks: number of ALT landmarks to precompute (0: trees only).
+        max_trees: destinations whose shortest-path tree is kept.
+        """
+        self.graph = graph
+        self.landmark_count = landmarks
+        self.max_trees = max_trees
+        self.seed = seed
+        self.trees = OrderedDict()  # destination row -> (dist, next row)
+        self.landmarks = []
+        self.version = None
+        self.tree_builds = 0
+        self.tree_hits = 0
+        self.astar_queries = 0
+
+    # ----------------------------
+    # Graph
+    # ----------------------------
+    def _sync(self):
+        """Re-reads the turn graph (and drops trees and landmarks) after the graph changed."""
+        if self.version == self.graph.version:
+            return
+        arrays = self.graph.arrays()
+        self.arrays = arrays
+        # Plain lists: the search loops index them element by element
+        self.fwd = (arrays.turn_ptr.tolist(), arrays.turn_to.tolist(), arrays.turn_weight.tolist())
+        turn_from = np.repeat(np.arange(len(arrays.lane_ids)), np.diff(arrays.turn_ptr))
+        order = np.argsort(arrays.turn_to, kind="stable")
+        rev_ptr = np.zeros(len(arrays.lane_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(arrays.turn_to, minlength=len(arrays.lane_ids)), out=rev_ptr[1:])
+        self.rev = (rev_ptr.tolist(), turn_from[order].tolist(), arrays.turn_weight[order].tolist())
+        self.trees = OrderedDict()
+        self.version = self.graph.version
+        self._build_landmarks()
+
+    def _row(self, lane):
+        return self.arrays.lane_index.get(lane.id)
+
+    def _lanes(self, rows):
+        return [self.arrays.lanes[r] for r in rows]
+
+    # ----------------------------
+    # Shortest-path trees
+    # ----------------------------
+    def tree(self, destination):
+        """(dist, next) arrays over lane rows: cost to the end of destination and the row of the next lane."""
+        self._sync()
+        d = self._row(destination)
+        return self._tree(d) if d is not None else None
+
+    def _tree(self, d):
+        tree = self.trees.get(d)
+        if tree is not None:
+            self.trees.move_to_end(d)
+            self.tree_hits += 1
+            return tree
+        # Reverse search: a lane's parent in it is the next lane on the way to d
+        dist, nxt = _dijkstra(*self.rev, d)
+        tree = (np.array(dist), np.array(nxt, dtype=np.int32))
+        self.trees[d] = tree
+        self.tree_builds += 1
+        if len(self.trees) > self.max_trees:
+            self.trees.popitem(last=False)
+        return tree
+
+    def _follow(self, tree, s, d):
+        dist, nxt = tree
+        if dist[s] == INF:
+            return None
+        rows = [s]
+        while rows[-1] != d:
+            rows.append(int(nxt[rows[-1]]))
+        return rows
+
+    def next_lane(self, lane, destination):
+        """The lane to turn into from the end of lane towards destination (None: arrived or unreachable)."""
+        self._sync()
+        s, d = self._row(lane), self._row(destination)
+        if s is None or d is None or s == d:
+            return None
+        dist, nxt = self._tree(d)
+        return self.arrays.lanes[nxt[s]] if dist[s] < INF else None
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+    def route(self, start, destination):
+        """Lanes from start to destination (both included), or None if there is no route."""
+        self._sync()
+        s, d = self._row(start), self._row(destination)
+        if s is None or d is None:
+            return None
+        if d in self.trees or not self.landmarks:
+            rows = self._follow(self._tree(d), s, d)
+        else:
+            rows = self._astar(s, d)
+        return self._lanes(rows) if rows is not None else None
+
+    def routes(self, queries):
+        """
+        Batched route(): queries is a list of (start lane, destination lane). Queries are
+        grouped by destination so each destination needs one tree, built or cached.
+        """
+        self._sync()
+        results = [None] * len(queries)
+        by_destination = {}
+        for i, (start, destination) in enumerate(queries):
+            s, d = self._row(start), self._row(destination)
+            if s is not None and d is not None:
+                by_destination.setdefault(d, []).append((i, s))
+        for d, items in by_destination.items():
+            tree = self._tree(d)
+            for i, s in items:
+                rows = self._follow(tree, s, d)
+                if rows is not None:
+                    results[i] = self._lanes(rows)
+        return results
+
+    def distance(self, start, destination):
+        """Route cost from the end of start to the end of destination (inf if unreachable)."""
+        tree = self.tree(destination)
+        s = self._row(start)
+        return float(tree[0][s]) if tree is not None and s is not None else INF
+
+    def random_destination(self, start, rng=random, attempts=8):
+        """A random lane reachable from start (other than start), or None."""
+        self._sync()
+        s = self._row(start)
+        lanes = self.arrays.lanes
+        if s is None or len(lanes) < 2:
+            return None
+        for _ in range(attempts):
+            d = rng.randrange(len(lanes))
+            if d != s and self._tree(d)[0][s] < INF:
+                return lanes[d]
+        return None
+
+    # ----------------------------
+    # ALT
+    # ----------------------------
+    def _build_landmarks(self):
+        """Farthest-point landmarks with distances from (forward) and to (reverse) each one."""
+        self.landmarks = []
+        self.from_landmark = []
+        self.to_landmark = []
+        n = len(self.arrays.lane_ids)
+        if self.landmark_count <= 0 or n == 0:
+            return
+        rng = random.Random(self.seed)
+        nearest = [INF] * n
+        candidate = rng.randrange(n)
+        for _ in range(min(self.landmark_count, n)):
+            self.landmarks.append(candidate)
+            forward = _dijkstra(*self.fwd, candidate)[0]
+            backward = _dijkstra(*self.rev, candidate)[0]
+            self.from_landmark.append(forward)
+            self.to_landmark.append(backward)
+            # Next: the reachable lane farthest from every landmark so far
+            best = -1.0
+            for v in range(n):
+                d = min(forward[v], backward[v])
+                if d < nearest[v]:
+                    nearest[v] = d
+                if nearest[v] < INF and nearest[v] > best:
+                    best = nearest[v]
+                    candidate = v
+
+    def _astar(self, s, d):
+        fwd_d = [f[d] for f in self.from_landmark]
+        to_d = [t[d] for t in self.to_landmark]
+        pairs = list(zip(self.from_landmark, fwd_d, self.to_landmark, to_d))
+
+        def heuristic(v):
+            h = 0.0
+            for from_l, from_l_d, to_l, to_l_d in pairs:
+                # d(v, t) >= d(L, t) - d(L, v)  and  d(v, t) >= d(v, L) - d(t, L)
+                a = from_l_d - from_l[v]
+                b = to_l[v] - to_l_d
+                if a > h and a < INF:
+                    h = a
+                if b > h and b < INF:
+                    h = b
+            return h
+
+        self.astar_queries += 1
+        dist, parent = _dijkstra(*self.fwd, s, target=d, heuristic=heuristic)
+        if dist[d] == INF:
+            return None
+        rows = [d]
+        while rows[-1] != s:
+            rows.append(parent[rows[-1]])
+        rows.reverse()
+        return rows
+
+    def stats(self):
+        return (f"{len(self.trees)} trees cached, {self.tree_builds} built, {self.tree_hits} reused, "
+                f"{len(self.landmarks)} landmarks, {self.astar_queries} A* queries")
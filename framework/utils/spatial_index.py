@@ -0,0 +1,257 @@
+"""
+Uniform grid over the city graph for nearest-node and nearest-lane queries.
+
+Nodes are bucketed by the cell of their (x, y). Lanes are split into their waypoint
+segments, each bucketed in every cell its bounding box touches (on the first lane query
+after their edge was added). Queries search rings of
+cells around the query point and stop once the next ring cannot hold anything closer,
+so their cost depends on the local density, not the size of the city.
+Coordinates are graph coordinates: node (x, y), lane waypoint (x, z).
+
+CityGraph keeps one up to date (CityGraph.spatial) as nodes and edges are added or removed.
+"""
+import heapq
+import math
+import numpy as np
+from pyglm import glm
+
+DEFAULT_CELL_SIZE = 25.0
+
+
+def _project(px, py, ax, ay, bx, by):
+    """(squared distance, t) from p to the segment a-b, t in [0, 1] along it."""
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0
+    if length_sq > 1e-12:
+        t = min(max(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0), 1.0)
+    qx, qy = ax + dx * t - px, ay + dy * t - py
+    return qx * qx + qy * qy, t
+
+
+class LaneHit:
+    """A point on a lane: distance to the query, arc length from the lane start, position (x, y)."""
+    __slots__ = ("lane", "distance", "arc_length", "x", "y", "segment")
+
+    def __init__(self, lane, distance, arc_length, x, y, segment):
+        self.lane = lane
+        self.distance = distance
+        self.arc_length = arc_length
+        self.x = x
+        self.y = y
+        self.segment = segment
+
+    def __repr__(self):
+        return f"LaneHit(lane={self.lane.id}, distance={self.distance:.2f}, s={self.arc_length:.2f})"
+
+
+class SpatialIndex:
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self.cell_size = float(cell_size)
+        self.node_cells = {}  # (i, j) -> [Node]
+        self.lane_cells = {}  # (i, j) -> [(lane, segment index)]
+        self.edge_lanes = {}  # edge -> lanes indexed for it
+        self.pending = {}     # edges whose lanes are not indexed yet (insertion ordered)
+        self.bounds = None    # [min i, min j, max i, max j] of the occupied cells
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def _grow(self, i, j):
+        if self.bounds is None:
+            self.bounds = [i, j, i, j]
+        else:
+            b = self.bounds
+            b[0], b[1], b[2], b[3] = min(b[0], i), min(b[1], j), max(b[2], i), max(b[3], j)
+
+    def clear(self):
+        self.node_cells = {}
+        self.lane_cells = {}
+        self.edge_lanes = {}
+        self.pending = {}
+        self.bounds = None
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def add_node(self, node):
+        cell = self._cell(node.x, node.y)
+        self.node_cells.setdefault(cell, []).append(node)
+        self._grow(*cell)
+
+    def add_edge(self, edge):
+        """
+        Queues the edge's lanes (again, if they changed since the last call). They are
+        indexed by the next lane query, so building a graph nobody queries costs nothing.
+        """
+        self.remove_edge(edge)
+        self.pending[edge] = None
+
+    def remove_edge(self, edge):
+        self.pending.pop(edge, None)
+        for lane in self.edge_lanes.pop(edge, ()):
+            self._remove_lane(lane)
+
+    def _flush(self):
+        for edge in self.pending:
+            for lane in edge.lanes:
+                self._add_lane(lane)
+            self.edge_lanes[edge] = list(edge.lanes)
+        self.pending = {}
+
+    def _lane_segment_cells(self, lane):
+        """Per segment k of the lane: the cells its bounding box touches (waypoints, x and z)."""
+        points = np.asarray(lane.waypoints)
+        if len(points) < 2:
+            return []
+        cells = np.floor(points[:, (0, 2)] / self.cell_size).astype(np.int64)
+        low, high = cells.min(axis=0).tolist(), cells.max(axis=0).tolist()
+        self._grow(*low)
+        self._grow(*high)
+        cells = cells.tolist()
+        segments = []
+        for (i0, j0), (i1, j1) in zip(cells, cells[1:]):
+            if i0 == i1 and j0 == j1:
+                segments.append(((i0, j0),))
+            else:
+                segments.append([(i, j) for i in range(min(i0, i1), max(i0, i1) + 1)
+                                 for j in range(min(j0, j1), max(j0, j1) + 1)])
+        return segments
+
+    def _add_lane(self, lane):
+        for k, cells in enumerate(self._lane_segment_cells(lane)):
+            for cell in cells:
+                bucket = self.lane_cells.get(cell)
+                if bucket is None:
+                    bucket = self.lane_cells[cell] = []
+                bucket.append((lane, k))
+
+    def _remove_lane(self, lane):
+        for cell in {cell for cells in self._lane_segment_cells(lane) for cell in cells}:
+            bucket = [item for item in self.lane_cells.get(cell, ()) if item[0] is not lane]
+            if bucket:
+                self.lane_cells[cell] = bucket
+            else:
+                self.lane_cells.pop(cell, None)
+
+    # ----------------------------
+    # Ring search
+    # ----------------------------
+    def _rings(self, x, y, max_dist):
+        """
+        Yields (ring radius r, cells at Chebyshev distance r) around the query cell while they
+        can still hold something within max_dist and the grid has occupied cells that far out.
+        Everything in ring r + 1 and beyond is at least r * cell_size away.
+        """
+        if self.bounds is None:
+            return
+        ci, cj = self._cell(x, y)
+        b = self.bounds
+        reach = max(ci - b[0], cj - b[1], b[2] - ci, b[3] - cj, 0)
+        r = 0
+        while r <= reach and (r - 1) * self.cell_size <= max_dist:
+            if r == 0:
+                yield r, [(ci, cj)]
+            else:
+                cells = [(ci + d, cj - r) for d in range(-r, r + 1)] + [(ci + d, cj + r) for d in range(-r, r + 1)]
+                cells += [(ci - r, cj + d) for d in range(-r + 1, r)] + [(ci + r, cj + d) for d in range(-r + 1, r)]
+                yield r, cells
+            r += 1
+
+    def _cells_in_box(self, x, y, radius):
+        """Occupied-area cells overlapping the square around (x, y)."""
+        if self.bounds is None:
+            return
+        b = self.bounds
+        i0, j0 = self._cell(max(x - radius, b[0] * self.cell_size), max(y - radius, b[1] * self.cell_size))
+        i1, j1 = self._cell(min(x + radius, (b[2] + 1) * self.cell_size), min(y + radius, (b[3] + 1) * self.cell_size))
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                yield i, j
+
+    # ----------------------------
+    # Node queries
+    # ----------------------------
+    def k_nearest_nodes(self, x, y, k=1, max_dist=math.inf):
+        """Up to k (node, distance) pairs, nearest first, closer than max_dist."""
+        found = []  # (distance, node id, node)
+        for r, cells in self._rings(x, y, max_dist):
+            for cell in cells:
+                for node in self.node_cells.get(cell, ()):
+                    d = math.hypot(node.x - x, node.y - y)
+                    if d < max_dist:
+                        found.append((d, node.id, node))
+            if len(found) >= k and heapq.nsmallest(k, found)[-1][0] <= r * self.cell_size:
+                break
+        return [(node, d) for d, _, node in heapq.nsmallest(k, found)]
+
+    def nearest_node(self, x, y, max_dist=math.inf):
+        """(node, distance), or (None, inf) if no node is closer than max_dist."""
+        best = self.k_nearest_nodes(x, y, 1, max_dist)
+        return best[0] if best else (None, float("inf"))
+
+    def nodes_in_radius(self, x, y, radius):
+        """(node, distance) pairs within radius, nearest first."""
+        found = []
+        for cell in self._cells_in_box(x, y, radius):
+            for node in self.node_cells.get(cell, ()):
+                d = math.hypot(node.x - x, node.y - y)
+                if d <= radius:
+                    found.append((d, node.id, node))
+        found.sort()
+        return [(node, d) for d, _, node in found]
+
+    # ----------------------------
+    # Lane queries
+    # ----------------------------
+    def _hit(self, lane, k, x, y):
+        """(squared distance, t) from (x, y) to segment k of lane."""
+        a, b = lane.waypoints[k], lane.waypoints[k + 1]
+        return _project(x, y, a.x, a.z, b.x, b.z)
+
+    def _lane_hit(self, lane, k, t, d_sq):
+        wp = lane.waypoints
+        # Arc length up to segment k (lanes have a few dozen waypoints at most)
+        arc = 0.0
+        for m in range(k):
+            arc += glm.distance(wp[m], wp[m + 1])
+        a, b = wp[k], wp[k + 1]
+        arc += glm.distance(a, b) * t
+        return LaneHit(lane, math.sqrt(d_sq), arc, a.x + (b.x - a.x) * t, a.z + (b.z - a.z) * t, k)
+
+    def nearest_lane(self, x, y, max_dist=math.inf):
+        """LaneHit for the closest point on any lane within max_dist, or None."""
+        self._flush()
+        best = None  # (squared distance, lane, segment, t)
+        limit_sq = max_dist * max_dist
+        for r, cells in self._rings(x, y, max_dist):
+            for cell in cells:
+                for lane, k in self.lane_cells.get(cell, ()):
+                    d_sq, t = self._hit(lane, k, x, y)
+                    if d_sq < limit_sq and (best is None or d_sq < best[0]):
+                        best = (d_sq, lane, k, t)
+            if best is not None and math.sqrt(best[0]) <= r * self.cell_size:
+                break
+        if best is None:
+            return None
+        d_sq, lane, k, t = best
+        return self._lane_hit(lane, k, t, d_sq)
+
+    def lanes_in_radius(self, x, y, radius):
+        """The closest point of every lane within radius, as LaneHits, nearest first."""
+        self._flush()
+        closest = {}  # lane -> (squared distance, segment, t)
+        for cell in self._cells_in_box(x, y, radius):
+            for lane, k in self.lane_cells.get(cell, ()):
+                d_sq, t = self._hit(lane, k, x, y)
+                if d_sq <= radius * radius and (lane not in closest or d_sq < closest[lane][0]):
+                    closest[lane] = (d_sq, k, t)
+        hits = [self._lane_hit(lane, k, t, d_sq) for lane, (d_sq, k, t) in closest.items()]
+        hits.sort(key=lambda hit: hit.distance)
+        return hits
+
+    def stats(self):
+        self._flush()
+        segments = sum(len(bucket) for bucket in self.lane_cells.values())
+        nodes = sum(len(bucket) for bucket in self.node_cells.values())
+        return f"{nodes} nodes, {sum(len(l) for l in self.edge_lanes.values())} lanes, {segments} segment entries, {len(self.lane_cells)} lane cells"
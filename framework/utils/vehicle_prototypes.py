@@ -0,0 +1,110 @@
+"""
+Merged, uploaded vehicle meshes shared by every agent of the same archetype.
+
+A BaseVehicle subclass builds a MeshObject per part and picks a random colour and size,
+so building one per spawn costs several Shapes, a merge and a VBO upload. The cache builds
+each archetype a bounded number of times (the variants, with seeded randomness) and hands
+out MeshObjects that reference the shared Shape and Material. Spawns add variety through
+a per-object tint (multiplied into the vertex colours) and a per-agent scale.
+"""
+import random
+from pyglm import glm
+from .gpu_resources import gpu_resources
+
+DEFAULT_VARIANTS = 4
+# Per-spawn variation on top of the variant: brightness of the tint and length of the car
+TINT_RANGE = (0.8, 1.15)
+LENGTH_RANGE = (0.92, 1.08)
+BASE_SCALE = 1.5
+
+
+class VehiclePrototypeCache:
+    def __init__(self, variants=DEFAULT_VARIANTS, seed=0):
+        self.variants = variants
+        self.seed = seed
+        self.shapes = {}  # (class name, variant) -> uploaded Shape
+        self.material = None
+        self.builds = 0
+        self.hits = 0
+
+    def _get_material(self):
+        if self.material is None:
+            # Imported here: needs a GL context (and the material module)
+            from framework.shapes.cars.vehicle import get_body_material
+            self.material = gpu_resources.retain(get_body_material())
+        return self.material
+
+    def _build(self, vehicle_class, variant):
+        """Merges and uploads one variant. The class's own random choices are seeded per variant."""
+        from framework.utils.mesh_batcher import MeshBatcher
+
+        # Keep the simulation's random sequence independent of which variants exist yet
+        state = random.getstate()
+        random.seed(f"{vehicle_class.__name__}:{variant}:{self.seed}")
+        try:
+            mat = self._get_material()
+            vehicle = vehicle_class(materials=(mat, mat, mat, mat))
+        finally:
+            random.setstate(state)
+
+        batcher = MeshBatcher()
+        batcher.add_vehicle(vehicle)
+        shape = batcher.build()
+        vehicle.delete()
+        self.builds += 1
+        return gpu_resources.retain(shape)
+
+    def get_shape(self, vehicle_class, variant):
+        key = (vehicle_class.__name__, variant % self.variants)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = self._build(vehicle_class, key[1])
+        else:
+            self.hits += 1
+        return shape
+
+    def warm(self, vehicle_classes):
+        """Builds every variant up front (e.g. at city generation) so spawning never uploads."""
+        for cls in vehicle_classes:
+            for variant in range(self.variants):
+                self.get_shape(cls, variant)
+
+    def create_mesh(self, vehicle_class, rng=random):
+        """
+        A MeshObject over a shared variant, with a random tint. Returns (mesh_object, scale)
+        where scale is the agent's vec3 scale (length varies a little per spawn).
+        """
+        from framework.objects.mesh_object import MeshObject
+
+        shape = self.get_shape(vehicle_class, rng.randrange(self.variants))
+        mesh = MeshObject(shape, self._get_material())
+        return mesh, self._vary(mesh, rng)
+
+    def assign(self, mesh, vehicle_class, rng=random):
+        """
+        Points an existing MeshObject (a recycled agent's) at another variant, without new
+        GL objects. Returns the new scale like create_mesh.
+        """
+        shape = self.get_shape(vehicle_class, rng.randrange(self.variants))
+        if mesh.mesh is not shape:
+            gpu_resources.retain(shape)
+            gpu_resources.release(mesh.mesh)
+            mesh.mesh = shape
+        return self._vary(mesh, rng)
+
+    @staticmethod
+    def _vary(mesh, rng):
+        b = rng.uniform(*TINT_RANGE)
+        mesh.tint = glm.vec4(b, b, b, 1.0)
+        return glm.vec3(BASE_SCALE, BASE_SCALE, BASE_SCALE * rng.uniform(*LENGTH_RANGE))
+
+    def stats(self):
+        return f"{len(self.shapes)} prototypes, {self.builds} builds, {self.hits} reuses"
+
+    def delete(self):
+        for shape in self.shapes.values():
+            gpu_resources.release(shape)
+        self.shapes = {}
+        if self.material is not None:
+            gpu_resources.release(self.material)
+            self.material = None